@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+API Payloads - 자주 호출되는 API 응답 본문 생성 (라이브 라우트 / 프리렌더 공용)
+- trending_payload: /api/trending?limit=N
+- statistics_payload: /api/statistics
+- chart_latest_payload / chart_info_payload: /api/chart/<chart>/latest, /info
+- 라우트와 prerender.py가 같은 함수를 써서 응답 형식이 항상 같음
+"""
+
+import logging
+import urllib.parse
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+
+from chart_pointer import ensure_latest_pointer
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+TRACK_IMAGES_DIR = BASE_DIR / 'static' / 'track_images'
+
+# 최신 데이터만 (차트별 최신 포인터 조인) + 중복 완전 제거
+TRENDING_QUERY = """
+WITH latest_per_chart AS (
+    SELECT chart_name, published_time as latest_time
+    FROM chart_latest_pointer
+    WHERE chart_name NOT IN ('billboard', 'vibe')
+    AND published_time IS NOT NULL
+),
+dedup_tracks AS (
+    SELECT 
+        UPPER(TRIM(
+            REPLACE(REPLACE(
+                REPLACE(REPLACE(
+                    REPLACE(REPLACE(m.unified_artist, 'like ', ''), 'LIKE ', ''),
+                    '(', ''), ')', ''),
+                '[', ''), ']', '')
+        )) as norm_artist,
+        UPPER(TRIM(
+            REPLACE(REPLACE(
+                REPLACE(REPLACE(
+                    REPLACE(REPLACE(m.unified_track, 'like ', ''), 'LIKE ', ''),
+                    '(', ''), ')', ''),
+                '[', ''), ']', '')
+        )) as norm_track,
+        m.unified_artist as display_artist,
+        m.unified_track as display_track,
+        m.chart_name,
+        m.rank_position,
+        m.local_image,
+        m.resolved_image,
+        m.created_at
+    FROM unified_master_with_images m
+    INNER JOIN latest_per_chart l 
+        ON m.chart_name = l.chart_name 
+        AND m.created_at = l.latest_time
+    WHERE m.rank_position IS NOT NULL 
+        AND m.rank_position > 0
+        AND m.unified_artist IS NOT NULL 
+        AND m.unified_track IS NOT NULL
+),
+aggregated AS (
+    SELECT 
+        display_artist as artist,
+        display_track as track,
+        COUNT(DISTINCT chart_name) as chart_count,
+        GROUP_CONCAT(chart_name || ':' || rank_position) as positions,
+        AVG(CAST(rank_position AS REAL)) as avg_rank,
+        MIN(rank_position) as best_rank,
+        MAX(CASE WHEN local_image IS NOT NULL THEN local_image END) as image_file,
+        MAX(CASE WHEN resolved_image NOT LIKE '/images/%'
+                 AND resolved_image NOT LIKE '/api/%'
+            THEN resolved_image END) as resolved_image
+    FROM dedup_tracks
+    GROUP BY norm_artist, norm_track
+    HAVING chart_count >= 1
+)
+SELECT *,
+       (COUNT(*) OVER()) as total_count,
+       ((51 - avg_rank) + (chart_count * 10)) as score
+FROM aggregated
+ORDER BY chart_count DESC, avg_rank ASC
+LIMIT ?
+"""
+
+# ============================================
+# trending
+# ============================================
+def trending_rows(conn, limit=20):
+    """trending 데이터 with 고화질 이미지 우선 (conn.row_factory = sqlite3.Row)"""
+    ensure_latest_pointer(conn)
+    rows = conn.execute(TRENDING_QUERY, (limit,)).fetchall()
+
+    results = []
+    for row in rows:
+        # 차트별 순위 파싱
+        charts = {}
+        positions_str = row['positions'] or ""
+        for pos in positions_str.split(','):
+            if ':' in pos:
+                chart, rank = pos.split(':', 1)
+                try:
+                    charts[chart.strip()] = int(rank.strip())
+                except ValueError:
+                    pass
+
+        # ✅ 수집 시 해석된 최종 URL 우선 (없으면 smart API)
+        image_url = row['resolved_image']
+        if not image_url:
+            artist_encoded = quote(row['artist'] if row['artist'] else '')
+            track_encoded = quote(row['track'] if row['track'] else '')
+            image_url = f"/api/album-image-smart/{artist_encoded}/{track_encoded}"
+
+        results.append({
+            'artist': row['artist'],
+            'track': row['track'],
+            'charts': charts,
+            'chart_count': row['chart_count'],
+            'best_rank': row['best_rank'],
+            'avg_rank': round(row['avg_rank'], 1),
+            'score': round(row['score'], 1),
+            'image_url': image_url  # resolved_image 또는 smart API
+        })
+    return results
+
+
+def trending_payload(conn, limit=20):
+    trending_data = trending_rows(conn, limit)
+    return {
+        'trending': trending_data,
+        'count': len(trending_data),
+        'limit': limit,
+        'timestamp': datetime.now().isoformat(),
+        'version': 'v18.0-track-images',
+        'image_source': 'track_images (고화질)'
+    }
+
+
+# ============================================
+# 통계
+# ============================================
+def statistics_payload(conn):
+    """통계 - 중복 제거된 실제 데이터"""
+    cursor = conn.cursor()
+
+    # 중복 제거된 아티스트 수 (대소문자 구분없이)
+    cursor.execute("""
+        SELECT COUNT(DISTINCT UPPER(TRIM(unified_artist)))
+        FROM unified_master_with_images
+        WHERE unified_artist IS NOT NULL
+        AND unified_artist != ''
+    """)
+    unique_artists = cursor.fetchone()[0] or 0
+
+    # 중복 제거된 트랙 수
+    cursor.execute("""
+        SELECT COUNT(DISTINCT UPPER(TRIM(unified_artist || '::' || unified_track)))
+        FROM unified_master_with_images
+        WHERE unified_artist IS NOT NULL
+        AND unified_track IS NOT NULL
+        AND unified_artist != ''
+        AND unified_track != ''
+    """)
+    unique_tracks = cursor.fetchone()[0] or 0
+
+    # 활성 차트 수
+    cursor.execute("""
+        SELECT COUNT(DISTINCT chart_name)
+        FROM unified_master_with_images
+        WHERE created_at >= datetime('now', '-7 days')
+    """)
+    active_charts = cursor.fetchone()[0] or 0
+
+    # 최근 업데이트 시간 (차트별 최신 포인터)
+    ensure_latest_pointer(conn)
+    cursor.execute("""
+        SELECT MAX(published_time)
+        FROM chart_latest_pointer
+    """)
+    last_update_row = cursor.fetchone()
+    last_update = last_update_row[0] if last_update_row and last_update_row[0] else ''
+
+    logger.info(f"📊 통계: 아티스트 {unique_artists}, 트랙 {unique_tracks}, 차트 {active_charts}")
+
+    return {
+        'success': True,
+        'statistics': {
+            'summary': {
+                'unique_artists': unique_artists,
+                'unique_tracks': unique_tracks,
+                'active_charts': active_charts,
+                'last_update': last_update
+            },
+            # 호환성을 위해 기존 형식도 유지
+            'artists': unique_artists,
+            'tracks': unique_tracks,
+            'charts': active_charts
+        },
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+# ============================================
+# 개별 차트
+# ============================================
+def fix_double_encoding(text):
+    """이중 UTF-8 인코딩 수정"""
+    if not text:
+        return text
+
+    try:
+        # 이미 올바른 문자열이면 그대로 반환
+        if all(ord(c) < 128 or ord(c) > 255 for c in text):
+            return text
+
+        # 이중 인코딩 패턴 감지 및 수정
+        # UTF-8 바이트를 Latin-1로 잘못 디코딩한 경우
+        try:
+            # Latin-1로 인코딩 후 UTF-8로 디코딩
+            fixed = text.encode('latin-1').decode('utf-8')
+            return fixed
+        except (UnicodeDecodeError, UnicodeEncodeError):
+            # 실패하면 원본 반환
+            return text
+
+    except Exception as e:
+        logger.warning(f"Encoding fix failed for '{text}': {e}")
+        return text
+
+
+def get_image_url(row):
+    """통합탭과 동일한 이미지 처리 로직"""
+
+    # 0. 수집 시 해석된 최종 URL (기본 이미지/smart API가 아닌 경우)
+    resolved = row['resolved_image'] if 'resolved_image' in row.keys() else None
+    if resolved and not resolved.startswith(('/images/', '/api/')):
+        return resolved
+
+    # 1. local_image 최우선 (고화질)
+    if row['local_image'] and row['local_image'] != 'None' and row['local_image'] != '_.jpg':
+        # 실제 파일 존재 확인
+        image_path = TRACK_IMAGES_DIR / row['local_image']
+        if image_path.exists() and image_path.stat().st_size > 10000:  # 10KB 이상
+            return f"/static/track_images/{row['local_image']}"
+
+    # 2. Smart API 사용 (local_image 없을 때)
+    artist = fix_double_encoding(row['unified_artist'])
+    track = fix_double_encoding(row['unified_track'])
+
+    if artist and track:
+        safe_artist = urllib.parse.quote(str(artist).replace('/', '_'))
+        safe_track = urllib.parse.quote(str(track).replace('/', '_'))
+        return f"/api/album-image-smart/{safe_artist}/{safe_track}"
+
+    # 3. 원본 URL은 최후의 수단 (저화질)
+    if row['image_url'] and row['image_url'].startswith('http'):
+        return row['image_url']
+
+    # 4. 기본 이미지
+    return "/images/default-album.svg"
+
+
+def chart_latest_payload(conn, chart_name):
+    """개별 차트 최신 데이터 - 통합탭과 동일한 처리 + 인코딩 수정 (conn.row_factory = sqlite3.Row)"""
+    ensure_latest_pointer(conn)
+    cursor = conn.cursor()
+
+    # 최신 데이터 조회 (차트별 최신 포인터 조인 - 통합탭과 동일한 기준)
+    cursor.execute("""
+        SELECT
+            m.unified_artist,
+            m.unified_track,
+            m.rank_position,
+            m.local_image,
+            m.image_url,
+            m.resolved_image,
+            m.views_or_streams,
+            m.created_at
+        FROM chart_latest_pointer p
+        JOIN unified_master_with_images m
+            ON m.chart_name = p.chart_name
+            AND m.created_at = p.published_time
+        WHERE p.chart_name = ?
+        ORDER BY m.rank_position
+        LIMIT 100
+    """, (chart_name,))
+    results = cursor.fetchall()
+
+    tracks = []
+    for row in results:
+        # 통합 필드 사용 + 인코딩 수정
+        artist = fix_double_encoding(row['unified_artist'])
+        track = fix_double_encoding(row['unified_track'])
+
+        tracks.append({
+            'artist': artist,
+            'track': track,
+            'rank': row['rank_position'],
+            'rank_position': row['rank_position'],
+            'image_url': get_image_url(row),  # 통합탭과 동일한 이미지 처리
+            'views': row['views_or_streams'],
+            'score': 501 - row['rank_position']
+        })
+
+    # 업데이트 시간
+    cursor.execute("""
+        SELECT published_time as last_update
+        FROM chart_latest_pointer
+        WHERE chart_name = ?
+    """, (chart_name,))
+
+    update_result = cursor.fetchone()
+    last_update = update_result['last_update'] if update_result else None
+
+    return {
+        'success': True,
+        'chart': chart_name,
+        'tracks': tracks,
+        'total': len(tracks),
+        'last_update': last_update,
+        'message': f'{len(tracks)} tracks loaded'
+    }
+
+
+def chart_info_payload(conn, chart_name):
+    """차트 정보 및 상태 → payload (데이터 없으면 None, conn.row_factory = sqlite3.Row)"""
+    result = conn.execute("""
+        SELECT
+            COUNT(*) as total_tracks,
+            COUNT(DISTINCT unified_artist) as unique_artists,
+            COUNT(local_image) as tracks_with_local_image,
+            MAX(created_at) as last_update
+        FROM unified_master_with_images
+        WHERE chart_name = ?
+    """, (chart_name,)).fetchone()
+
+    if not result:
+        return None
+
+    return {
+        'success': True,
+        'chart': chart_name,
+        'stats': {
+            'total_tracks': result['total_tracks'],
+            'unique_artists': result['unique_artists'],
+            'tracks_with_images': result['tracks_with_local_image'],
+            'last_update': result['last_update']
+        }
+    }
@@ -3,14 +3,21 @@ Album Image Smart API - 로컬 우선 통합 버전
 LocalImageManager 완전 통합
 """
 
-from flask import Blueprint, send_from_directory, jsonify, send_file, make_response, redirect
+from flask import Blueprint, jsonify, redirect, request
 import os
-import json
 from pathlib import Path
 import logging
 from urllib.parse import unquote
 import sqlite3
-import re
+
+from image_resolver import get_track_image_index, resolve_batch, search_spotify_image
+from cdn_rules import best_image_url, sized_image_url
+from image_downloader import get_downloader
+from image_derivatives import find_rendition, accepts_webp
+from image_store import get_image_store
+from image_fts import fuzzy_lookup
+from image_serving import send_image
+from image_stats import get_image_stats as get_image_stats_store
 
 # 로거 설정
 logger = logging.getLogger(__name__)
@@ -37,14 +44,33 @@ def get_db_connection():
         logger.error(f"DB 연결 실패: {e}")
         return None
 
+def send_local_image(directory, filename, size):
+    """로컬 이미지 서빙 - size를 덮는 가장 작은 렌디션 우선 (Accept로 WebP 선택)"""
+    rendition = find_rendition(
+        Path(directory) / filename, size,
+        webp=accepts_webp(request.headers.get('Accept'))
+    )
+    if rendition:
+        path, mimetype = rendition
+        response = send_image(path.parent, path.name, mimetype=mimetype)
+    else:
+        response = send_image(directory, filename, mimetype='image/jpeg')
+
+    response.headers['Vary'] = 'Accept'
+    return response
+
+def with_source(response, source):
+    """해석 경로 헤더 (image_quality_audit.py 등 진단용)"""
+    response.headers['X-Image-Source'] = source
+    return response
+
 @album_image_bp.route('/api/album-image-smart/<artist>/<track>')
 def get_album_image_smart(artist, track):
     """Smart Image API - 로컬 우선 + 고화질 지원"""
 
     try:
         # 🆕 size 파라미터 처리 (고화질 지원)
-        from flask import request
-        size = request.args.get('size', '640', type=int)
+        size = request.args.get('size', 640, type=int)
 
         # URL 디코딩
         artist = unquote(artist)
@@ -53,6 +79,14 @@ def get_album_image_smart(artist, track):
         logger.info(f"이미지 요청: {artist} - {track} (size={size})")
         
         base_path = Path(__file__).parent.parent
+
+        # 🆕 콘텐츠 주소 저장소 (해시 기반 - 같은 앨범 아트는 파일 하나)
+        store = get_image_store()
+        stored = store.lookup(artist, track)
+        if stored:
+            blob = store.blob_path(*stored)
+            logger.info(f"해시 저장소 이미지: {blob.name}")
+            return with_source(send_local_image(blob.parent, blob.name, size), 'hash')
         
         # 🆕 LocalImageManager 사용 (활성화된 경우)
         if LOCAL_IMAGE_ENABLED:
@@ -61,42 +95,23 @@ def get_album_image_smart(artist, track):
             
             if local_path and local_path.exists():
                 logger.info(f"로컬 이미지 사용: {local_path.name}")
-                return send_from_directory(
+                return with_source(send_local_image(
                     local_path.parent,
                     local_path.name,
-                    mimetype='image/jpeg'
-                )
-        
-        # 1. track_images 매핑 확인 (폴백)
-        mapping_path = base_path / 'static' / 'track_images' / 'download_mapping.json'
-        
-        if mapping_path.exists():
-            try:
-                with open(mapping_path, 'r', encoding='utf-8') as f:
-                    mapping = json.load(f)
-                
-                # 다양한 키 형식 시도
-                keys_to_try = [
-                    f"{artist}:{track}",
-                    f"{artist.replace(' ', '_')}:{track.replace(' ', '_')}",
-                    f"{artist}:{track.split('(')[0].strip()}",  # feat. 제거
-                ]
-                
-                for key in keys_to_try:
-                    if key in mapping:
-                        filename = mapping[key]
-                        image_path = base_path / 'static' / 'track_images' / filename
-                        
-                        if image_path.exists():
-                            logger.info(f"매핑 이미지 발견: {filename}")
-                            return send_from_directory(
-                                base_path / 'static' / 'track_images',
-                                filename,
-                                mimetype='image/jpeg'
-                            )
-            except Exception as e:
-                logger.error(f"매핑 파일 읽기 에러: {e}")
+                    size
+                ), 'local')
         
+        # 1. track_images 매핑 확인 (폴백) - 인메모리 인덱스 사용
+        index = get_track_image_index()
+        filename = index.find_mapped(artist, track)
+        if filename:
+            logger.info(f"매핑 이미지 발견: {filename}")
+            return with_source(send_local_image(
+                base_path / 'static' / 'track_images',
+                filename,
+                size
+            ), 'mapping')
+
         # 2. DB에서 찾기
         conn = get_db_connection()
         if conn:
@@ -115,19 +130,26 @@ def get_album_image_smart(artist, track):
                 
                 result = cursor.fetchone()
                 
-                # 부분 매칭 시도
+                # 부분 매칭 시도 (FTS5 trigram 인덱스 + 유사도 순위)
                 if not result:
                     base_track = track.split('(')[0].strip()
-                    cursor.execute("""
-                        SELECT local_image, image_url
-                        FROM unified_master_with_images
-                        WHERE unified_artist LIKE ?
-                        AND unified_track LIKE ?
-                        ORDER BY created_at DESC
-                        LIMIT 1
-                    """, (f'%{artist}%', f'%{base_track}%'))
-                    
-                    result = cursor.fetchone()
+                    try:
+                        result = fuzzy_lookup(conn, artist, base_track)
+                        if result:
+                            logger.info(f"퍼지 매칭: {result['artist']} - {result['track']} "
+                                        f"(score={result['score']})")
+                    except sqlite3.OperationalError:
+                        # 인덱스 미생성 (파이프라인 실행 전) - 기존 LIKE 검색
+                        cursor.execute("""
+                            SELECT local_image, image_url
+                            FROM unified_master_with_images
+                            WHERE unified_artist LIKE ?
+                            AND unified_track LIKE ?
+                            ORDER BY created_at DESC
+                            LIMIT 1
+                        """, (f'%{artist}%', f'%{base_track}%'))
+
+                        result = cursor.fetchone()
                 
                 conn.close()
                 
@@ -137,52 +159,21 @@ def get_album_image_smart(artist, track):
                         local_path = base_path / 'static' / 'track_images' / result['local_image']
                         if local_path.exists():
                             logger.info(f"DB 로컬 이미지: {result['local_image']}")
-                            return send_from_directory(
+                            return with_source(send_local_image(
                                 local_path.parent,
                                 local_path.name,
-                                mimetype='image/jpeg'
-                            )
+                                size
+                            ), 'db_local')
                     
                     # image_url로 폴백
                     if result['image_url']:
-                        # 🆕 size에 따라 CDN 이미지 크기 선택
-                        upgraded_url = result['image_url']
-
-                        # Melon CDN 처리 (구형 + 신형)
-                        if 'melon.co.kr' in upgraded_url:
-                            if size >= 640:
-                                # 고화질: 1000x1000
-                                upgraded_url = upgraded_url.replace('_500.jpg', '_1000.jpg')
-                                upgraded_url = upgraded_url.replace('/resize/500/', '/resize/1000/')
-                            else:
-                                # 중화질: 500x500
-                                upgraded_url = upgraded_url.replace('_1000.jpg', '_500.jpg')
-                                upgraded_url = upgraded_url.replace('/resize/1000/', '/resize/500/')
-
-                        # 🆕 Bugs CDN 처리 (image.bugsm.co.kr)
-                        elif 'image.bugsm.co.kr' in upgraded_url:
-                            if size >= 640:
-                                # 고화질: /images/500/
-                                upgraded_url = upgraded_url.replace('/images/50/', '/images/500/')
-                                upgraded_url = upgraded_url.replace('/images/100/', '/images/500/')
-                            else:
-                                # 중화질: /images/500/
-                                upgraded_url = upgraded_url.replace('/images/50/', '/images/500/')
-                                upgraded_url = upgraded_url.replace('/images/100/', '/images/500/')
-                                upgraded_url = upgraded_url.replace('/images/1000/', '/images/500/')
-
-                        # 🆕 Genie CDN 처리 (image.genie.co.kr)
-                        # Genie는 이미 600x600으로 고화질이므로 별도 처리 불필요
-                        elif 'image.genie.co.kr' in upgraded_url:
-                            pass  # 이미 600x600으로 충분한 화질
-
-                        # 🆕 LocalImageManager로 다운로드 예약
-                        if LOCAL_IMAGE_ENABLED:
-                            image_manager.queue_download(artist, track, upgraded_url)
+                        # 🆕 다운로드 워커 풀에 예약 - 원본은 최고 화질로 저장
+                        best_url = best_image_url(result['image_url'])
+                        if get_downloader().enqueue(best_url, artist, track):
                             logger.info(f"다운로드 예약: {artist} - {track}")
 
-                        # 고화질 URL로 리다이렉트
-                        return redirect(upgraded_url)
+                        # 🆕 size에 맞는 CDN 크기로 리다이렉트 (낮추기만)
+                        return with_source(redirect(sized_image_url(best_url, size)), 'cdn')
                 
             except Exception as e:
                 logger.error(f"DB 조회 에러: {e}")
@@ -190,137 +181,152 @@ def get_album_image_smart(artist, track):
                     conn.close()
         
         # 3. 파일명 기반 직접 매칭 시도
-        track_images_dir = base_path / 'static' / 'track_images'
-        if track_images_dir.exists():
-            # 안전한 파일명 생성
-            safe_artist = re.sub(r'[<>:"/\\|?*]', '_', artist)[:50]
-            safe_track = re.sub(r'[<>:"/\\|?*]', '_', track)[:50]
-            
-            # 다양한 패턴 시도
-            patterns = [
-                f"{safe_artist}_{safe_track}_*.jpg",
-                f"{safe_artist.replace(' ', '_')}_{safe_track.replace(' ', '_')}_*.jpg",
-                f"{artist}_{track}_*.jpg",
-            ]
-            
-            for pattern in patterns:
-                matches = list(track_images_dir.glob(pattern))
-                if matches:
-                    logger.info(f"직접 매칭: {matches[0].name}")
-                    return send_from_directory(
-                        track_images_dir,
-                        matches[0].name,
-                        mimetype='image/jpeg'
-                    )
-        
+        filename = index.find_by_prefix(artist, track)
+        if filename:
+            logger.info(f"직접 매칭: {filename}")
+            return with_source(send_local_image(
+                base_path / 'static' / 'track_images',
+                filename,
+                size
+            ), 'filename')
+
         # 4. album_images 폴백 (구 시스템)
-        album_images_dir = base_path / 'static' / 'album_images'
-        if album_images_dir.exists():
-            for img_file in album_images_dir.glob("*.jpg"):
-                if artist.lower() in img_file.stem.lower() and track.lower() in img_file.stem.lower():
-                    logger.info(f"구 시스템 이미지: {img_file.name}")
-                    return send_from_directory(
-                        album_images_dir,
-                        img_file.name,
-                        mimetype='image/jpeg'
-                    )
+        filename = index.find_album_image(artist, track)
+        if filename:
+            logger.info(f"구 시스템 이미지: {filename}")
+            return with_source(send_local_image(
+                base_path / 'static' / 'album_images',
+                filename,
+                size
+            ), 'album_images')
         
         # 5. 🆕 Spotify API 호출 (마지막 폴백)
         logger.info(f"로컬/DB에 이미지 없음, Spotify API 호출: {artist} - {track}")
-        try:
-            import requests
-            import os
-
-            # Spotify Token 가져오기
-            client_id = os.getenv('SPOTIFY_CLIENT_ID')
-            client_secret = os.getenv('SPOTIFY_CLIENT_SECRET')
-
-            if client_id and client_secret:
-                # Token 발급
-                token_response = requests.post(
-                    'https://accounts.spotify.com/api/token',
-                    data={'grant_type': 'client_credentials'},
-                    auth=(client_id, client_secret),
-                    timeout=10
-                )
-
-                if token_response.status_code == 200:
-                    token = token_response.json()['access_token']
-
-                    # 트랙 검색
-                    search_response = requests.get(
-                        'https://api.spotify.com/v1/search',
-                        headers={'Authorization': f'Bearer {token}'},
-                        params={
-                            'q': f'artist:{artist} track:{track}',
-                            'type': 'track',
-                            'limit': 1
-                        },
-                        timeout=10
-                    )
-
-                    if search_response.status_code == 200:
-                        data = search_response.json()
-                        tracks = data.get('tracks', {}).get('items', [])
-
-                        if tracks and tracks[0].get('album', {}).get('images'):
-                            images = tracks[0]['album']['images']
-                            # size에 따라 이미지 선택
-                            if size >= 640 and len(images) > 0:
-                                image_url = images[0]['url']  # 640x640
-                            elif size >= 300 and len(images) > 1:
-                                image_url = images[1]['url']  # 300x300
-                            else:
-                                image_url = images[0]['url'] if images else None
-
-                            if image_url:
-                                logger.info(f"Spotify API에서 이미지 발견: {artist} - {track}")
-                                return redirect(image_url)
-        except Exception as e:
-            logger.error(f"Spotify API 호출 에러: {e}")
+        spotify_url = search_spotify_image(artist, track, size)
+        if spotify_url:
+            logger.info(f"Spotify API에서 이미지 발견: {artist} - {track}")
+            return with_source(redirect(spotify_url), 'spotify')
 
         # 이미지 없음 - 기본 이미지로 redirect (404 대신)
         logger.warning(f"모든 방법 실패, 기본 이미지 사용: {artist} - {track}")
         # Frontend에서 기본 이미지 URL을 사용하도록 redirect
-        return redirect('/images/default-album.svg')
+        return with_source(redirect('/images/default-album.svg'), 'default')
         
     except Exception as e:
         logger.error(f"이미지 API 에러: {e}")
         return jsonify({'error': str(e)}), 500
 
+# 벌크 요청 최대 항목 수 (트렌딩 100개 + 여유)
+MAX_RESOLVE_ITEMS = 200
+
+@album_image_bp.route('/api/album-images/resolve', methods=['POST'])
+def resolve_album_images():
+    """벌크 이미지 해석 API - 리스트 페이지용 (리다이렉트 없이 최종 URL 반환)
+
+    Body:
+        {"items": [{"artist": "...", "track": "...", "size": 300}, ...]}
+        또는 {"items": [["artist", "track", 300], ...]}
+        "webp": true/false (생략 시 Accept 헤더로 결정)
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+        raw_items = payload.get('items')
+
+        if not isinstance(raw_items, list):
+            return jsonify({'success': False, 'error': 'items must be a list'}), 400
+        if len(raw_items) > MAX_RESOLVE_ITEMS:
+            return jsonify({
+                'success': False,
+                'error': f'too many items (max {MAX_RESOLVE_ITEMS})'
+            }), 400
+
+        items = []
+        for raw in raw_items:
+            if isinstance(raw, dict):
+                artist, track, size = raw.get('artist'), raw.get('track'), raw.get('size', 640)
+            elif isinstance(raw, (list, tuple)) and len(raw) >= 2:
+                artist, track = raw[0], raw[1]
+                size = raw[2] if len(raw) > 2 else 640
+            else:
+                return jsonify({'success': False, 'error': f'invalid item: {raw!r}'}), 400
+
+            try:
+                size = int(size)
+            except (TypeError, ValueError):
+                size = 640
+
+            items.append((str(artist or ''), str(track or ''), size))
+
+        image_manager = get_image_manager() if LOCAL_IMAGE_ENABLED else None
+
+        conn = get_db_connection()
+        try:
+            webp = payload.get('webp')
+            if webp is None:
+                webp = accepts_webp(request.headers.get('Accept'))
+            results = resolve_batch(items, conn=conn, image_manager=image_manager, webp=bool(webp))
+        finally:
+            if conn:
+                conn.close()
+
+        logger.info(f"벌크 이미지 해석: {len(results)}개")
+
+        return jsonify({
+            'success': True,
+            'images': results,
+            'count': len(results)
+        })
+
+    except Exception as e:
+        logger.error(f"벌크 이미지 API 에러: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# 해시 URL 이미지 MIME 타입
+HASHED_MIMETYPES = {
+    'jpg': 'image/jpeg',
+    'png': 'image/png',
+    'webp': 'image/webp',
+}
+
+@album_image_bp.route('/img/<name>')
+def serve_hashed_image(name):
+    """콘텐츠 해시 URL 이미지 서빙 - 내용이 바뀌면 URL도 바뀌므로 immutable 캐시"""
+    path = get_image_store().resolve_name(name)
+    if not path:
+        return jsonify({'error': 'Image not found'}), 404
+
+    response = send_image(
+        path.parent,
+        path.name,
+        mimetype=HASHED_MIMETYPES.get(path.suffix.lstrip('.'), 'image/jpeg'),
+        max_age=31536000  # 1년
+    )
+    response.cache_control.immutable = True
+    return response
+
+@album_image_bp.route('/api/image-downloads/stats')
+def get_image_download_stats():
+    """이미지 다운로드 워커 풀 메트릭 (처리량 / 큐 길이)"""
+    try:
+        return jsonify(get_downloader().get_stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @album_image_bp.route('/api/image-stats')
 def get_image_stats():
-    """이미지 시스템 통계"""
+    """이미지 시스템 통계 - 증분 카운터 조회 (?recount=1: 관리자 전체 재계산)"""
     try:
-        stats = {}
-        
-        # 로컬 이미지 통계
-        if LOCAL_IMAGE_ENABLED:
-            image_manager = get_image_manager()
-            stats = image_manager.get_stats()
+        image_stats = get_image_stats_store()
+
+        if request.args.get('recount') == '1':
+            admin_key = request.headers.get('X-Admin-Key')
+            if not admin_key or admin_key != os.getenv('ADMIN_SECRET_KEY'):
+                return jsonify({'error': 'Unauthorized'}), 401
+            stats = image_stats.recount()
         else:
-            # 수동 통계
-            base_path = Path(__file__).parent.parent
-            track_images_dir = base_path / 'static' / 'track_images'
-            
-            if track_images_dir.exists():
-                image_files = list(track_images_dir.glob("*.jpg"))
-                total_size = sum(f.stat().st_size for f in image_files)
-                
-                mapping_file = track_images_dir / 'download_mapping.json'
-                mapping_count = 0
-                if mapping_file.exists():
-                    with open(mapping_file, 'r', encoding='utf-8') as f:
-                        mapping = json.load(f)
-                        mapping_count = len(mapping)
-                
-                stats = {
-                    'total_images': len(image_files),
-                    'total_mappings': mapping_count,
-                    'disk_usage_mb': round(total_size / (1024 * 1024), 2),
-                    'local_image_system': False
-                }
-        
+            stats = image_stats.get_stats()
+
+        stats['local_image_system'] = LOCAL_IMAGE_ENABLED
         return jsonify(stats)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -8,6 +8,9 @@ KPOP Ranker - 고화질 이미지 지원 API 샘플 코드
 from flask import Flask, request, redirect, send_file, jsonify
 import requests
 import os
+from pathlib import Path
+
+from image_store import conditional_headers, content_hash, detect_ext, get_image_store, link_or_copy
 
 app = Flask(__name__)
 
@@ -116,17 +119,30 @@ def save_high_quality_image(artist, track, db_connection):
         image_url = images[0]['url']
         image_size = f"{images[0].get('width', 640)}x{images[0].get('height', 640)}"
 
-        # 3. 이미지 다운로드 (선택사항)
-        response = requests.get(image_url, timeout=10)
-        if response.status_code == 200:
-            # 로컬에 저장
-            os.makedirs('static/track_images', exist_ok=True)
-            local_path = f'static/track_images/{artist}_{track}_HQ.jpg'
-
-            with open(local_path, 'wb') as f:
-                f.write(response.content)
-
-            print(f"✅ 고화질 이미지 저장: {artist} - {track} ({image_size})")
+        # 3. 이미지 다운로드 - 이전에 받은 URL이면 조건부 요청 (304 / 내용 동일 시 쓰기 생략)
+        store = get_image_store()
+        source = store.get_source(image_url)
+        local_path = f'static/track_images/{artist}_{track}_HQ.jpg'
+
+        response = requests.get(image_url, headers=conditional_headers(source), timeout=10)
+        if response.status_code == 304:
+            print(f"⏭️  변경 없음 (304): {artist} - {track} "
+                  f"({(source['content_length'] or 0) / 1024:.1f}KB 절약)")
+            if not os.path.exists(local_path):
+                link_or_copy(store.blob_path(source['hash'], source['ext']), Path(local_path))
+            store.record_source(image_url, source['hash'], source['ext'], response.headers)
+        elif response.status_code == 200:
+            if source and content_hash(response.content) == source['hash'] and os.path.exists(local_path):
+                print(f"⏭️  변경 없음 (해시 동일): {artist} - {track}")
+            else:
+                # 로컬에 저장 (콘텐츠 주소 저장소 + 기존 파일명 링크)
+                os.makedirs('static/track_images', exist_ok=True)
+                hash_value, ext, saved_path = store.put(response.content, artist, track, source_url=image_url)
+                link_or_copy(saved_path, Path(local_path))
+
+                print(f"✅ 고화질 이미지 저장: {artist} - {track} ({image_size})")
+            store.record_source(image_url, content_hash(response.content), detect_ext(response.content),
+                                response.headers, len(response.content))
 
         # 4. DB에 저장
         cursor = db_connection.cursor()
@@ -21,6 +21,10 @@ import re
 import json
 from dotenv import load_dotenv
 
+from image_serving import send_image
+from api_payloads import statistics_payload, trending_rows
+from prerender import get_prerendered
+
 # 🚀 Gzip 압축 (응답 크기 60-80% 감소)
 try:
     from flask_compress import Compress
@@ -351,109 +355,14 @@ class TrendingService:
         """trending 데이터 with 고화질 이미지 우선"""
         conn = sqlite3.connect(str(self.db_path))
         conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
         
         try:
-            # 최신 데이터만 + 중복 완전 제거
-            query = """
-            WITH latest_per_chart AS (
-                SELECT chart_name, MAX(created_at) as latest_time
-                FROM unified_master_with_images
-                WHERE chart_name NOT IN ('billboard', 'vibe')
-                GROUP BY chart_name
-            ),
-            dedup_tracks AS (
-                SELECT 
-                    UPPER(TRIM(
-                        REPLACE(REPLACE(
-                            REPLACE(REPLACE(
-                                REPLACE(REPLACE(m.unified_artist, 'like ', ''), 'LIKE ', ''),
-                                '(', ''), ')', ''),
-                            '[', ''), ']', '')
-                    )) as norm_artist,
-                    UPPER(TRIM(
-                        REPLACE(REPLACE(
-                            REPLACE(REPLACE(
-                                REPLACE(REPLACE(m.unified_track, 'like ', ''), 'LIKE ', ''),
-                                '(', ''), ')', ''),
-                            '[', ''), ']', '')
-                    )) as norm_track,
-                    m.unified_artist as display_artist,
-                    m.unified_track as display_track,
-                    m.chart_name,
-                    m.rank_position,
-                    m.local_image,
-                    m.created_at
-                FROM unified_master_with_images m
-                INNER JOIN latest_per_chart l 
-                    ON m.chart_name = l.chart_name 
-                    AND m.created_at = l.latest_time
-                WHERE m.rank_position IS NOT NULL 
-                    AND m.rank_position > 0
-                    AND m.unified_artist IS NOT NULL 
-                    AND m.unified_track IS NOT NULL
-            ),
-            aggregated AS (
-                SELECT 
-                    display_artist as artist,
-                    display_track as track,
-                    COUNT(DISTINCT chart_name) as chart_count,
-                    GROUP_CONCAT(chart_name || ':' || rank_position) as positions,
-                    AVG(CAST(rank_position AS REAL)) as avg_rank,
-                    MIN(rank_position) as best_rank,
-                    MAX(CASE WHEN local_image IS NOT NULL THEN local_image END) as image_file
-                FROM dedup_tracks
-                GROUP BY norm_artist, norm_track
-                HAVING chart_count >= 1
-            )
-            SELECT *,
-                   (COUNT(*) OVER()) as total_count,
-                   ((51 - avg_rank) + (chart_count * 10)) as score
-            FROM aggregated
-            ORDER BY chart_count DESC, avg_rank ASC
-            LIMIT ?
-            """
-            
-            cursor.execute(query, (limit,))
-            rows = cursor.fetchall()
-            
-            results = []
-            for row in rows:
-                # 차트별 순위 파싱
-                charts = {}
-                positions_str = row['positions'] or ""
-                for pos in positions_str.split(','):
-                    if ':' in pos:
-                        chart, rank = pos.split(':', 1)
-                        try:
-                            charts[chart.strip()] = int(rank.strip())
-                        except ValueError:
-                            pass
-                
-                # ✅ 새로운 이미지 URL 생성 - URL 인코딩 추가
-                from urllib.parse import quote
-                artist_encoded = quote(row['artist'] if row['artist'] else '')
-                track_encoded = quote(row['track'] if row['track'] else '')
-                image_url = f"/api/album-image-smart/{artist_encoded}/{track_encoded}"
-                
-                results.append({
-                    'artist': row['artist'],
-                    'track': row['track'], 
-                    'charts': charts,
-                    'chart_count': row['chart_count'],
-                    'best_rank': row['best_rank'],
-                    'avg_rank': round(row['avg_rank'], 1),
-                    'score': round(row['score'], 1),
-                    'image_url': image_url  # 새로운 API 사용
-                })
-            
-            conn.close()
-            return results
-            
+            return trending_rows(conn, limit)
         except Exception as e:
-            conn.close()
             logger.error(f"Trending query failed: {e}")
             return []
+        finally:
+            conn.close()
 
 # trending 서비스 초기화
 trending_service = TrendingService()
@@ -467,6 +376,11 @@ def get_trending():
         
         logger.info(f"Trending API 호출: limit={limit}")
         
+        # 파이프라인이 미리 만든 응답 (현재 데이터 버전일 때만)
+        prerendered = get_prerendered(f"trending-{limit}")
+        if prerendered is not None:
+            return prerendered
+        
         trending_data = trending_service.get_trending(limit)
         
         return jsonify({
@@ -493,65 +407,15 @@ def get_trending():
 def get_statistics():
     """통계 API - 중복 제거된 실제 데이터"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # 중복 제거된 아티스트 수 (대소문자 구분없이)
-        cursor.execute("""
-            SELECT COUNT(DISTINCT UPPER(TRIM(unified_artist))) 
-            FROM unified_master_with_images 
-            WHERE unified_artist IS NOT NULL 
-            AND unified_artist != ''
-        """)
-        unique_artists = cursor.fetchone()[0] or 0
-        
-        # 중복 제거된 트랙 수
-        cursor.execute("""
-            SELECT COUNT(DISTINCT UPPER(TRIM(unified_artist || '::' || unified_track))) 
-            FROM unified_master_with_images 
-            WHERE unified_artist IS NOT NULL 
-            AND unified_track IS NOT NULL
-            AND unified_artist != '' 
-            AND unified_track != ''
-        """)
-        unique_tracks = cursor.fetchone()[0] or 0
-        
-        # 활성 차트 수
-        cursor.execute("""
-            SELECT COUNT(DISTINCT chart_name) 
-            FROM unified_master_with_images
-            WHERE created_at >= datetime('now', '-7 days')
-        """)
-        active_charts = cursor.fetchone()[0] or 0
+        prerendered = get_prerendered('statistics')
+        if prerendered is not None:
+            return prerendered
         
-        # 최근 업데이트 시간
-        cursor.execute("""
-            SELECT MAX(created_at) 
-            FROM unified_master_with_images
-        """)
-        last_update_row = cursor.fetchone()
-        last_update = last_update_row[0] if last_update_row and last_update_row[0] else ''
-        
-        conn.close()
-        
-        logger.info(f"📊 통계 API: 아티스트 {unique_artists}, 트랙 {unique_tracks}, 차트 {active_charts}")
-        
-        return jsonify({
-            'success': True,
-            'statistics': {
-                'summary': {
-                    'unique_artists': unique_artists,
-                    'unique_tracks': unique_tracks,
-                    'active_charts': active_charts,
-                    'last_update': last_update
-                },
-                # 호환성을 위해 기존 형식도 유지
-                'artists': unique_artists,
-                'tracks': unique_tracks,
-                'charts': active_charts
-            },
-            'timestamp': datetime.now().isoformat()
-        })
+        conn = get_db_connection()
+        try:
+            return jsonify(statistics_payload(conn))
+        finally:
+            conn.close()
         
     except Exception as e:
         logger.error(f"Statistics API error: {e}")
@@ -668,18 +532,18 @@ def get_ui_translations():
 
 @app.route('/static/track_images/<path:filename>')
 def serve_track_image(filename):
-    """트랙 이미지 정적 파일 서빙 (고화질)"""
+    """트랙 이미지 정적 파일 서빙 (고화질) - 프록시 오프로드 / 조건부 요청 지원"""
     try:
-        return send_from_directory('static/track_images', filename)
+        return send_image(BASE_DIR / 'static' / 'track_images', filename)
     except Exception as e:
         logger.error(f"Static track image error: {e}")
         return jsonify({'error': 'File not found'}), 404
 
 @app.route('/static/album_images/<path:filename>')
 def serve_album_image(filename):
-    """앨범 이미지 정적 파일 서빙 (호환성)"""
+    """앨범 이미지 정적 파일 서빙 (호환성) - 프록시 오프로드 / 조건부 요청 지원"""
     try:
-        return send_from_directory('static/album_images', filename)
+        return send_image(BASE_DIR / 'static' / 'album_images', filename)
     except Exception as e:
         logger.error(f"Static album image error: {e}")
         return jsonify({'error': 'File not found'}), 404
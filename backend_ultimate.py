@@ -5,13 +5,19 @@ Ultimate System v21 Final - 크롤러 형식 호환 버전
 모든 크롤러 반환 형식과 호환
 """
 
-import schedule
+import threading
 import time
 import logging
-from datetime import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
 from pathlib import Path
 import sqlite3
 
+from crawler_registry import get_crawler_registry
+from chart_pointer import ensure_latest_pointer, get_pointer, set_published_pointer, set_snapshot_pointer
+from snapshot_delta import SNAPSHOT_STORAGE, ensure_delta_tables, get_snapshot, write_snapshot
+
 # 로깅 설정
 logging.basicConfig(
     level=logging.INFO,
@@ -23,6 +29,69 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 크롤러 병렬 실행 (차트별 타임아웃, 초 - crawler_config의 'timeout'으로 개별 지정 가능)
+CRAWL_WORKERS = int(os.getenv('CRAWL_WORKERS', '8'))
+CRAWL_TIMEOUT = int(os.getenv('CRAWL_TIMEOUT', '300'))
+# 제출 후 시작하지 못한 크롤러의 전체 마감 (초, 0이면 워커 수 기준 자동 계산)
+CRAWL_DEADLINE = int(os.getenv('CRAWL_DEADLINE', '0'))
+
+RAW_INSERT_SQL = """
+    INSERT INTO raw_chart_data
+    (chart_name, rank, title, artist, track, image_url,
+     views_or_streams, streams, crawled_at, batch_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+SNAPSHOT_INSERT_SQL = """
+    INSERT INTO chart_snapshots
+    (chart_name, rank_position, artist, track, album,
+     image_url, views_or_streams, snapshot_time)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+METADATA_UPSERT_SQL = """
+    INSERT OR REPLACE INTO chart_metadata
+    (chart_name, last_update, total_tracks, is_active)
+    VALUES (?, ?, ?, 1)
+"""
+
+def raw_rows(chart_name, data, crawled_at, batch_id=None):
+    """크롤링 항목 → raw_chart_data 파라미터 튜플 (track 또는 title 사용)"""
+    rows = []
+    for item in data:
+        track_name = item.get('track') or item.get('title', '')
+        rows.append((
+            chart_name,
+            item.get('rank'),
+            track_name,
+            item.get('artist', ''),
+            track_name,
+            item.get('image_url', ''),
+            item.get('views_or_streams', ''),
+            item.get('streams', ''),
+            crawled_at,
+            batch_id
+        ))
+    return rows
+
+def snapshot_rows(chart_name, tracks, snapshot_time):
+    """(rank, artist, track, image_url, views) 목록 → chart_snapshots 파라미터 튜플"""
+    rows = []
+    for rank, artist, track, image_url, views_data in tracks:
+        if not artist or not track:
+            continue
+        rows.append((
+            chart_name,
+            rank if rank else len(rows) + 1,
+            artist.strip(),
+            track.strip(),
+            '',
+            image_url or '',
+            views_data or '',
+            snapshot_time
+        ))
+    return rows
+
 class UltimateSystemV21Final:
     """완전 통합 자동화 시스템 - 최종 버전"""
 
@@ -43,10 +112,81 @@ class UltimateSystemV21Final:
             'youtube': {'file': 'youtube_crawler', 'class': 'YouTubeCrawler'}
         }
 
+        # 크롤러 인스턴스 / HTTP 세션 / 토큰을 실행 사이에 유지
+        self.crawlers = get_crawler_registry(self.crawler_config)
+
+        # DB 단계 공용 쓰기 연결 - 스레드 / DB 경로별로 한 번만 연결
+        # (스케줄러가 차트별 파이프라인을 서로 다른 스레드에서 동시에 실행)
+        self._local = threading.local()
+
+        # 공개 단계 (unified_master 교체 → 이미지 프리웜 → 프리렌더) 직렬화
+        # 크롤링 / 시계열 처리는 차트별로 동시에, 공개는 한 번에 하나씩 (기존 순차 실행과 같은 결과)
+        self._publish_lock = threading.RLock()
+
         logger.info("Ultimate System v21 Final 초기화 완료")
 
+    def writer(self, db_path):
+        """공용 쓰기 연결 (파이프라인 실행 동안 재사용)"""
+        writers = self._local.__dict__.setdefault('writers', {})
+        key = str(db_path)
+        conn = writers.get(key)
+        if conn is None:
+            conn = sqlite3.connect(key, timeout=30)
+            writers[key] = conn
+        return conn
+
+    def close_writers(self):
+        for conn in self._local.__dict__.pop('writers', {}).values():
+            conn.close()
+
     def ensure_tables(self):
         """필요한 테이블 확인 및 생성"""
+        conn_raw = self.writer(self.raw_db)
+        conn_raw.execute("""
+            CREATE TABLE IF NOT EXISTS raw_chart_data (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chart_name TEXT NOT NULL,
+                rank INTEGER,
+                title TEXT,
+                artist TEXT,
+                track TEXT,
+                image_url TEXT,
+                views_or_streams TEXT,
+                streams TEXT,
+                crawled_at TIMESTAMP
+            )
+        """)
+        conn_raw.execute("""
+            CREATE INDEX IF NOT EXISTS idx_raw_chart_crawled
+            ON raw_chart_data(chart_name, crawled_at)
+        """)
+
+        # 크롤링 배치 (raw 행은 batch_id로 묶음, 완료된 배치만 시계열 처리)
+        conn_raw.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_batches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chart_name TEXT NOT NULL,
+                started_at TIMESTAMP NOT NULL,
+                finished_at TIMESTAMP,
+                row_count INTEGER DEFAULT 0,
+                status TEXT NOT NULL,
+                error TEXT
+            )
+        """)
+        conn_raw.execute("""
+            CREATE INDEX IF NOT EXISTS idx_crawl_batches_chart
+            ON crawl_batches(chart_name, status, id)
+        """)
+
+        columns = {row[1] for row in conn_raw.execute("PRAGMA table_info(raw_chart_data)")}
+        if 'batch_id' not in columns:
+            conn_raw.execute("ALTER TABLE raw_chart_data ADD COLUMN batch_id INTEGER")
+        conn_raw.execute("""
+            CREATE INDEX IF NOT EXISTS idx_raw_batch
+            ON raw_chart_data(batch_id)
+        """)
+        conn_raw.commit()
+
         conn = sqlite3.connect(str(self.final_db))
         cursor = conn.cursor()
 
@@ -103,6 +243,7 @@ class UltimateSystemV21Final:
                     image_url TEXT,
                     views_or_streams TEXT,
                     local_image TEXT,
+                    resolved_image TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
@@ -112,50 +253,78 @@ class UltimateSystemV21Final:
                 ON unified_master_with_images(chart_name, rank_position)
             """)
 
+        # resolved_image 컬럼 (기존 테이블 마이그레이션)
+        cursor.execute("PRAGMA table_info(unified_master_with_images)")
+        columns = {row[1] for row in cursor.fetchall()}
+        if 'resolved_image' not in columns:
+            cursor.execute("ALTER TABLE unified_master_with_images ADD COLUMN resolved_image TEXT")
+
         conn.commit()
+
+        # 델타 저장 모드 테이블 (snapshot_delta.py)
+        if SNAPSHOT_STORAGE == 'delta':
+            ensure_delta_tables(conn)
+
+        # 차트별 최신 스냅샷 포인터 (없으면 기존 데이터로 채움)
+        ensure_latest_pointer(conn)
         conn.close()
 
+    def load_crawler_class(self, chart_name):
+        """크롤러 클래스 (설정 없으면 None) - 이미 import된 모듈은 다시 읽지 않음"""
+        config = self.crawler_config.get(chart_name)
+        if not config:
+            return None
+
+        from importlib import import_module
+        module = import_module(f'crawlers.{config["file"]}')
+        return getattr(module, config['class'])
+
+    def fetch_chart(self, chart_name, crawler_class=None):
+        """크롤링만 실행 → 항목 리스트 (DB 저장 없음, 워커 스레드에서 호출 가능)
+
+        반환 형식 처리: {'data': [...]} dict 또는 리스트 직접 반환 모두 지원
+        """
+        crawler_class = crawler_class or self.load_crawler_class(chart_name)
+        if crawler_class is None:
+            raise ValueError(f"{chart_name}: 설정 없음")
+
+        # 레지스트리의 인스턴스 재사용 (연결 풀 세션 / 토큰 유지)
+        result = self.crawlers.crawl(chart_name, crawler_class)
+
+        if isinstance(result, dict):
+            return result.get('data', [])
+        if isinstance(result, list):
+            return result
+        raise ValueError(f"{chart_name}: 알 수 없는 반환 형식")
+
+    def store_chart_data(self, chart_name, data, started_at=None):
+        """크롤링 결과 저장 (Raw DB / Spotify ID / 이미지 예약) → 성공 여부"""
+        if not data:
+            logger.warning(f"❌ {chart_name}: 데이터 없음")
+            self.record_failed_batch(chart_name, 'empty', started_at)
+            return False
+
+        self.normalize_image_urls(data)
+        self.save_to_raw_db(chart_name, data, started_at=started_at)
+        self.save_spotify_ids(data)
+        logger.info(f"✅ {chart_name}: {len(data)}개 크롤링 완료")
+
+        # 고화질 이미지 처리 시도 (전체 순위)
+        self.try_high_quality_images(chart_name, data)
+
+        return True
+
     def run_crawler(self, chart_name):
         """개별 크롤러 실행 - 모든 반환 형식과 호환"""
         try:
-            config = self.crawler_config.get(chart_name)
-            if not config:
+            if chart_name not in self.crawler_config:
                 logger.warning(f"❌ {chart_name}: 설정 없음")
                 return False
 
             logger.info(f"🕷️ {chart_name} 크롤링 시작...")
-
-            # 크롤러 import
-            from importlib import import_module
-            module = import_module(f'crawlers.{config["file"]}')
-            crawler_class = getattr(module, config['class'])
-            crawler = crawler_class()
-
-            # 크롤링 실행
-            result = crawler.crawl()
-
-            # 반환 형식 처리 (dict 또는 list 모두 지원)
-            if isinstance(result, dict):
-                # {'data': [...]} 형식
-                data = result.get('data', [])
-            elif isinstance(result, list):
-                # 리스트 직접 반환
-                data = result
-            else:
-                logger.warning(f"❌ {chart_name}: 알 수 없는 반환 형식")
-                return False
-
-            if data:
-                self.save_to_raw_db(chart_name, data)
-                logger.info(f"✅ {chart_name}: {len(data)}개 크롤링 완료")
-
-                # 고화질 이미지 처리 시도
-                self.try_high_quality_images(chart_name, data[:10])
-
-                return True
-            else:
-                logger.warning(f"❌ {chart_name}: 데이터 없음")
-                return False
+            started_at = datetime.now().isoformat()
+            data = self.fetch_chart(chart_name)
+            return self.store_chart_data(chart_name, data, started_at)
 
         except Exception as e:
             logger.error(f"❌ {chart_name} 크롤링 실패: {e}")
@@ -163,191 +332,611 @@ class UltimateSystemV21Final:
             logger.error(traceback.format_exc())
             return False
 
-    def try_high_quality_images(self, chart_name, data):
-        """고화질 이미지 다운로드 시도"""
-        try:
-            from local_image_manager import get_image_manager
-            manager = get_image_manager()
-
-            success = 0
-            for item in data:
-                if 'image_url' in item and item['image_url']:
-                    if manager.download_and_save(
-                        item['image_url'],
-                        item.get('artist', ''),
-                        item.get('track', item.get('title', ''))
-                    ):
-                        success += 1
-
-            if success > 0:
-                logger.info(f"  🖼️ {success}개 고화질 이미지 다운로드")
-        except:
-            pass  # 실패해도 계속 진행
-
-    def save_to_raw_db(self, chart_name, data):
-        """Raw DB에 저장"""
-        conn = sqlite3.connect(str(self.raw_db))
-        cursor = conn.cursor()
+    def crawl_charts(self, charts):
+        """크롤러 병렬 실행 + 차트별 타임아웃, DB 단계는 차트 순서대로 메인 스레드에서
 
-        crawled_at = datetime.now().isoformat()
+        크롤링(네트워크)만 스레드 풀에서 동시에 돌리고, 끝난 차트부터 순서대로
+        raw 저장 → 시계열 처리를 진행한다. 타임아웃된 크롤러 스레드는 강제 종료할 수 없으므로
+        결과를 버리고 기다리지 않는다 (시작 전이면 취소).
+        멈춘 크롤러가 워커를 계속 잡고 있으면 대기 중인 차트가 영영 시작하지 못하므로
+        제출 시점부터의 전체 마감이 지나도록 시작하지 못한 차트도 타임아웃 처리 후 취소한다.
 
-        for item in data:
-            # track 또는 title 사용
-            track_name = item.get('track') or item.get('title', '')
+        → (성공한 차트 목록, 실행 요약 dict)
+        """
+        wall_start = time.time()
+        results = {}
+        started = {}
+        durations = {}
 
-            cursor.execute("""
-                INSERT INTO raw_chart_data
-                (chart_name, rank, title, artist, track, image_url,
-                 views_or_streams, streams, crawled_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                chart_name,
-                item.get('rank'),
-                track_name,
-                item.get('artist', ''),
-                track_name,
-                item.get('image_url', ''),
-                item.get('views_or_streams', ''),
-                item.get('streams', ''),
-                crawled_at
-            ))
+        def crawl(chart, crawler_class):
+            started[chart] = time.time()
+            try:
+                return self.fetch_chart(chart, crawler_class)
+            finally:
+                durations[chart] = time.time() - started[chart]
 
-        conn.commit()
-        conn.close()
+        workers = max(1, min(CRAWL_WORKERS, len(charts)))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='crawler')
+        futures = {}
+        for chart in charts:
+            try:
+                crawler_class = self.load_crawler_class(chart)
+            except Exception as e:
+                logger.error(f"❌ {chart} 크롤러 로드 실패: {e}")
+                results[chart] = 'failed'
+                self.record_failed_batch(chart, 'failed', error=str(e))
+                continue
+            if crawler_class is None:
+                logger.warning(f"❌ {chart}: 설정 없음")
+                results[chart] = 'failed'
+                continue
 
-    def process_to_timeseries(self, chart_name):
-        """시계열 처리"""
-        logger.info(f"📊 {chart_name} 시계열 처리...")
+            logger.info(f"🕷️ {chart} 크롤링 시작...")
+            futures[chart] = executor.submit(crawl, chart, crawler_class)
 
-        conn_raw = sqlite3.connect(str(self.raw_db))
-        conn_final = sqlite3.connect(str(self.final_db))
+        # 모든 차트가 워커 수만큼씩 차례로 타임아웃까지 돌아도 끝나는 시간
+        if CRAWL_DEADLINE > 0:
+            deadline_seconds = CRAWL_DEADLINE
+        else:
+            rounds = -(-len(futures) // workers)
+            longest = max((self.crawler_config[chart].get('timeout', CRAWL_TIMEOUT) for chart in futures),
+                          default=CRAWL_TIMEOUT)
+            deadline_seconds = rounds * longest
+        deadline = wall_start + deadline_seconds
 
-        cursor_raw = conn_raw.cursor()
-        cursor_final = conn_final.cursor()
+        succeeded = []
+        try:
+            for chart in charts:
+                future = futures.get(chart)
+                if future is None:
+                    continue
+
+                timeout = self.crawler_config[chart].get('timeout', CRAWL_TIMEOUT)
+                # 대기 시간은 제외하고 실제 크롤링 시작 시점부터 타임아웃 계산
+                # (시작 전이면 제출 시점부터의 전체 마감 기준)
+                while True:
+                    done, _ = wait([future], timeout=1.0)
+                    if done:
+                        break
+                    if chart in started:
+                        if time.time() - started[chart] > timeout:
+                            break
+                    elif time.time() > deadline:
+                        break
+
+                started_at = datetime.fromtimestamp(started.get(chart, wall_start)).isoformat()
+
+                if not future.done():
+                    if future.cancel():
+                        reason = f"전체 마감 {deadline_seconds}초 안에 시작 못 함"
+                    else:
+                        durations.setdefault(chart, time.time() - started.get(chart, time.time()))
+                        reason = f"{timeout}초 초과"
+                    logger.error(f"⏱️ {chart} 크롤링 타임아웃 ({reason}) - 결과 무시")
+                    results[chart] = 'timeout'
+                    self.record_failed_batch(chart, 'timeout', started_at, reason)
+                    continue
+
+                try:
+                    data = future.result()
+                    if self.store_chart_data(chart, data, started_at) and self.process_to_timeseries(chart):
+                        succeeded.append(chart)
+                        results[chart] = 'ok'
+                    else:
+                        results[chart] = 'empty'
+                except Exception as e:
+                    logger.error(f"❌ {chart} 실패: {e}")
+                    results[chart] = 'failed'
+                    self.record_failed_batch(chart, 'failed', started_at, str(e))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        wall_seconds = time.time() - wall_start
+        crawl_seconds = sum(durations.values())
+        summary = {
+            'charts': {
+                chart: {'status': results.get(chart, 'failed'),
+                        'crawl_seconds': round(durations.get(chart, 0.0), 1),
+                        'http': self.crawlers.last_run(chart) if chart in durations else None}
+                for chart in charts
+            },
+            'workers': workers,
+            'wall_seconds': round(wall_seconds, 1),
+            'crawl_seconds_sum': round(crawl_seconds, 1),
+            'speedup': round(crawl_seconds / wall_seconds, 2) if wall_seconds else None,
+        }
 
-        # 최신 크롤링 가져오기
-        cursor_raw.execute("""
-            SELECT DISTINCT crawled_at
-            FROM raw_chart_data
-            WHERE chart_name = ?
-            ORDER BY crawled_at DESC
-            LIMIT 1
-        """, (chart_name,))
+        logger.info(f"  ⏱️ 크롤링: 실제 {summary['wall_seconds']}초 / 차트별 합계 {summary['crawl_seconds_sum']}초 "
+                    f"(워커 {workers}개, {summary['speedup']}배)")
+        for chart, info in summary['charts'].items():
+            http = info['http']
+            http_info = f", 요청 {http['requests']}개 / 새 연결 {http['connections']}개" if http else ''
+            logger.info(f"    {chart}: {info['status']} ({info['crawl_seconds']}초{http_info})")
 
-        latest_crawl = cursor_raw.fetchone()
-        if not latest_crawl:
-            conn_raw.close()
-            conn_final.close()
-            return False
+        return succeeded, summary
 
-        latest_crawl = latest_crawl[0]
-        time_prefix = latest_crawl[:19]
-
-        # 데이터 가져오기
-        cursor_raw.execute("""
-            SELECT
-                rank,
-                artist,
-                COALESCE(track, title, '') as track_name,
-                image_url,
-                COALESCE(views_or_streams, streams, '') as views_data
-            FROM raw_chart_data
-            WHERE chart_name = ?
-            AND crawled_at LIKE ?
-            ORDER BY rank
-        """, (chart_name, time_prefix + '%'))
-
-        tracks = cursor_raw.fetchall()
-
-        # chart_snapshots에 저장
-        saved = 0
-        for rank, artist, track, image_url, views_data in tracks:
-            if not artist or not track:
-                continue
+    def try_high_quality_images(self, chart_name, data):
+        """고화질 이미지 다운로드 예약 (전체 순위, 워커 풀에서 병렬 처리)"""
+        try:
+            from image_downloader import get_downloader
+            downloader = get_downloader()
 
-            cursor_final.execute("""
-                INSERT INTO chart_snapshots
-                (chart_name, rank_position, artist, track, album,
-                 image_url, views_or_streams, snapshot_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                chart_name,
-                rank if rank else saved + 1,
-                artist.strip(),
-                track.strip(),
-                '',
-                image_url or '',
-                views_data or '',
-                latest_crawl
-            ))
-            saved += 1
+            queued = downloader.enqueue_many(data, chart_name=chart_name)
+            if queued > 0:
+                logger.info(f"  🖼️ {queued}개 고화질 이미지 다운로드 예약")
 
-        conn_final.commit()
+            stats = downloader.get_stats()
+            logger.info(f"  📥 다운로드 큐: {stats['queue_depth']}개 대기, "
+                        f"{stats['throughput_per_min']}개/분")
+        except Exception as e:
+            logger.warning(f"이미지 다운로드 예약 실패: {e}")  # 실패해도 계속 진행
 
-        # metadata 업데이트
-        cursor_final.execute("""
-            INSERT OR REPLACE INTO chart_metadata
-            (chart_name, last_update, total_tracks, is_active)
-            VALUES (?, ?, ?, 1)
-        """, (chart_name, latest_crawl, saved))
+    def normalize_image_urls(self, data):
+        """수집 시점 CDN 이미지 URL을 최고 화질 단계로 변환 (저장/다운로드 공통)"""
+        try:
+            from cdn_rules import best_image_url
+        except ImportError:
+            return
 
-        conn_final.commit()
-        logger.info(f"✅ {chart_name}: {saved}개 저장")
+        upgraded = 0
+        for item in data:
+            image_url = item.get('image_url')
+            if image_url:
+                best_url = best_image_url(image_url)
+                if best_url != image_url:
+                    item['image_url'] = best_url
+                    upgraded += 1
+
+        if upgraded:
+            logger.info(f"  🔼 CDN 고화질 URL 변환: {upgraded}개")
+
+    def save_spotify_ids(self, data):
+        """크롤러가 넘긴 Spotify 트랙/앨범 ID 저장 (재수집 시 다건 조회용)"""
+        rows = [
+            (item.get('artist'), item.get('track') or item.get('title'),
+             item.get('spotify_track_id'), item.get('spotify_album_id'), None)
+            for item in data
+            if item.get('spotify_track_id') or item.get('spotify_album_id')
+        ]
+        if not rows:
+            return
 
-        conn_raw.close()
-        conn_final.close()
+        try:
+            from spotify_ids import get_spotify_id_store
+            saved = get_spotify_id_store().save_many(rows)
+            logger.info(f"  🆔 Spotify ID 저장: {saved}개")
+        except Exception as e:
+            logger.warning(f"Spotify ID 저장 실패: {e}")
 
-        return saved > 0
+    def save_to_raw_db(self, chart_name, data, crawled_at=None, started_at=None):
+        """Raw DB에 저장 - 배치 행 + raw 행을 트랜잭션 1개로 (executemany) → batch_id
 
-    def update_unified_master(self):
-        """unified_master 업데이트"""
-        logger.info("🔄 unified_master 업데이트...")
+        배치는 raw 행과 함께 커밋되므로 'complete' 배치는 항상 행이 모두 들어 있다.
+        """
+        crawled_at = crawled_at or datetime.now().isoformat()
 
-        conn = sqlite3.connect(str(self.final_db))
-        cursor = conn.cursor()
+        conn = self.writer(self.raw_db)
+        with conn:
+            batch_id = conn.execute("""
+                INSERT INTO crawl_batches (chart_name, started_at, finished_at, row_count, status)
+                VALUES (?, ?, ?, ?, 'complete')
+            """, (chart_name, started_at or crawled_at, crawled_at, len(data))).lastrowid
+            conn.executemany(RAW_INSERT_SQL, raw_rows(chart_name, data, crawled_at, batch_id))
 
-        # 초기화
-        cursor.execute("DELETE FROM unified_master_with_images")
+        return batch_id
 
-        # 각 차트 최신 데이터 삽입
-        for chart_name in self.crawler_config.keys():
-            cursor.execute("""
-                INSERT INTO unified_master_with_images
-                (chart_name, rank_position, unified_artist, unified_track,
-                 original_artist, original_track, image_url, views_or_streams, created_at)
+    def record_failed_batch(self, chart_name, status, started_at=None, error=None):
+        """실패 / 타임아웃 / 빈 결과 크롤링 기록 (raw 행 없음, 시계열 처리 대상 아님)"""
+        try:
+            conn = self.writer(self.raw_db)
+            with conn:
+                conn.execute("""
+                    INSERT INTO crawl_batches (chart_name, started_at, finished_at, row_count, status, error)
+                    VALUES (?, ?, ?, 0, ?, ?)
+                """, (chart_name, started_at or datetime.now().isoformat(),
+                      datetime.now().isoformat(), status, error))
+        except Exception as e:
+            logger.warning(f"크롤링 배치 기록 실패: {chart_name}: {e}")
+
+    def process_to_timeseries(self, chart_name):
+        """시계열 처리 - 최신 크롤링을 chart_snapshots로 일괄 복사 (메타데이터 포함 트랜잭션 1개)"""
+        logger.info(f"📊 {chart_name} 시계열 처리...")
+
+        conn_raw = self.writer(self.raw_db)
+        conn_final = self.writer(self.final_db)
+
+        # 최신 완료 배치 (실패 / 타임아웃 / 빈 배치는 건너뜀)
+        batch = conn_raw.execute("""
+            SELECT id, finished_at
+            FROM crawl_batches
+            WHERE chart_name = ? AND status = 'complete'
+            ORDER BY id DESC
+            LIMIT 1
+        """, (chart_name,)).fetchone()
+
+        if batch:
+            batch_id, latest_crawl = batch
+            tracks = conn_raw.execute("""
                 SELECT
-                    chart_name,
-                    rank_position,
+                    rank,
                     artist,
-                    track,
+                    COALESCE(track, title, '') as track_name,
+                    image_url,
+                    COALESCE(views_or_streams, streams, '') as views_data
+                FROM raw_chart_data
+                WHERE batch_id = ?
+                ORDER BY rank
+            """, (batch_id,)).fetchall()
+        else:
+            # 배치 도입 전 데이터: 최신 crawled_at과 같은 초에 저장된 행
+            batch_id = None
+            latest_crawl = conn_raw.execute("""
+                SELECT MAX(crawled_at)
+                FROM raw_chart_data
+                WHERE chart_name = ?
+            """, (chart_name,)).fetchone()[0]
+
+            if not latest_crawl:
+                return False
+
+            time_prefix = latest_crawl[:19]
+            tracks = conn_raw.execute("""
+                SELECT
+                    rank,
                     artist,
-                    track,
+                    COALESCE(track, title, '') as track_name,
                     image_url,
-                    views_or_streams,
-                    snapshot_time
-                FROM chart_snapshots
+                    COALESCE(views_or_streams, streams, '') as views_data
+                FROM raw_chart_data
                 WHERE chart_name = ?
-                AND snapshot_time = (
-                    SELECT MAX(snapshot_time)
-                    FROM chart_snapshots
-                    WHERE chart_name = ?
+                AND crawled_at >= ? AND crawled_at < ?
+                ORDER BY rank
+            """, (chart_name, time_prefix, time_prefix + '\U0010ffff')).fetchall()
+
+        rows = snapshot_rows(chart_name, tracks, latest_crawl)
+
+        # chart_snapshots(또는 델타 프레임) + metadata + 최신 포인터 한 트랜잭션
+        with conn_final:
+            self.write_snapshots(conn_final, chart_name, [(latest_crawl, rows)])
+            conn_final.execute(METADATA_UPSERT_SQL, (chart_name, latest_crawl, len(rows)))
+            set_snapshot_pointer(conn_final, chart_name, latest_crawl, batch_id, len(rows))
+
+        logger.info(f"✅ {chart_name}: {len(rows)}개 저장")
+
+        return len(rows) > 0
+
+    def ingest_history(self, chart_name, crawls):
+        """히스토리 백필 - [(crawled_at, data)] 전체를 raw / chart_snapshots에 DB당 트랜잭션 1개로 저장
+
+        process_to_timeseries처럼 raw를 다시 읽지 않고 같은 입력에서 스냅샷 행을 바로 만든다.
+        → (raw 행 수, 스냅샷 행 수)
+        """
+        conn_raw = self.writer(self.raw_db)
+        raw = []
+        snapshots = []
+        frames = []
+        latest = None
+        latest_count = 0
+        latest_batch = None
+        with conn_raw:
+            for crawled_at, data in crawls:
+                batch_id = conn_raw.execute("""
+                    INSERT INTO crawl_batches (chart_name, started_at, finished_at, row_count, status)
+                    VALUES (?, ?, ?, ?, 'complete')
+                """, (chart_name, crawled_at, crawled_at, len(data))).lastrowid
+                chart_rows = raw_rows(chart_name, data, crawled_at, batch_id)
+                raw.extend(chart_rows)
+
+                tracks = sorted(
+                    ((row[1], row[3], row[4], row[5], row[6] if row[6] is not None else row[7])
+                     for row in chart_rows),
+                    key=lambda track: (track[0] is not None, track[0] or 0)
                 )
-                ORDER BY rank_position
-            """, (chart_name, chart_name))
+                chart_snapshots = snapshot_rows(chart_name, tracks, crawled_at)
+                snapshots.extend(chart_snapshots)
+                frames.append((crawled_at, chart_snapshots))
+
+                if latest is None or crawled_at > latest:
+                    latest, latest_count, latest_batch = crawled_at, len(chart_snapshots), batch_id
+
+            conn_raw.executemany(RAW_INSERT_SQL, raw)
+
+        conn_final = self.writer(self.final_db)
+        with conn_final:
+            self.write_snapshots(conn_final, chart_name, sorted(frames, key=lambda frame: frame[0]))
+            if latest:
+                previous = conn_final.execute(
+                    "SELECT last_update FROM chart_metadata WHERE chart_name = ?", (chart_name,)
+                ).fetchone()
+                if not previous or not previous[0] or previous[0] < latest:
+                    conn_final.execute(METADATA_UPSERT_SQL, (chart_name, latest, latest_count))
+                set_snapshot_pointer(conn_final, chart_name, latest, latest_batch, latest_count)
+
+        logger.info(f"📥 {chart_name} 히스토리 백필: 크롤링 {len(crawls)}회, "
+                    f"raw {len(raw)}행, 스냅샷 {len(snapshots)}행")
+        return len(raw), len(snapshots)
+
+    def write_snapshots(self, conn, chart_name, frames):
+        """[(snapshot_time, rows)] 저장 - SNAPSHOT_STORAGE=delta면 델타 프레임, 아니면 chart_snapshots 전체 행"""
+        if SNAPSHOT_STORAGE == 'delta':
+            for snapshot_time, rows in frames:
+                write_snapshot(conn, chart_name, snapshot_time, rows)
+        else:
+            conn.executemany(SNAPSHOT_INSERT_SQL, [row for _, rows in frames for row in rows])
+
+    def read_snapshot(self, conn, chart_name, snapshot_time):
+        """스냅샷 → [(rank, artist, track, image_url, views)] (저장 방식과 무관)"""
+        if SNAPSHOT_STORAGE == 'delta':
+            return [(rank, artist, track, image_url, views)
+                    for rank, artist, track, _, image_url, views in get_snapshot(conn, chart_name, snapshot_time)]
+        return conn.execute("""
+            SELECT rank_position, artist, track, image_url, views_or_streams
+            FROM chart_snapshots
+            WHERE chart_name = ? AND snapshot_time = ?
+            ORDER BY rank_position
+        """, (chart_name, snapshot_time)).fetchall()
+
+    def update_unified_master(self, charts=None, force=False):
+        """unified_master 차트별 교체 - 최신 스냅샷이 바뀐 차트만, 차트당 짧은 트랜잭션 1개
+
+        이미지 해석(네트워크 포함)은 트랜잭션 밖에서 먼저 끝내고,
+        DELETE WHERE chart_name + INSERT(resolved_image 포함)만 한 트랜잭션으로 커밋한다.
+        읽는 쪽은 차트별로 이전 상태 또는 새 상태만 보게 된다 (빈 테이블 / 해석 전 행 없음).
+
+        charts: 갱신할 차트 (기본: 전체 설정 차트), force: 변경 없어도 교체
+        → 교체한 차트 목록
+        """
+        logger.info("🔄 unified_master 업데이트...")
 
-        conn.commit()
+        conn = sqlite3.connect(str(self.final_db), timeout=30)
+        charts = charts or list(self.crawler_config.keys())
 
-        # 결과 확인
-        cursor.execute("""
-            SELECT chart_name, COUNT(*), COUNT(DISTINCT unified_track)
-            FROM unified_master_with_images
-            GROUP BY chart_name
-        """)
+        updated = []
+        chart_sources = []
+        try:
+            for chart_name in charts:
+                pointer = get_pointer(conn, chart_name)
+                if not pointer:
+                    continue
+
+                latest, _, current = pointer
+                if current == latest and not force:
+                    logger.info(f"  {chart_name}: 변경 없음 ({latest})")
+                    continue
+
+                snapshots = self.read_snapshot(conn, chart_name, latest)
+
+                # 최종 이미지 URL 해석 (읽기 API가 그대로 반환)
+                resolved = self.resolve_rows([
+                    (chart_name, artist, track, image_url, None)
+                    for _, artist, track, image_url, _ in snapshots
+                ])
+
+                rows = []
+                for (rank, artist, track, image_url, views), result in zip(snapshots, resolved):
+                    rows.append((chart_name, rank, artist, track, artist, track, image_url, views,
+                                 result[0] if result else None, latest))
+                    if result:
+                        chart_sources.append((chart_name, result[1]))
+
+                with conn:
+                    set_published_pointer(conn, chart_name, latest)
+                    conn.execute("DELETE FROM unified_master_with_images WHERE chart_name = ?", (chart_name,))
+                    conn.executemany("""
+                        INSERT INTO unified_master_with_images
+                        (chart_name, rank_position, unified_artist, unified_track,
+                         original_artist, original_track, image_url, views_or_streams,
+                         resolved_image, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, rows)
+
+                unique = len({track for _, _, _, track, *_ in rows})
+                logger.info(f"  {chart_name}: {len(rows)}개 ({unique}개 고유) 교체")
+                updated.append(chart_name)
+
+            if not updated:
+                return updated
+
+            sources = {}
+            for _, source in chart_sources:
+                sources[source] = sources.get(source, 0) + 1
+            logger.info(f"  🖼️ 이미지 해석: {len(chart_sources)}개 {sources}")
 
-        for chart, total, unique in cursor.fetchall():
-            logger.info(f"  {chart}: {total}개 ({unique}개 고유)")
+            try:
+                from image_stats import get_image_stats
+                get_image_stats().record_chart_resolution(chart_sources, charts=updated)
+            except Exception as e:
+                logger.warning(f"이미지 통계 갱신 실패: {e}")
 
-        conn.close()
+            # 퍼지 매칭 인덱스 동기화 (album-image-smart 부분 매칭용)
+            try:
+                from image_fts import sync_from_unified
+                synced = sync_from_unified(conn, chart_names=updated)
+                logger.info(f"  🔎 트랙명 인덱스 동기화: {synced}개")
+            except Exception as e:
+                logger.warning(f"트랙명 인덱스 동기화 실패: {e}")
+        finally:
+            conn.close()
+
+        return updated
+
+    def resolve_rows(self, rows):
+        """이미지 해석 체인 실행 → 행별 (url, source), 실패한 행은 None
+
+        rows: (chart_name, artist, track, image_url, local_image) 목록
+        같은 곡은 차트가 달라도 한 번만 해석 (Spotify 호출 절약)
+        """
+        try:
+            from image_resolver import resolve_image
+        except ImportError as e:
+            logger.warning(f"image_resolver 없음 - 이미지 해석 건너뜀: {e}")
+            return [None] * len(rows)
+
+        image_manager = None
+        try:
+            from local_image_manager import get_image_manager
+            image_manager = get_image_manager()
+        except ImportError:
+            pass
+
+        resolved_cache = {}
+        results = []
+        for chart_name, artist, track, image_url, local_image in rows:
+            key = (artist, track)
+            if key not in resolved_cache:
+                try:
+                    resolved_cache[key] = resolve_image(
+                        artist or '', track or '',
+                        image_url=image_url,
+                        local_image=local_image,
+                        image_manager=image_manager
+                    )
+                except Exception as e:
+                    logger.error(f"이미지 해석 실패: {artist} - {track}: {e}")
+                    resolved_cache[key] = None
+            results.append(resolved_cache[key])
+
+        return results
+
+    def resolve_images(self, conn, rows):
+        """기존 행 이미지 재해석 후 resolved_image 저장
+
+        rows: (id, chart_name, artist, track, image_url, local_image) 목록
+        """
+        resolved = self.resolve_rows([row[1:] for row in rows])
+
+        updates = []
+        sources = {}
+        for (row_id, *_), result in zip(rows, resolved):
+            if result is None:
+                continue
+            url, source = result
+            sources[source] = sources.get(source, 0) + 1
+            updates.append((url, row_id))
+
+        with conn:
+            conn.executemany("""
+                UPDATE unified_master_with_images
+                SET resolved_image = ?
+                WHERE id = ?
+            """, updates)
+
+        logger.info(f"  🖼️ 이미지 해석: {len(updates)}개 {sources}")
+        return len(updates)
+
+    def reresolve_default_images(self):
+        """기본 이미지 / smart API로 남은 행 재해석 (백그라운드 작업)"""
+        try:
+            from image_resolver import DEFAULT_IMAGE_URL
+        except ImportError:
+            return 0
+
+        conn = sqlite3.connect(str(self.final_db))
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, chart_name, unified_artist, unified_track, image_url, local_image
+                FROM unified_master_with_images
+                WHERE resolved_image IS NULL
+                OR resolved_image = ?
+                OR resolved_image LIKE '/api/album-image-smart/%'
+            """, (DEFAULT_IMAGE_URL,))
+            rows = cursor.fetchall()
+
+            if not rows:
+                return 0
+
+            logger.info(f"🔁 미해결 이미지 재해석: {len(rows)}개")
+            resolved = self.resolve_images(conn, rows)
+        except Exception as e:
+            logger.error(f"이미지 재해석 실패: {e}")
+            return 0
+        finally:
+            conn.close()
+
+        # 이미지만 바뀌면 데이터 버전이 그대로라 프리렌더 응답을 직접 갱신
+        if resolved:
+            with self._publish_lock:
+                self.prerender_payloads()
+        return resolved
+
+    def prewarm_images(self):
+        """상위 곡 이미지 프리웜 후 새로 받은 곡만 재해석 (캐시 갱신 전)"""
+        try:
+            from image_prewarm import prewarm_images, save_report
+        except ImportError as e:
+            logger.warning(f"image_prewarm 없음 - 프리웜 건너뜀: {e}")
+            return None
+
+        conn = sqlite3.connect(str(self.final_db))
+        try:
+            report = prewarm_images(conn)
+            warmed = report.pop('warmed_pairs')
+
+            if warmed:
+                rows = []
+                for artist, track in warmed:
+                    rows.extend(conn.execute("""
+                        SELECT id, chart_name, unified_artist, unified_track, image_url, local_image
+                        FROM unified_master_with_images
+                        WHERE unified_artist = ? AND unified_track = ?
+                    """, (artist, track)).fetchall())
+                self.resolve_images(conn, rows)
+
+            save_report(report)
+            return report
+        except Exception as e:
+            logger.error(f"이미지 프리웜 실패: {e}")
+            return None
+        finally:
+            conn.close()
+
+    def archive_raw_data(self):
+        """보존 기간 지난 raw_chart_data 행 → 월별 압축 아카이브 (raw_archive.py)"""
+        try:
+            from raw_archive import RawArchive
+        except ImportError as e:
+            logger.warning(f"raw_archive 없음 - 아카이브 건너뜀: {e}")
+            return None
+
+        try:
+            self.ensure_tables()
+            self.close_writers()
+            return RawArchive(self.raw_db).archive()
+        except Exception as e:
+            logger.error(f"raw 아카이브 실패: {e}")
+            return None
+
+    def prerender_payloads(self):
+        """새 데이터 버전으로 trending / statistics / 차트별 응답 프리렌더 후 공개 (prerender.py)"""
+        try:
+            from prerender import render_all, save_report
+        except ImportError as e:
+            logger.warning(f"prerender 없음 - 프리렌더 건너뜀: {e}")
+            return None
+
+        try:
+            report = render_all(self.final_db)
+            save_report(report)
+            return report
+        except Exception as e:
+            logger.error(f"프리렌더 실패: {e}")
+            return None
+
+    def warm_legacy_cache(self):
+        """smart_cache_warmer_v3가 배포된 환경에서만 기존 캐시 갱신"""
+        try:
+            from smart_cache_warmer_v3 import SmartCacheWarmer
+        except ImportError:
+            return False
+
+        try:
+            SmartCacheWarmer().warm_all_cache()
+            logger.info("✅ 캐시 갱신")
+            return True
+        except Exception as e:
+            logger.error(f"캐시 갱신 실패: {e}")
+            return False
 
     def run_complete_pipeline(self, chart_name=None):
         """완전 파이프라인 실행"""
@@ -361,33 +950,118 @@ class UltimateSystemV21Final:
         # 차트 목록
         charts = [chart_name] if chart_name else list(self.crawler_config.keys())
 
-        success_count = 0
-        for chart in charts:
-            try:
-                # 1. 크롤링
-                if self.run_crawler(chart):
-                    # 2. 시계열 처리
-                    if self.process_to_timeseries(chart):
-                        success_count += 1
-            except Exception as e:
-                logger.error(f"❌ {chart} 실패: {e}")
+        # 1. 크롤링 (병렬) + 2. 시계열 처리 (차트 순서대로)
+        try:
+            succeeded, _ = self.crawl_charts(charts)
+        finally:
+            self.close_writers()
+        success_count = len(succeeded)
 
         # 3. unified_master 업데이트
         if success_count > 0:
-            self.update_unified_master()
+            with self._publish_lock:
+                self.update_unified_master(succeeded)
 
-            # 4. 캐시 갱신
-            try:
-                from smart_cache_warmer_v3 import SmartCacheWarmer
-                cache_warmer = SmartCacheWarmer()
-                cache_warmer.warm_all_cache()
-                logger.info("✅ 캐시 갱신")
-            except:
-                pass
+                # 4. 상위 곡 이미지 프리웜 (공개 전)
+                self.prewarm_images()
+
+                # 5. 핫 API 응답 프리렌더 / 공개 + (있으면) 기존 캐시 워머
+                self.prerender_payloads()
+                self.warm_legacy_cache()
 
         logger.info(f"✅ 완료: {success_count}/{len(charts)} 성공")
         return success_count > 0
 
+def bench_ingest(total_rows=50000, chart_size=100):
+    """Raw 저장 + 시계열 처리 처리량 비교 (행 단위 execute vs executemany) - 임시 DB 사용
+
+    히스토리 백필처럼 차트 크롤링 결과(chart_size행)를 total_rows만큼 연달아 넣는다.
+    """
+    import tempfile
+
+    batches = max(1, total_rows // chart_size)
+    data = [
+        {'rank': rank, 'artist': f'Artist {rank}', 'track': f'Track {rank}',
+         'image_url': f'https://example.com/{rank}.jpg', 'views_or_streams': str(rank * 1000)}
+        for rank in range(1, chart_size + 1)
+    ]
+
+    def legacy(system, chart_name, crawled_at):
+        # 이전 구현: 호출마다 새 연결 + 행 단위 execute
+        conn = sqlite3.connect(str(system.raw_db))
+        cursor = conn.cursor()
+        for item in data:
+            track_name = item.get('track') or item.get('title', '')
+            cursor.execute("""
+                INSERT INTO raw_chart_data
+                (chart_name, rank, title, artist, track, image_url,
+                 views_or_streams, streams, crawled_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (chart_name, item.get('rank'), track_name, item.get('artist', ''), track_name,
+                  item.get('image_url', ''), item.get('views_or_streams', ''),
+                  item.get('streams', ''), crawled_at))
+        conn.commit()
+        conn.close()
+
+        conn_raw = sqlite3.connect(str(system.raw_db))
+        conn_final = sqlite3.connect(str(system.final_db))
+        tracks = conn_raw.execute("""
+            SELECT rank, artist, COALESCE(track, title, ''), image_url,
+                   COALESCE(views_or_streams, streams, '')
+            FROM raw_chart_data WHERE chart_name = ? AND crawled_at LIKE ? ORDER BY rank
+        """, (chart_name, crawled_at[:19] + '%')).fetchall()
+        cursor_final = conn_final.cursor()
+        saved = 0
+        for rank, artist, track, image_url, views_data in tracks:
+            cursor_final.execute("""
+                INSERT INTO chart_snapshots
+                (chart_name, rank_position, artist, track, album,
+                 image_url, views_or_streams, snapshot_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (chart_name, rank, artist.strip(), track.strip(), '', image_url or '',
+                  views_data or '', crawled_at))
+            saved += 1
+        conn_final.commit()
+        cursor_final.execute("""
+            INSERT OR REPLACE INTO chart_metadata
+            (chart_name, last_update, total_tracks, is_active)
+            VALUES (?, ?, ?, 1)
+        """, (chart_name, crawled_at, saved))
+        conn_final.commit()
+        conn_raw.close()
+        conn_final.close()
+
+    def current(system, chart_name, crawled_ats):
+        for crawled_at in crawled_ats:
+            system.save_to_raw_db(chart_name, data, crawled_at)
+            system.process_to_timeseries(chart_name)
+
+    def backfill(system, chart_name, crawled_ats):
+        system.ingest_history(chart_name, [(crawled_at, data) for crawled_at in crawled_ats])
+
+    def legacy_all(system, chart_name, crawled_ats):
+        for crawled_at in crawled_ats:
+            legacy(system, chart_name, crawled_at)
+
+    crawled_ats = [(datetime(2025, 1, 1) + timedelta(minutes=batch)).isoformat() for batch in range(batches)]
+
+    results = {}
+    for label, ingest in (('before', legacy_all), ('after', current), ('backfill', backfill)):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            system = UltimateSystemV21Final()
+            system.raw_db = Path(tmp_dir) / 'chart_rankings.db'
+            system.final_db = Path(tmp_dir) / 'rank_history.db'
+            system.ensure_tables()
+
+            start = time.perf_counter()
+            ingest(system, 'melon', crawled_ats)
+            elapsed = time.perf_counter() - start
+            system.close_writers()
+
+        results[label] = round(batches * chart_size / elapsed)
+
+    return results
+
 def test_mode():
     """테스트 모드"""
     print("=" * 60)
@@ -412,51 +1086,26 @@ if __name__ == "__main__":
 
     if len(sys.argv) > 1 and sys.argv[1] == "test":
         test_mode()
+    elif len(sys.argv) > 1 and sys.argv[1] == "bench-ingest":
+        rows = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+        results = bench_ingest(rows)
+        print(f"📥 Raw 저장 + 시계열 처리 ({rows}행)")
+        print(f"  이전 (행 단위 execute): {results['before']:,}행/초")
+        print(f"  현재 (executemany):     {results['after']:,}행/초 "
+              f"({results['after'] / results['before']:.1f}배)")
+        print(f"  백필 (ingest_history):  {results['backfill']:,}행/초 "
+              f"({results['backfill'] / results['before']:.1f}배)")
     else:
         system = UltimateSystemV21Final()
         # 초기 실행 (주석 유지)
         # system.run_complete_pipeline()
 
-        # 스케줄 설정 및 실행
-        import schedule
-
-        # 스케줄 설정 - 전체 7개 크롤러
-        # Melon (4회/일)
-        schedule.every().day.at("01:10").do(system.run_complete_pipeline, "melon")
-        schedule.every().day.at("07:10").do(system.run_complete_pipeline, "melon")
-        schedule.every().day.at("13:10").do(system.run_complete_pipeline, "melon")
-        schedule.every().day.at("19:10").do(system.run_complete_pipeline, "melon")
-
-        # Genie (4회/일)
-        schedule.every().day.at("01:15").do(system.run_complete_pipeline, "genie")
-        schedule.every().day.at("07:15").do(system.run_complete_pipeline, "genie")
-        schedule.every().day.at("13:15").do(system.run_complete_pipeline, "genie")
-        schedule.every().day.at("19:15").do(system.run_complete_pipeline, "genie")
-
-        # Bugs (4회/일)
-        schedule.every().day.at("01:20").do(system.run_complete_pipeline, "bugs")
-        schedule.every().day.at("07:20").do(system.run_complete_pipeline, "bugs")
-        schedule.every().day.at("13:20").do(system.run_complete_pipeline, "bugs")
-        schedule.every().day.at("19:20").do(system.run_complete_pipeline, "bugs")
+        # 스케줄러 실행 (job_scheduler.DEFAULT_JOBS = 기존 스케줄, SCHEDULER_CONFIG로 교체 가능)
+        from job_scheduler import JobScheduler, load_jobs, pipeline_tasks
 
-        # FLO (2회/일)
-        schedule.every().day.at("01:25").do(system.run_complete_pipeline, "flo")
-        schedule.every().day.at("13:25").do(system.run_complete_pipeline, "flo")
-
-        # Apple Music (1회/일)
-        schedule.every().day.at("09:10").do(system.run_complete_pipeline, "apple_music")
-
-        # Spotify (1회/일)
-        schedule.every().day.at("10:10").do(system.run_complete_pipeline, "spotify")
-
-        # Last.fm (1회/일)
-        schedule.every().day.at("12:10").do(system.run_complete_pipeline, "lastfm")
-
-        logger.info("스케줄러 시작 - 7개 크롤러 등록 완료")
+        scheduler = JobScheduler(load_jobs(), pipeline_tasks(system))
         logger.info("등록된 크롤러: Melon(4회), Genie(4회), Bugs(4회), FLO(2회), Apple(1회), Spotify(1회), Lastfm(1회)")
-        logger.info("다음 크롤링: FLO(13:25), Apple(09:10), Spotify(10:10), Lastfm(12:10)")
-
-        # 메인 루프
-        while True:
-            schedule.run_pending()
-            time.sleep(60)
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            scheduler.stop()
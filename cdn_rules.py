@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+CDN Rules - 차트 CDN 이미지 URL 크기 규칙 엔진
+- 호스트별 규칙 테이블 (정규식 + 크기 단계), 모듈 로드 시 한 번 컴파일
+- 수집 시점: best_image_url()로 가장 큰 단계로 올려서 저장
+- 요청 시점: sized_image_url()로 요청 size에 맞게 낮추기만 함 (올리지 않음)
+- 새 CDN은 CDN_RULES에 항목만 추가
+
+사용법:
+    python3 cdn_rules.py check                 # CDN별 규칙 검증 케이스 실행
+    python3 cdn_rules.py bench                 # 처리량 마이크로벤치마크
+    python3 cdn_rules.py backfill [--dry-run]  # 저장된 image_url을 최고 단계로 갱신
+"""
+
+import argparse
+import re
+import sqlite3
+import time
+from functools import lru_cache
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+
+# 차트 URL 수(수천 개)를 넉넉히 덮는 크기
+URL_CACHE_SIZE = 8192
+
+# 호스트(접미사) → 크기 규칙
+# patterns: 크기 숫자를 (?P<size>) 그룹으로 잡는 정규식 (모두 같은 크기로 치환)
+# tiers: CDN이 실제로 제공하는 크기 (오름차순)
+CDN_RULES = [
+    {
+        'name': 'melon',
+        'hosts': ('melon.co.kr',),
+        'patterns': (
+            r'_(?P<size>500|1000)\.jpg',
+            r'/resize/(?P<size>\d+)/',
+        ),
+        'tiers': (500, 1000),
+    },
+    {
+        'name': 'bugs',
+        'hosts': ('image.bugsm.co.kr',),
+        'patterns': (
+            r'/images/(?P<size>\d+)/',
+        ),
+        'tiers': (500, 1000),
+    },
+    {
+        'name': 'apple_music',
+        'hosts': ('mzstatic.com',),
+        'patterns': (
+            r'/(?P<size>\d+)x(?P=size)bb\.(?:jpg|png|webp)',
+        ),
+        'tiers': (300, 600, 1000),
+    },
+    # Genie는 이미 600x600 고화질 - 규칙 없음
+]
+
+
+class CdnRule:
+    """컴파일된 호스트 규칙"""
+
+    def __init__(self, name, patterns, tiers):
+        self.name = name
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+        self.tiers = tuple(sorted(tiers))
+
+    def current_size(self, url):
+        """URL에 들어 있는 크기 (규칙에 안 맞으면 None)"""
+        for pattern in self.patterns:
+            match = pattern.search(url)
+            if match:
+                return int(match.group('size'))
+        return None
+
+    def tier_for(self, size):
+        """size를 덮는 가장 작은 단계 (없으면 최대 단계)"""
+        for tier in self.tiers:
+            if tier >= size:
+                return tier
+        return self.tiers[-1]
+
+    def rewrite(self, url, size):
+        """URL의 크기 부분을 size로 치환"""
+        for pattern in self.patterns:
+            url = pattern.sub(lambda m: _replace_size(m, size), url)
+        return url
+
+
+def _replace_size(match, size):
+    """매치 문자열 안의 size 그룹(역참조 포함)을 새 크기로 교체"""
+    text = match.group(0)
+    old = match.group('size')
+    return text.replace(old, str(size))
+
+
+def _compile(rules):
+    table = {}
+    for rule in rules:
+        compiled = CdnRule(rule['name'], rule['patterns'], rule['tiers'])
+        for host in rule['hosts']:
+            table[host] = compiled
+    return table
+
+
+_RULES_BY_HOST = _compile(CDN_RULES)
+
+
+def rule_for(url):
+    """URL 호스트에 맞는 규칙 (cdnimg.melon.co.kr → melon.co.kr 순으로 접미사 검색)"""
+    if not url or not url.startswith('http'):
+        return None
+
+    parts = url.split('/', 3)
+    if len(parts) < 3:
+        return None
+    host = parts[2].rpartition('@')[2].partition(':')[0].lower()
+    while host:
+        rule = _RULES_BY_HOST.get(host)
+        if rule:
+            return rule
+        _, _, host = host.partition('.')
+    return None
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def best_image_url(url):
+    """수집 시점: 가장 큰 크기 단계 URL"""
+    rule = rule_for(url)
+    if rule is None:
+        return url
+
+    current = rule.current_size(url)
+    if current is None or current == rule.tiers[-1]:
+        return url
+    return rule.rewrite(url, rule.tiers[-1])
+
+
+def sized_image_url(url, size):
+    """요청 시점: size를 덮는 단계로 낮추기만 함 (저장된 크기보다 키우지 않음)
+
+    size는 쿼리 문자열 값('640')이 그대로 올 수 있어 정수로 바꾼 뒤 비교 (숫자가 아니면 원본 URL)
+    """
+    try:
+        size = int(size) if size is not None else None
+    except (TypeError, ValueError):
+        return url
+    return _sized_image_url(url, size)
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def _sized_image_url(url, size):
+    rule = rule_for(url)
+    if rule is None or not size:
+        return url
+
+    current = rule.current_size(url)
+    if current is None:
+        return url
+
+    tier = rule.tier_for(size)
+    if tier >= current:
+        return url
+    return rule.rewrite(url, tier)
+
+
+# ============================================
+# 검증 케이스 / 벤치마크
+# ============================================
+# (함수, 입력 URL, size, 기대 결과)
+CHECK_CASES = [
+    # Melon - 구형(_500.jpg) / 신형(/resize/500/)
+    ('best', 'https://cdnimg.melon.co.kr/cm2/album/images/111/11/123/11111123_20230101_500.jpg',
+     None, 'https://cdnimg.melon.co.kr/cm2/album/images/111/11/123/11111123_20230101_1000.jpg'),
+    ('best', 'https://cdnimg.melon.co.kr/cm2/album/images/111/11/123/11111123_500.jpg/melon/resize/500/quality/80/optimize',
+     None, 'https://cdnimg.melon.co.kr/cm2/album/images/111/11/123/11111123_1000.jpg/melon/resize/1000/quality/80/optimize'),
+    ('sized', 'https://cdnimg.melon.co.kr/cm2/album/images/111/11/123/11111123_1000.jpg',
+     300, 'https://cdnimg.melon.co.kr/cm2/album/images/111/11/123/11111123_500.jpg'),
+    ('sized', 'https://cdnimg.melon.co.kr/cm2/album/images/111/11/123/11111123_1000.jpg',
+     640, 'https://cdnimg.melon.co.kr/cm2/album/images/111/11/123/11111123_1000.jpg'),
+    ('sized', 'https://cdnimg.melon.co.kr/cm2/album/images/111/11/123/11111123_500.jpg',
+     1000, 'https://cdnimg.melon.co.kr/cm2/album/images/111/11/123/11111123_500.jpg'),
+    # size가 문자열(쿼리 기본값) / 없음 / 숫자가 아님
+    ('sized', 'https://cdnimg.melon.co.kr/cm2/album/images/111/11/123/11111123_1000.jpg',
+     '300', 'https://cdnimg.melon.co.kr/cm2/album/images/111/11/123/11111123_500.jpg'),
+    ('sized', 'https://image.bugsm.co.kr/album/images/1000/40912/4091237.jpg',
+     '640', 'https://image.bugsm.co.kr/album/images/1000/40912/4091237.jpg'),
+    ('sized', 'https://image.bugsm.co.kr/album/images/1000/40912/4091237.jpg',
+     None, 'https://image.bugsm.co.kr/album/images/1000/40912/4091237.jpg'),
+    ('sized', 'https://image.bugsm.co.kr/album/images/1000/40912/4091237.jpg',
+     'large', 'https://image.bugsm.co.kr/album/images/1000/40912/4091237.jpg'),
+    # Bugs - 50/100/500 → 1000
+    ('best', 'https://image.bugsm.co.kr/album/images/50/40912/4091237.jpg',
+     None, 'https://image.bugsm.co.kr/album/images/1000/40912/4091237.jpg'),
+    ('best', 'https://image.bugsm.co.kr/album/images/500/40912/4091237.jpg?version=20230101',
+     None, 'https://image.bugsm.co.kr/album/images/1000/40912/4091237.jpg?version=20230101'),
+    ('sized', 'https://image.bugsm.co.kr/album/images/1000/40912/4091237.jpg',
+     64, 'https://image.bugsm.co.kr/album/images/500/40912/4091237.jpg'),
+    # Apple Music (mzstatic)
+    ('best', 'https://is1-ssl.mzstatic.com/image/thumb/Music116/v4/aa/bb/cc/abc.jpg/100x100bb.jpg',
+     None, 'https://is1-ssl.mzstatic.com/image/thumb/Music116/v4/aa/bb/cc/abc.jpg/1000x1000bb.jpg'),
+    ('sized', 'https://is1-ssl.mzstatic.com/image/thumb/Music116/v4/aa/bb/cc/abc.jpg/1000x1000bb.jpg',
+     300, 'https://is1-ssl.mzstatic.com/image/thumb/Music116/v4/aa/bb/cc/abc.jpg/300x300bb.jpg'),
+    # Genie / Spotify / 로컬 경로 - 변경 없음
+    ('best', 'https://image.genie.co.kr/Y/IMAGE/IMG_ALBUM/085/123/456/85123456_1_600x600.JPG',
+     None, 'https://image.genie.co.kr/Y/IMAGE/IMG_ALBUM/085/123/456/85123456_1_600x600.JPG'),
+    ('sized', 'https://i.scdn.co/image/ab67616d0000b273abcdef', 300,
+     'https://i.scdn.co/image/ab67616d0000b273abcdef'),
+    ('sized', '/static/track_images/a_b_HQ.jpg', 300, '/static/track_images/a_b_HQ.jpg'),
+    # 호스트가 아닌 경로에 melon.co.kr이 들어간 경우
+    ('best', 'https://example.com/melon.co.kr/x_500.jpg',
+     None, 'https://example.com/melon.co.kr/x_500.jpg'),
+]
+
+
+def run_checks():
+    """검증 케이스 실행 → 실패 목록"""
+    failures = []
+    for kind, url, size, expected in CHECK_CASES:
+        actual = best_image_url(url) if kind == 'best' else sized_image_url(url, size)
+        if actual != expected:
+            failures.append((kind, url, size, expected, actual))
+    return failures
+
+
+def _legacy_upgrade(image_url, size):
+    """기존 요청 핸들러의 str.replace 체인 (벤치마크 비교용)"""
+    upgraded_url = image_url
+    if 'melon.co.kr' in upgraded_url:
+        if size >= 640:
+            upgraded_url = upgraded_url.replace('_500.jpg', '_1000.jpg')
+            upgraded_url = upgraded_url.replace('/resize/500/', '/resize/1000/')
+        else:
+            upgraded_url = upgraded_url.replace('_1000.jpg', '_500.jpg')
+            upgraded_url = upgraded_url.replace('/resize/1000/', '/resize/500/')
+    elif 'image.bugsm.co.kr' in upgraded_url:
+        upgraded_url = upgraded_url.replace('/images/50/', '/images/500/')
+        upgraded_url = upgraded_url.replace('/images/100/', '/images/500/')
+        if size < 640:
+            upgraded_url = upgraded_url.replace('/images/1000/', '/images/500/')
+    return upgraded_url
+
+
+def benchmark(iterations=200000):
+    """URL/초 처리량 (규칙 엔진 vs 기존 replace 체인)"""
+    urls = [url for _, url, _, _ in CHECK_CASES]
+    sizes = (64, 300, 640)
+
+    def measure(func):
+        start = time.perf_counter()
+        for i in range(iterations):
+            func(urls[i % len(urls)], sizes[i % len(sizes)])
+        return round(iterations / (time.perf_counter() - start))
+
+    return {
+        'iterations': iterations,
+        'sized_per_sec': measure(sized_image_url),
+        'sized_uncached_per_sec': measure(_sized_image_url.__wrapped__),
+        'best_uncached_per_sec': measure(lambda url, size: best_image_url.__wrapped__(url)),
+        'legacy_per_sec': measure(_legacy_upgrade),
+    }
+
+
+def backfill(db_paths, dry_run=False):
+    """저장된 image_url을 최고 단계로 갱신 → {테이블: 변경 행 수}"""
+    targets = {
+        'rank_history.db': ('chart_snapshots', 'unified_master_with_images'),
+        'chart_rankings.db': ('raw_chart_data',),
+    }
+    changed = {}
+
+    for db_path in db_paths:
+        db_path = Path(db_path)
+        if not db_path.exists():
+            continue
+
+        conn = sqlite3.connect(str(db_path))
+        try:
+            existing = {row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'")}
+            for table in targets.get(db_path.name, ()):
+                if table not in existing:
+                    continue
+
+                rows = conn.execute(f"""
+                    SELECT DISTINCT image_url FROM {table}
+                    WHERE image_url LIKE 'http%'
+                """).fetchall()
+                updates = [(best, url) for (url,) in rows
+                           for best in (best_image_url(url),) if best != url]
+
+                if updates and not dry_run:
+                    conn.executemany(
+                        f"UPDATE {table} SET image_url = ? WHERE image_url = ?", updates)
+                changed[f"{db_path.name}:{table}"] = len(updates)
+
+            conn.commit()
+        finally:
+            conn.close()
+
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CDN 이미지 URL 규칙 엔진')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('check', help='CDN별 규칙 검증 케이스')
+
+    bench_parser = subparsers.add_parser('bench', help='처리량 벤치마크')
+    bench_parser.add_argument('--iterations', type=int, default=200000)
+
+    backfill_parser = subparsers.add_parser('backfill', help='저장된 URL 최고 단계로 갱신')
+    backfill_parser.add_argument('--dry-run', action='store_true')
+
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        failures = run_checks()
+        for kind, url, size, expected, actual in failures:
+            print(f"❌ {kind}({url}, {size})\n   기대: {expected}\n   실제: {actual}")
+        print(f"{'✅' if not failures else '❌'} {len(CHECK_CASES) - len(failures)}/{len(CHECK_CASES)} 통과")
+        raise SystemExit(1 if failures else 0)
+
+    if args.command == 'bench':
+        result = benchmark(args.iterations)
+        print(f"📊 {result['iterations']:,}회")
+        print(f"   sized_image_url (캐시)   : {result['sized_per_sec']:,} URL/초")
+        print(f"   sized_image_url (캐시 X) : {result['sized_uncached_per_sec']:,} URL/초")
+        print(f"   best_image_url (캐시 X)  : {result['best_uncached_per_sec']:,} URL/초")
+        print(f"   기존 replace 체인        : {result['legacy_per_sec']:,} URL/초")
+
+    if args.command == 'backfill':
+        changed = backfill([BASE_DIR / 'rank_history.db', BASE_DIR / 'chart_rankings.db'],
+                           dry_run=args.dry_run)
+        for table, count in changed.items():
+            print(f"🔄 {table}: {count}개 URL{' (dry-run)' if args.dry_run else ''}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Chart Latest Pointer - 차트별 최신 스냅샷 포인터
+- chart_latest_pointer: chart_name → 최신 snapshot_time / batch_id
+  (SNAPSHOT_STORAGE=delta면 chart_snapshots 대신 snapshot_frames 기준)
+  (process_to_timeseries가 chart_snapshots 삽입과 같은 트랜잭션에서 갱신)
+- published_time: unified_master_with_images에 반영된 스냅샷 시각
+  (update_unified_master가 차트 교체와 같은 트랜잭션에서 갱신)
+- 최신 데이터 조회는 MAX(snapshot_time) / MAX(created_at) 서브쿼리 대신 이 테이블과 조인
+  → 히스토리 크기와 관계없이 차트당 PK 조회 + (chart_name, created_at) 인덱스 조회
+
+사용법:
+    python3 chart_pointer.py show
+    python3 chart_pointer.py rebuild    # 기존 테이블에서 포인터 다시 계산
+"""
+
+import argparse
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+DB_PATH = BASE_DIR / 'rank_history.db'
+
+_ensured = set()  # 확인을 마친 DB 파일 경로
+_ensure_lock = threading.Lock()
+
+
+def _table_exists(conn, name):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def ensure_latest_pointer(conn):
+    """포인터 테이블 / 조인 인덱스 / resolved_image 컬럼 생성 - 처음 만들 때만 기존 데이터로 채움 (DB 파일당 1회)"""
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    if db_file in _ensured:
+        return
+
+    with _ensure_lock:
+        if db_file in _ensured:
+            return
+
+        created = not _table_exists(conn, 'chart_latest_pointer')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS chart_latest_pointer (
+                chart_name TEXT PRIMARY KEY,
+                snapshot_time TIMESTAMP NOT NULL,
+                batch_id INTEGER,
+                track_count INTEGER,
+                published_time TIMESTAMP,
+                updated_at TIMESTAMP
+            )
+        """)
+        if _table_exists(conn, 'unified_master_with_images'):
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_unified_chart_created
+                ON unified_master_with_images(chart_name, created_at)
+            """)
+            # resolved_image 컬럼 (파이프라인보다 API가 먼저 뜬 기존 DB 마이그레이션)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(unified_master_with_images)")}
+            if 'resolved_image' not in columns:
+                conn.execute("ALTER TABLE unified_master_with_images ADD COLUMN resolved_image TEXT")
+
+        if created:
+            rebuild(conn)
+        conn.commit()
+        if db_file:
+            _ensured.add(db_file)
+
+
+def rebuild(conn):
+    """chart_snapshots(또는 델타 프레임) / unified_master_with_images에서 포인터 다시 계산 (마이그레이션 / 복구용)"""
+    now = datetime.now().isoformat()
+    if _table_exists(conn, 'snapshot_frames'):
+        conn.execute("""
+            INSERT INTO chart_latest_pointer (chart_name, snapshot_time, track_count, updated_at)
+            SELECT chart_name, snapshot_time, track_count, ?
+            FROM snapshot_frames f
+            WHERE snapshot_time = (
+                SELECT MAX(snapshot_time) FROM snapshot_frames WHERE chart_name = f.chart_name
+            )
+            ON CONFLICT(chart_name) DO UPDATE SET
+                snapshot_time = excluded.snapshot_time,
+                track_count = excluded.track_count,
+                updated_at = excluded.updated_at
+            WHERE excluded.snapshot_time >= chart_latest_pointer.snapshot_time
+        """, (now,))
+
+    if _table_exists(conn, 'chart_snapshots'):
+        conn.execute("""
+            INSERT INTO chart_latest_pointer (chart_name, snapshot_time, track_count, updated_at)
+            SELECT s.chart_name, s.snapshot_time, COUNT(*), ?
+            FROM chart_snapshots s
+            JOIN (
+                SELECT chart_name, MAX(snapshot_time) AS snapshot_time
+                FROM chart_snapshots GROUP BY chart_name
+            ) latest ON latest.chart_name = s.chart_name AND latest.snapshot_time = s.snapshot_time
+            WHERE 1
+            GROUP BY s.chart_name
+            ON CONFLICT(chart_name) DO UPDATE SET
+                snapshot_time = excluded.snapshot_time,
+                track_count = excluded.track_count,
+                updated_at = excluded.updated_at
+            WHERE excluded.snapshot_time >= chart_latest_pointer.snapshot_time
+        """, (now,))
+
+    if _table_exists(conn, 'unified_master_with_images'):
+        conn.execute("""
+            INSERT INTO chart_latest_pointer (chart_name, snapshot_time, published_time, updated_at)
+            SELECT chart_name, MAX(created_at), MAX(created_at), ?
+            FROM unified_master_with_images
+            WHERE created_at IS NOT NULL
+            GROUP BY chart_name
+            ON CONFLICT(chart_name) DO UPDATE SET
+                published_time = excluded.published_time
+        """, (now,))
+
+
+def set_snapshot_pointer(conn, chart_name, snapshot_time, batch_id=None, track_count=None):
+    """새 스냅샷 반영 (커밋은 호출하는 쪽 트랜잭션에서) - 더 오래된 시각으로는 되돌리지 않음"""
+    conn.execute("""
+        INSERT INTO chart_latest_pointer (chart_name, snapshot_time, batch_id, track_count, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(chart_name) DO UPDATE SET
+            snapshot_time = excluded.snapshot_time,
+            batch_id = excluded.batch_id,
+            track_count = excluded.track_count,
+            updated_at = excluded.updated_at
+        WHERE excluded.snapshot_time >= chart_latest_pointer.snapshot_time
+    """, (chart_name, snapshot_time, batch_id, track_count, datetime.now().isoformat()))
+
+
+def set_published_pointer(conn, chart_name, published_time):
+    """unified_master_with_images 교체 반영 (커밋은 호출하는 쪽 트랜잭션에서)"""
+    conn.execute("""
+        INSERT INTO chart_latest_pointer (chart_name, snapshot_time, published_time, updated_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(chart_name) DO UPDATE SET
+            published_time = excluded.published_time,
+            updated_at = excluded.updated_at
+    """, (chart_name, published_time, published_time, datetime.now().isoformat()))
+
+
+def get_pointer(conn, chart_name):
+    """→ (snapshot_time, batch_id, published_time), 없으면 None"""
+    return conn.execute("""
+        SELECT snapshot_time, batch_id, published_time
+        FROM chart_latest_pointer WHERE chart_name = ?
+    """, (chart_name,)).fetchone()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='차트 최신 스냅샷 포인터')
+    parser.add_argument('--db', default=str(DB_PATH))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('show', help='포인터 출력')
+    subparsers.add_parser('rebuild', help='기존 테이블에서 다시 계산')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        ensure_latest_pointer(conn)
+        if args.command == 'rebuild':
+            rebuild(conn)
+            conn.commit()
+            print("✅ 포인터 재계산 완료")
+
+        rows = conn.execute("""
+            SELECT chart_name, snapshot_time, batch_id, track_count, published_time
+            FROM chart_latest_pointer ORDER BY chart_name
+        """).fetchall()
+        for chart_name, snapshot_time, batch_id, track_count, published_time in rows:
+            print(f"  {chart_name}: 스냅샷 {snapshot_time} (배치 {batch_id}, {track_count}곡), 공개 {published_time}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Crawler Registry - 크롤러 인스턴스 재사용 + 연결 풀 세션
+- 차트별 크롤러 인스턴스를 프로세스 동안 유지 (매 실행마다 import / 생성하지 않음)
+- 인스턴스마다 requests.Session 주입: keep-alive 연결 풀, 재시도(백오프), 기본 타임아웃
+  (크롤러가 self.session을 쓰면 TCP/TLS 핸드셰이크는 첫 실행에서만 발생)
+- 인증 토큰(token / token_expires 속성)은 만료 전까지 파일에 보관 → 재시작 후에도 재사용
+- 실행별 요청 수 / 새 연결(핸드셰이크) 수 기록
+- 같은 차트가 아직 실행 중이면 (이전 실행 타임아웃) 새 실행은 바로 실패
+
+사용법:
+    python3 crawler_registry.py bench --runs 6   # 실행마다 새 인스턴스 + requests.get vs 레지스트리
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+TOKEN_PATH = BASE_DIR / 'crawler_tokens.json'
+
+HTTP_TIMEOUT = float(os.getenv('CRAWLER_HTTP_TIMEOUT', '10'))
+HTTP_RETRIES = int(os.getenv('CRAWLER_HTTP_RETRIES', '3'))
+HTTP_BACKOFF = float(os.getenv('CRAWLER_HTTP_BACKOFF', '0.5'))
+POOL_SIZE = int(os.getenv('CRAWLER_POOL_SIZE', '10'))
+TOKEN_MARGIN = 60  # 만료 이 시간(초) 전부터는 재사용하지 않음
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class CrawlerSession(requests.Session):
+    """기본 타임아웃 + 요청 수 집계 세션"""
+
+    def __init__(self, timeout=HTTP_TIMEOUT):
+        super().__init__()
+        self.timeout = timeout
+        self.request_count = 0
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        self.request_count += 1
+        return super().request(method, url, **kwargs)
+
+    def connection_count(self):
+        """지금까지 새로 연 연결 수 (= TCP / TLS 핸드셰이크 수)"""
+        total = 0
+        # http:// / https://에 같은 어댑터를 마운트하므로 중복 제거
+        adapters = {id(adapter): adapter for adapter in self.adapters.values()}
+        for adapter in adapters.values():
+            for key in adapter.poolmanager.pools.keys():
+                pool = adapter.poolmanager.pools.get(key)
+                total += getattr(pool, 'num_connections', 0) if pool else 0
+        return total
+
+
+def make_session(config=None):
+    """크롤러 설정('http_timeout', 'retries', 'backoff', 'pool_size', 'headers') → CrawlerSession
+
+    ('timeout'은 크롤링 전체 타임아웃 - backend_ultimate.CRAWL_TIMEOUT 참고)
+    """
+    config = config or {}
+    session = CrawlerSession(timeout=config.get('http_timeout', HTTP_TIMEOUT))
+    retry = Retry(
+        total=config.get('retries', HTTP_RETRIES),
+        backoff_factor=config.get('backoff', HTTP_BACKOFF),
+        status_forcelist=RETRY_STATUS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    pool_size = config.get('pool_size', POOL_SIZE)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(config.get('headers', {}))
+    return session
+
+
+class TokenCache:
+    """크롤러별 (token, expires) 파일 보관 - 만료된 토큰은 버림"""
+
+    def __init__(self, path=TOKEN_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._tokens = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, name):
+        entry = self._tokens.get(name)
+        if entry and entry.get('expires', 0) - TOKEN_MARGIN > time.time():
+            return entry['token'], entry['expires']
+        return None
+
+    def set(self, name, token, expires):
+        with self._lock:
+            if self._tokens.get(name) == {'token': token, 'expires': expires}:
+                return
+            self._tokens[name] = {'token': token, 'expires': expires}
+            now = time.time()
+            self._tokens = {key: value for key, value in self._tokens.items() if value['expires'] > now}
+
+            tmp_path = self.path.with_suffix('.json.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._tokens, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+
+
+class CrawlerRegistry:
+    """차트별 크롤러 인스턴스 / 세션 / 토큰 관리"""
+
+    def __init__(self, crawler_config=None, token_cache=None):
+        self.crawler_config = crawler_config or {}
+        self.tokens = token_cache or TokenCache()
+        self._lock = threading.Lock()
+        self._entries = {}  # chart_name → {'instance', 'class', 'session', 'lock', 'stats'}
+
+    def get(self, chart_name, crawler_class):
+        """크롤러 인스턴스 (처음 또는 클래스가 바뀌었을 때만 생성)"""
+        with self._lock:
+            entry = self._entries.get(chart_name)
+            if entry and entry['class'] is crawler_class:
+                return entry
+
+            instance = crawler_class()
+            session = make_session(self.crawler_config.get(chart_name))
+            if hasattr(instance, 'headers') and isinstance(instance.headers, dict):
+                session.headers.update(instance.headers)
+            if isinstance(getattr(instance, 'session', None), requests.Session):
+                instance.session.close()
+            instance.session = session
+
+            cached = self.tokens.get(chart_name)
+            if cached and hasattr(instance, 'token'):
+                instance.token, instance.token_expires = cached
+
+            entry = {
+                'instance': instance,
+                'class': crawler_class,
+                'session': session,
+                'lock': threading.Lock(),
+                'stats': {'runs': 0, 'requests': 0, 'connections': 0, 'last_run': None},
+            }
+            if chart_name in self._entries:
+                self._entries[chart_name]['session'].close()
+            self._entries[chart_name] = entry
+            return entry
+
+    def crawl(self, chart_name, crawler_class):
+        """instance.crawl() 실행 → 결과 (요청 / 새 연결 수 기록, 토큰 보관)"""
+        entry = self.get(chart_name, crawler_class)
+        if not entry['lock'].acquire(blocking=False):
+            raise RuntimeError(f"{chart_name}: 이전 실행이 아직 진행 중")
+
+        instance = entry['instance']
+        session = entry['session']
+        requests_before = session.request_count
+        connections_before = session.connection_count()
+        try:
+            return instance.crawl()
+        finally:
+            run = {
+                'requests': session.request_count - requests_before,
+                'connections': session.connection_count() - connections_before,
+            }
+            stats = entry['stats']
+            stats['runs'] += 1
+            stats['requests'] += run['requests']
+            stats['connections'] += run['connections']
+            stats['last_run'] = run
+            entry['lock'].release()
+
+            token = getattr(instance, 'token', None)
+            if token:
+                try:
+                    self.tokens.set(chart_name, token, getattr(instance, 'token_expires', 0))
+                except OSError as e:
+                    logger.warning(f"토큰 저장 실패 ({chart_name}): {e}")
+
+    def last_run(self, chart_name):
+        entry = self._entries.get(chart_name)
+        return entry['stats']['last_run'] if entry else None
+
+    def reset(self, chart_name=None):
+        """인스턴스 폐기 (다음 실행에서 새로 생성)"""
+        with self._lock:
+            names = [chart_name] if chart_name else list(self._entries)
+            for name in names:
+                entry = self._entries.pop(name, None)
+                if entry:
+                    entry['session'].close()
+
+    def get_stats(self):
+        return {name: dict(entry['stats']) for name, entry in self._entries.items()}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_crawler_registry(crawler_config=None):
+    """CrawlerRegistry 싱글톤"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = CrawlerRegistry(crawler_config)
+    return _registry
+
+
+# ============================================
+# 벤치마크 (핸드셰이크 수)
+# ============================================
+def bench(runs=6, pages=2):
+    """Spotify 크롤러와 같은 호출 패턴(토큰 1회 + 플레이리스트 pages회)으로 연결 수 비교
+
+    로컬 HTTP/1.1 서버가 받은 연결 수 = 클라이언트 핸드셰이크 수 (HTTPS면 TLS 핸드셰이크도 같은 수).
+    """
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    counter = {'connections': 0, 'token_requests': 0}
+    counter_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            with counter_lock:
+                counter['connections'] += 1
+
+        def _reply(self, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            with counter_lock:
+                counter['token_requests'] += 1
+            self._reply({'access_token': 'token', 'expires_in': 3600})
+
+        def do_GET(self):
+            self._reply({'items': [{'track': {'name': f't{i}'}} for i in range(50)]})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    class BenchCrawler:
+        """SpotifyCrawler 호출 패턴 (session 없으면 requests 모듈 함수)"""
+
+        def __init__(self):
+            self.token = None
+            self.token_expires = 0
+
+        def crawl(self):
+            http = getattr(self, 'session', requests)
+            if not self.token or time.time() >= self.token_expires:
+                data = http.post(f"{base_url}/api/token", data={'grant_type': 'client_credentials'},
+                                 timeout=10).json()
+                self.token, self.token_expires = data['access_token'], time.time() + data['expires_in']
+            tracks = []
+            for page in range(pages):
+                tracks.extend(http.get(f"{base_url}/v1/playlists/x/tracks", params={'offset': page * 50},
+                                       timeout=10).json()['items'])
+            return tracks
+
+    def measure(crawl_once):
+        per_run = []
+        for _ in range(runs):
+            before = counter['connections']
+            crawl_once()
+            per_run.append(counter['connections'] - before)
+        return per_run
+
+    try:
+        tokens_before = counter['token_requests']
+        legacy = measure(lambda: BenchCrawler().crawl())
+        legacy_tokens = counter['token_requests'] - tokens_before
+
+        with tempfile.TemporaryDirectory() as tmp:
+            token_path = Path(tmp) / 'tokens.json'
+            registry = CrawlerRegistry({}, TokenCache(token_path))
+            tokens_before = counter['token_requests']
+            pooled = measure(lambda: registry.crawl('bench', BenchCrawler))
+            # 프로세스 재시작: 새 레지스트리 (토큰은 파일에서 복원)
+            restarted = CrawlerRegistry({}, TokenCache(token_path))
+            pooled += measure(lambda: restarted.crawl('bench', BenchCrawler))[:1]
+            pooled_tokens = counter['token_requests'] - tokens_before
+            registry.reset()
+            restarted.reset()
+    finally:
+        server.shutdown()
+
+    return {
+        'runs': runs,
+        'requests_per_run': pages + 1,
+        'legacy_connections_per_run': legacy,
+        'legacy_token_requests': legacy_tokens,
+        'registry_connections_per_run': pooled,
+        'registry_token_requests': pooled_tokens,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='크롤러 레지스트리')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    bench_parser = subparsers.add_parser('bench', help='실행별 핸드셰이크 수 비교 (로컬 서버)')
+    bench_parser.add_argument('--runs', type=int, default=6)
+    bench_parser.add_argument('--pages', type=int, default=2)
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        results = bench(args.runs, args.pages)
+        print(f"🔌 실행 {results['runs']}회 (실행당 요청 {results['requests_per_run']}개)")
+        print(f"  이전 (매번 새 인스턴스 + requests.get): 실행별 연결 {results['legacy_connections_per_run']}, "
+              f"토큰 발급 {results['legacy_token_requests']}회")
+        print(f"  레지스트리 (+ 재시작 후 1회):          실행별 연결 {results['registry_connections_per_run']}, "
+              f"토큰 발급 {results['registry_token_requests']}회")
+
+
+if __name__ == '__main__':
+    main()
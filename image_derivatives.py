@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Image Derivatives - 앨범 이미지 다중 크기 렌디션 생성
+- 64 / 300 / 640 JPEG + WebP 렌디션 (Pillow)
+- 원본과 같은 폴더의 renditions/ 아래 {stem}_{size}.{jpg|webp} 로 저장
+- 요청 size를 덮는 가장 작은 렌디션 선택 (Accept 헤더로 WebP 여부 결정)
+- 작은 렌디션(64 / 300)은 개별 파일 대신 썸네일 팩(thumb_pack.py)에 저장
+  (팩 키는 static/ 기준 상대 경로 - 폴더가 다른 같은 이름 렌디션이 겹치지 않음,
+   해시 저장소 렌디션은 파일명 자체가 내용 해시)
+
+사용법:
+    python3 image_derivatives.py backfill            # static/track_images 전체
+    python3 image_derivatives.py backfill --force    # 기존 렌디션도 재생성
+"""
+
+import argparse
+import io
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from thumb_pack import get_thumb_pack
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+TRACK_IMAGES_DIR = BASE_DIR / 'static' / 'track_images'
+STATIC_ROOT = os.path.abspath(BASE_DIR / 'static')
+
+RENDITION_SIZES = (64, 300, 640)
+RENDITIONS_DIRNAME = 'renditions'
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+# 팩에 저장할 렌디션 크기 (파일 수 / open·read·close 절약)
+THUMB_PACK_ENABLED = os.getenv('THUMB_PACK_ENABLED', '1') == '1'
+PACKED_SIZES = tuple(
+    int(size) for size in os.getenv('THUMB_PACK_SIZES', '64,300').split(',') if size.strip()
+) if THUMB_PACK_ENABLED else ()
+
+MIMETYPES = {
+    'jpg': 'image/jpeg',
+    'webp': 'image/webp',
+}
+
+
+def renditions_dir(source_path):
+    return Path(source_path).parent / RENDITIONS_DIRNAME
+
+
+def rendition_path(source_path, size, ext):
+    source_path = Path(source_path)
+    return renditions_dir(source_path) / f"{source_path.stem}_{size}.{ext}"
+
+
+def accepts_webp(accept_header):
+    """Accept 헤더에 image/webp가 있는지"""
+    return 'image/webp' in (accept_header or '')
+
+
+def pack_name(path):
+    """렌디션 경로 → 썸네일 팩 키 (static/ 기준 상대 경로, 밖이면 절대 경로 - 시스템 콜 없음)"""
+    path = os.path.abspath(path)
+    if path.startswith(STATIC_ROOT + os.sep):
+        path = path[len(STATIC_ROOT) + 1:]
+    return Path(path).as_posix()
+
+
+def is_packed(path):
+    """렌디션 경로가 썸네일 팩에 들어 있는지 (파일은 없을 수 있음)"""
+    return bool(PACKED_SIZES) and get_thumb_pack().contains(pack_name(path))
+
+
+def rendition_exists(path):
+    return Path(path).exists() or is_packed(path)
+
+
+def find_rendition(source_path, size, webp=False):
+    """요청 size를 덮는 가장 작은 렌디션 → (path, mimetype), 없으면 None
+
+    size가 가장 큰 렌디션보다 크면 원본을 그대로 쓰도록 None을 돌려준다.
+    """
+    exts = ('webp', 'jpg') if webp else ('jpg',)
+    for rendition_size in RENDITION_SIZES:
+        if rendition_size < size:
+            continue
+        for ext in exts:
+            path = rendition_path(source_path, rendition_size, ext)
+            if rendition_exists(path):
+                return path, MIMETYPES[ext]
+        # 덮는 크기 중 가장 작은 것만 확인 (없으면 원본)
+        return None
+    return None
+
+
+def generate_derivatives(source_path, force=False):
+    """원본 이미지 하나의 렌디션 생성 → 생성한 파일 수"""
+    if not PIL_AVAILABLE:
+        return 0
+
+    source_path = Path(source_path)
+    if not source_path.exists():
+        return 0
+
+    source_mtime = source_path.stat().st_mtime
+
+    with Image.open(source_path) as original:
+        # 원본보다 큰 렌디션은 만들지 않음 (원본이 그 역할, 가장 작은 크기는 항상 생성)
+        longest = max(original.size)
+        pack = get_thumb_pack()
+        targets = []
+        for size in RENDITION_SIZES:
+            if size > longest and size != RENDITION_SIZES[0]:
+                continue
+            for ext in MIMETYPES:
+                path = rendition_path(source_path, size, ext)
+                if size in PACKED_SIZES:
+                    stale = (pack.mtime(pack_name(path)) or 0) < source_mtime
+                else:
+                    stale = not path.exists() or path.stat().st_mtime < source_mtime
+                if force or stale:
+                    targets.append((size, ext, path))
+
+        if not targets:
+            return 0
+
+        image = original.convert('RGB')
+
+    packed = []
+    created = 0
+    for size, ext, path in targets:
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+
+        if size in PACKED_SIZES:
+            buffer = io.BytesIO()
+            save_rendition(resized, buffer, ext)
+            packed.append((pack_name(path), buffer.getvalue(), source_mtime))
+        else:
+            renditions_dir(source_path).mkdir(exist_ok=True)
+            tmp_path = path.with_name(path.name + '.tmp')
+            save_rendition(resized, tmp_path, ext)
+            os.replace(tmp_path, path)
+        created += 1
+
+    if packed:
+        pack.put_many(packed)
+
+    return created
+
+
+def save_rendition(image, target, ext):
+    if ext == 'webp':
+        image.save(target, 'WEBP', quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(target, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+
+
+def on_image_saved(path, artist=None, track=None, url=None, chart_name=None):
+    """ImageDownloader 저장 훅"""
+    try:
+        created = generate_derivatives(path)
+        if created:
+            logger.debug(f"렌디션 생성: {Path(path).name} ({created}개)")
+    except Exception as e:
+        logger.error(f"렌디션 생성 실패: {path}: {e}")
+
+
+def backfill(images_dir=TRACK_IMAGES_DIR, force=False, workers=4):
+    """기존 이미지 전체 렌디션 생성"""
+    sources = sorted(Path(images_dir).glob('*.jpg'))
+    start_time = time.time()
+
+    stats = {'total': len(sources), 'created': 0, 'failed': 0}
+
+    def process(path):
+        try:
+            return generate_derivatives(path, force=force)
+        except Exception as e:
+            logger.error(f"렌디션 생성 실패: {path.name}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for idx, created in enumerate(executor.map(process, sources), 1):
+            if created is None:
+                stats['failed'] += 1
+            else:
+                stats['created'] += created
+
+            if idx % 100 == 0:
+                print(f"📊 진행률: {idx}/{len(sources)}")
+
+    stats['duration_seconds'] = round(time.time() - start_time, 1)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='앨범 이미지 렌디션 생성')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    backfill_parser = subparsers.add_parser('backfill', help='기존 이미지 렌디션 일괄 생성')
+    backfill_parser.add_argument('--dir', default=str(TRACK_IMAGES_DIR), help='원본 이미지 폴더')
+    backfill_parser.add_argument('--force', action='store_true', help='기존 렌디션도 재생성')
+    backfill_parser.add_argument('--workers', type=int, default=4)
+
+    args = parser.parse_args()
+
+    if not PIL_AVAILABLE:
+        print("❌ Pillow 미설치: pip install Pillow")
+        return
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'backfill':
+        stats = backfill(args.dir, force=args.force, workers=args.workers)
+        print(f"✅ 완료: 원본 {stats['total']}개, 렌디션 {stats['created']}개 생성, "
+              f"실패 {stats['failed']}개 ({stats['duration_seconds']}초)")
+
+
+if __name__ == '__main__':
+    main()
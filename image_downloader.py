@@ -0,0 +1,600 @@
+"""
+Image Downloader - 앨범 이미지 다운로드 워커 풀
+- 고정 크기 워커 스레드 + 호스트별 동시성 제한
+- URL 기준 중복 제거 (처리 중/대기 중인 URL은 다시 넣지 않음)
+- 지수 백오프 재시도
+- SQLite 영구 큐 (재시작 후 미완료 작업 재개, API/스케줄러 프로세스 공유)
+- 처리량 / 큐 길이 메트릭
+- 조건부 재다운로드 (ETag / Last-Modified → 304면 쓰기 생략, 내용 해시가 같아도 생략)
+- artist:track → 파일명 매핑은 큐 DB(download_mapping)에 기록, download_mapping.json은
+  워커 풀이 비었을 때 / wait() / 주기적으로만 내보냄 (다운로드마다 JSON 전체를 다시 쓰지 않음)
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+
+from image_stats import get_image_stats
+from image_store import conditional_headers, content_hash, get_image_store, link_or_copy
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+TRACK_IMAGES_DIR = BASE_DIR / 'static' / 'track_images'
+QUEUE_DB = BASE_DIR / 'image_downloads.db'
+
+MAX_WORKERS = int(os.getenv('IMAGE_DOWNLOAD_WORKERS', '8'))
+PER_HOST_LIMIT = int(os.getenv('IMAGE_DOWNLOAD_PER_HOST', '3'))
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0  # 초
+MAX_QUEUE_SIZE = 1000
+# running 상태로 이 시간 이상 남은 작업은 죽은 프로세스 것으로 보고 재개
+STALE_RUNNING_SECONDS = 600
+RESUME_INTERVAL = 30
+# 실패한 URL 재예약: 최대 실패 횟수 / 마지막 실패 후 대기 시간
+MAX_ATTEMPTS = int(os.getenv('IMAGE_DOWNLOAD_MAX_ATTEMPTS', '5'))
+FAILED_RETRY_SECONDS = int(os.getenv('IMAGE_DOWNLOAD_RETRY_SECONDS', '600'))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def image_filename(artist, track):
+    """다운로드 저장 파일명 ({artist}_{track}_HQ.jpg)"""
+    safe_artist = re.sub(r'[<>:"/\\|?*]', '_', artist)[:50]
+    safe_track = re.sub(r'[<>:"/\\|?*]', '_', track)[:50]
+    return f"{safe_artist}_{safe_track}_HQ.jpg"
+
+
+class ImageDownloader:
+    """앨범 이미지 다운로드 서비스"""
+
+    def __init__(self, images_dir=TRACK_IMAGES_DIR, queue_db=QUEUE_DB,
+                 max_workers=MAX_WORKERS, per_host_limit=PER_HOST_LIMIT,
+                 max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE, store=None, image_stats=None):
+        self.images_dir = Path(images_dir)
+        self.store = store
+        self.image_stats = image_stats
+        self.mapping_path = self.images_dir / 'download_mapping.json'
+        self.queue_db = Path(queue_db)
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+
+        self._queue = queue.Queue(maxsize=MAX_QUEUE_SIZE)
+        self._inflight = set()          # 대기/처리 중 URL (중복 제거)
+        self._inflight_lock = threading.Lock()
+        self._idle = threading.Condition(self._inflight_lock)
+        self._host_slots = {}
+        self._host_active = {}
+        self._host_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._mapping_lock = threading.Lock()
+        self._mapping_dirty = False     # JSON 내보내기 이후 매핑 변경 여부
+        self._save_hooks = []
+
+        self._session = requests.Session()
+        self._session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        })
+
+        self._stats_lock = threading.Lock()
+        self._started_at = time.time()
+        self.stats = {
+            'enqueued': 0,
+            'deduplicated': 0,
+            'completed': 0,
+            'failed': 0,
+            'retries': 0,
+            'bytes': 0,
+            'not_modified': 0,       # 304 응답
+            'unchanged': 0,          # 200이지만 내용 해시 동일
+            'bytes_saved': 0,        # 304로 받지 않은 바이트
+            'write_bytes_saved': 0,  # 해시 동일로 쓰지 않은 바이트
+        }
+
+        self.images_dir.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+        self._threads = []
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._worker, name=f'image-dl-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        resumer = threading.Thread(target=self._resume_loop, name='image-dl-resume', daemon=True)
+        resumer.start()
+
+        logger.info(f"ImageDownloader 시작: 워커 {self.max_workers}개, 호스트당 {self.per_host_limit}개")
+
+    # ============================================
+    # 영구 큐 (SQLite)
+    # ============================================
+    def _connect(self):
+        conn = sqlite3.connect(str(self.queue_db), timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS download_queue (
+                    url TEXT PRIMARY KEY,
+                    artist TEXT NOT NULL,
+                    track TEXT NOT NULL,
+                    chart_name TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    last_error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at REAL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_download_status
+                ON download_queue(status, updated_at)
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS download_mapping (
+                    key TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    updated_at REAL
+                )
+            """)
+
+            # 처음 만들 때 기존 JSON 매핑 가져오기
+            empty = conn.execute("SELECT 1 FROM download_mapping LIMIT 1").fetchone() is None
+            if empty and self.mapping_path.exists():
+                try:
+                    with open(self.mapping_path, 'r', encoding='utf-8') as f:
+                        mapping = json.load(f)
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO download_mapping (key, filename, updated_at) VALUES (?, ?, ?)",
+                        [(key, filename, time.time()) for key, filename in mapping.items()]
+                    )
+                except Exception as e:
+                    logger.error(f"매핑 파일 읽기 에러: {e}")
+            conn.commit()
+            conn.close()
+
+    def _db_execute(self, sql, params=()):
+        with self._db_lock:
+            conn = self._connect()
+            try:
+                cursor = conn.execute(sql, params)
+                conn.commit()
+                return cursor.rowcount
+            finally:
+                conn.close()
+
+    def _claim(self, url):
+        """pending → running (다른 프로세스가 이미 가져갔으면 False)"""
+        return self._db_execute("""
+            UPDATE download_queue
+            SET status = 'running', updated_at = ?
+            WHERE url = ? AND status = 'pending'
+        """, (time.time(), url)) > 0
+
+    def pending_count(self):
+        """영구 큐에 남은 작업 수 (모든 프로세스 합계)"""
+        with self._db_lock:
+            conn = self._connect()
+            try:
+                row = conn.execute("""
+                    SELECT COUNT(*) FROM download_queue
+                    WHERE status IN ('pending', 'running')
+                """).fetchone()
+                return row[0]
+            finally:
+                conn.close()
+
+    # ============================================
+    # 공개 API
+    # ============================================
+    def add_save_hook(self, hook):
+        """저장 완료 콜백 등록: hook(path, artist, track, url, chart_name)"""
+        self._save_hooks.append(hook)
+
+    def enqueue(self, url, artist, track, chart_name=None, refresh=False):
+        """다운로드 예약 - 이미 로컬에 있거나 대기/처리 중이거나 재시도 한도를 넘었으면 False
+
+        refresh=True면 로컬 파일이 있어도 예약 (조건부 요청으로 변경 여부만 확인)
+        실패한 행은 MAX_ATTEMPTS 미만이고 FAILED_RETRY_SECONDS가 지났으면 pending으로 되돌림
+        """
+        if not url or not url.startswith('http') or not artist or not track:
+            return False
+
+        if not refresh and (self.images_dir / image_filename(artist, track)).exists():
+            return False
+
+        with self._inflight_lock:
+            if url in self._inflight:
+                with self._stats_lock:
+                    self.stats['deduplicated'] += 1
+                return False
+
+        now = time.time()
+        queued = self._db_execute("""
+            INSERT INTO download_queue (url, artist, track, chart_name, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                artist = excluded.artist,
+                track = excluded.track,
+                chart_name = COALESCE(excluded.chart_name, download_queue.chart_name),
+                status = 'pending',
+                updated_at = excluded.updated_at
+            WHERE (download_queue.status = 'failed'
+                   AND download_queue.attempts < ?
+                   AND download_queue.updated_at < ?)
+            OR (download_queue.status = 'running'
+                AND download_queue.updated_at < ?)
+        """, (url, artist, track, chart_name, now,
+              MAX_ATTEMPTS, now - FAILED_RETRY_SECONDS, now - STALE_RUNNING_SECONDS)) > 0
+
+        with self._stats_lock:
+            self.stats['enqueued' if queued else 'deduplicated'] += 1
+
+        if not queued:
+            # 이미 pending(다른 프로세스 / 큐 가득 참 → resume 루프가 처리) 또는 실패 한도 초과
+            return False
+
+        # 메모리 큐가 가득 차도 영구 큐에는 들어갔으므로 예약 성공
+        self._submit(url, artist, track, chart_name)
+        return True
+
+    def enqueue_many(self, items, chart_name=None):
+        """크롤링 결과 전체 예약 (item: image_url / artist / track|title)"""
+        queued = 0
+        for item in items:
+            if self.enqueue(
+                item.get('image_url'),
+                item.get('artist', ''),
+                item.get('track') or item.get('title', ''),
+                chart_name
+            ):
+                queued += 1
+        return queued
+
+    def wait(self, timeout=None):
+        """대기/처리 중인 작업이 모두 끝날 때까지 대기 (끝나면 매핑 JSON 내보내기)"""
+        deadline = time.time() + timeout if timeout else None
+        with self._idle:
+            while self._inflight:
+                remaining = deadline - time.time() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    self.flush_mapping()
+                    return False
+                self._idle.wait(remaining)
+        self.flush_mapping()
+        return True
+
+    def flush_mapping(self):
+        """download_mapping 테이블 → download_mapping.json (변경 있을 때만, 원자적 교체)"""
+        with self._mapping_lock:
+            if not self._mapping_dirty:
+                return False
+            self._mapping_dirty = False
+
+            try:
+                with self._db_lock:
+                    conn = self._connect()
+                    try:
+                        rows = conn.execute("SELECT key, filename FROM download_mapping ORDER BY key").fetchall()
+                    finally:
+                        conn.close()
+
+                # 다른 프로세스와 임시 파일이 겹치지 않게 pid 포함
+                tmp_path = self.mapping_path.with_suffix(f'.json.{os.getpid()}.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({row['key']: row['filename'] for row in rows}, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.mapping_path)
+            except Exception as e:
+                self._mapping_dirty = True
+                logger.error(f"매핑 파일 쓰기 에러: {e}")
+                return False
+            return True
+
+    def get_stats(self):
+        """처리량 / 큐 길이 메트릭"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        elapsed = max(time.time() - self._started_at, 1e-6)
+
+        with self._inflight_lock:
+            inflight = len(self._inflight)
+        with self._host_lock:
+            host_active = {host: n for host, n in self._host_active.items() if n}
+
+        stats.update({
+            'queue_depth': self._queue.qsize(),
+            'in_flight': inflight,
+            'persistent_pending': self.pending_count(),
+            'workers': self.max_workers,
+            'per_host_limit': self.per_host_limit,
+            'host_active': host_active,
+            'uptime_seconds': round(elapsed, 1),
+            'throughput_per_min': round(stats['completed'] / elapsed * 60, 2),
+            'bytes_per_sec': round(stats['bytes'] / elapsed, 1),
+        })
+        return stats
+
+    # ============================================
+    # 내부 처리
+    # ============================================
+    def _submit(self, url, artist, track, chart_name):
+        with self._inflight_lock:
+            if url in self._inflight:
+                return False
+            try:
+                self._queue.put_nowait((url, artist, track, chart_name))
+            except queue.Full:
+                # 영구 큐에 남겨두고 resume 루프가 나중에 가져감
+                return False
+            self._inflight.add(url)
+        return True
+
+    def _done(self, url):
+        """처리 완료 → 워커 풀이 비었으면 True"""
+        with self._idle:
+            self._inflight.discard(url)
+            if not self._inflight:
+                self._idle.notify_all()
+                return True
+            return False
+
+    def _get(self, url, headers=None):
+        """호스트별 동시성 제한 안에서 GET"""
+        host = urlparse(url).netloc
+        with self._host_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            slot = self._host_slots[host]
+
+        with slot:
+            with self._host_lock:
+                self._host_active[host] = self._host_active.get(host, 0) + 1
+            try:
+                return self._session.get(url, headers=headers, timeout=10)
+            finally:
+                with self._host_lock:
+                    self._host_active[host] -= 1
+
+    def _resume_loop(self):
+        """영구 큐의 미완료 작업 재개 (재시작 / 큐 가득 참 / 다른 프로세스 중단)"""
+        while True:
+            try:
+                self._db_execute("""
+                    UPDATE download_queue
+                    SET status = 'pending'
+                    WHERE status = 'running' AND updated_at < ?
+                """, (time.time() - STALE_RUNNING_SECONDS,))
+
+                with self._db_lock:
+                    conn = self._connect()
+                    rows = conn.execute("""
+                        SELECT url, artist, track, chart_name
+                        FROM download_queue
+                        WHERE status = 'pending'
+                        ORDER BY updated_at
+                        LIMIT ?
+                    """, (MAX_QUEUE_SIZE,)).fetchall()
+                    conn.close()
+
+                for row in rows:
+                    if self._queue.full():
+                        break
+                    self._submit(row['url'], row['artist'], row['track'], row['chart_name'])
+
+            except Exception as e:
+                logger.error(f"다운로드 큐 재개 실패: {e}")
+
+            # 워커 풀이 계속 바쁜 경우에도 주기적으로 내보냄
+            self.flush_mapping()
+
+            time.sleep(RESUME_INTERVAL)
+
+    def _worker(self):
+        while True:
+            url, artist, track, chart_name = self._queue.get()
+            try:
+                if self._claim(url):
+                    self._process(url, artist, track, chart_name)
+            except Exception as e:
+                logger.error(f"다운로드 워커 에러: {url}: {e}")
+                # running으로 남지 않게 실패 처리 (enqueue가 재시도 한도 안에서 다시 예약)
+                try:
+                    self._mark_failed(url, str(e))
+                except sqlite3.Error as db_error:
+                    logger.error(f"다운로드 큐 상태 갱신 실패: {url}: {db_error}")
+            finally:
+                idle = self._done(url)
+                self._queue.task_done()
+                if idle:
+                    self.flush_mapping()
+
+    def _fetch(self, url, headers=None):
+        """재시도 + 백오프 포함 다운로드 → (status, content, response_headers, error)
+
+        status: 200 / 304 (조건부 요청 - 변경 없음) / None (실패)
+        """
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                with self._stats_lock:
+                    self.stats['retries'] += 1
+                time.sleep(self.backoff_base * (2 ** (attempt - 1)) + random.uniform(0, 0.5))
+
+            try:
+                response = self._get(url, headers)
+            except requests.RequestException as e:
+                last_error = str(e)
+                continue
+
+            if response.status_code == 304 and headers:
+                return 304, None, response.headers, None
+
+            if response.status_code == 200 and response.content:
+                return 200, response.content, response.headers, None
+
+            last_error = f"HTTP {response.status_code}"
+            if response.status_code not in RETRYABLE_STATUS:
+                break
+
+        return None, None, None, last_error
+
+    def _process(self, url, artist, track, chart_name):
+        # 이전에 받은 적 있는 URL이면 조건부 요청
+        source = self.store.get_source(url) if self.store is not None else None
+        status, content, response_headers, error = self._fetch(url, conditional_headers(source))
+
+        # 검증자는 있는데 저장소 파일이 없어짐 → 304로는 복구할 수 없으니 전체 다운로드
+        if source is not None and status == 304 and not self.store.blob_path(source['hash'], source['ext']).exists():
+            source = None
+            status, content, response_headers, error = self._fetch(url)
+
+        if status is None:
+            self._mark_failed(url, error)
+            with self._stats_lock:
+                self.stats['failed'] += 1
+            logger.warning(f"이미지 다운로드 실패: {artist} - {track}: {error}")
+            return
+
+        filename = image_filename(artist, track)
+        path = self.images_dir / filename
+
+        # 304 또는 내용 해시 동일 → 저장소 쓰기 생략, 매핑/링크만 보장
+        if status == 304:
+            unchanged_size = source['content_length'] or 0
+        elif (source is not None and content_hash(content) == source['hash']
+              and self.store.blob_path(source['hash'], source['ext']).exists()):
+            unchanged_size = len(content)
+        else:
+            unchanged_size = None
+
+        if unchanged_size is not None:
+            self._keep_unchanged(url, artist, track, chart_name, source, path, response_headers)
+            with self._stats_lock:
+                self.stats['completed'] += 1
+                if status == 304:
+                    self.stats['not_modified'] += 1
+                    self.stats['bytes_saved'] += unchanged_size
+                else:
+                    self.stats['unchanged'] += 1
+                    self.stats['bytes'] += len(content)
+                    self.stats['write_bytes_saved'] += unchanged_size
+            logger.debug(f"이미지 변경 없음: {filename} ({'304' if status == 304 else '해시 동일'})")
+            return
+
+        if self.store is not None:
+            # 콘텐츠 주소 저장소에 한 번만 저장하고 기존 파일명은 하드링크로 유지
+            hash_value, ext, saved_path = self.store.put(content, artist, track, source_url=url)
+            self.store.record_source(url, hash_value, ext, response_headers, len(content))
+            link_or_copy(saved_path, path)
+        else:
+            saved_path = path
+            tmp_path = path.with_suffix('.jpg.tmp')
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+        mapping_count = self._update_mapping(artist, track, filename)
+        self._db_execute("DELETE FROM download_queue WHERE url = ?", (url,))
+
+        if self.image_stats is not None:
+            try:
+                self.image_stats.record_download(filename, len(content), chart_name, mapping_count)
+            except Exception as e:
+                logger.error(f"이미지 통계 갱신 실패: {filename}: {e}")
+
+        with self._stats_lock:
+            self.stats['completed'] += 1
+            self.stats['bytes'] += len(content)
+
+        for hook in self._save_hooks:
+            try:
+                hook(saved_path, artist, track, url, chart_name)
+            except Exception as e:
+                logger.error(f"저장 후처리 실패: {filename}: {e}")
+
+        logger.debug(f"이미지 저장: {filename} ({len(content) / 1024:.1f}KB)")
+
+    def _mark_failed(self, url, error):
+        self._db_execute("""
+            UPDATE download_queue
+            SET status = 'failed', attempts = attempts + 1, last_error = ?, updated_at = ?
+            WHERE url = ?
+        """, (error, time.time(), url))
+
+    def _keep_unchanged(self, url, artist, track, chart_name, source, path, response_headers):
+        """변경 없는 이미지: 새 (artist, track)에도 기존 파일 연결 + 검증자 갱신"""
+        blob = self.store.blob_path(source['hash'], source['ext'])
+        self.store.assign(artist, track, source['hash'], source['ext'],
+                          source['content_length'], source_url=url)
+        self.store.record_source(url, source['hash'], source['ext'], response_headers)
+
+        created = not path.exists()
+        if created or path.stat().st_ino != blob.stat().st_ino:
+            link_or_copy(blob, path)
+
+        mapping_count = self._update_mapping(artist, track, path.name)
+        self._db_execute("DELETE FROM download_queue WHERE url = ?", (url,))
+
+        if created and self.image_stats is not None:
+            try:
+                self.image_stats.record_download(path.name, blob.stat().st_size, chart_name, mapping_count)
+            except Exception as e:
+                logger.error(f"이미지 통계 갱신 실패: {path.name}: {e}")
+
+    def _update_mapping(self, artist, track, filename):
+        """download_mapping 테이블에 artist:track → 파일명 기록 → 매핑 수 (JSON은 flush_mapping에서)"""
+        with self._db_lock:
+            conn = self._connect()
+            try:
+                conn.execute("""
+                    INSERT INTO download_mapping (key, filename, updated_at)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        filename = excluded.filename,
+                        updated_at = excluded.updated_at
+                    WHERE download_mapping.filename != excluded.filename
+                """, (f"{artist}:{track}", filename, time.time()))
+                changed = conn.total_changes > 0
+                conn.commit()
+                count = conn.execute("SELECT COUNT(*) FROM download_mapping").fetchone()[0]
+            finally:
+                conn.close()
+
+        if changed:
+            with self._mapping_lock:
+                self._mapping_dirty = True
+        return count
+
+
+_downloader = None
+_downloader_lock = threading.Lock()
+
+
+def get_downloader():
+    """ImageDownloader 싱글톤 (프로세스당 하나의 워커 풀)"""
+    global _downloader
+    if _downloader is None:
+        with _downloader_lock:
+            if _downloader is None:
+                _downloader = ImageDownloader(store=get_image_store(), image_stats=get_image_stats())
+
+                # 저장 시 다중 크기 렌디션 생성 (Pillow 있을 때)
+                from image_derivatives import PIL_AVAILABLE, on_image_saved
+                if PIL_AVAILABLE:
+                    _downloader.add_save_hook(on_image_saved)
+    return _downloader
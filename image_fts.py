@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Track Name FTS - 아티스트/트랙명 퍼지 매칭 인덱스 (SQLite FTS5 trigram)
+- track_name_index: (artist, track)별 정규화 이름 + 이미지 정보 (파이프라인이 갱신)
+- track_name_fts: 정규화 이름 trigram 인덱스 (external content + 트리거로 동기화)
+- LIKE '%...%' 전체 스캔 대신 인덱스 부분 문자열 검색 후 유사도 순 정렬
+
+사용법:
+    python3 image_fts.py bench --rows 200000    # 히스토리 규모 벤치마크 (FTS vs LIKE)
+"""
+
+import argparse
+import random
+import re
+import sqlite3
+import statistics
+import string
+import tempfile
+import time
+import unicodedata
+from difflib import SequenceMatcher
+from pathlib import Path
+
+# trigram 토크나이저 최소 검색 길이
+MIN_TRIGRAM_LENGTH = 3
+CANDIDATE_LIMIT = 20
+MIN_SIMILARITY = 0.3
+
+
+def normalize_name(text):
+    """매칭용 정규화: NFKC + 소문자 + 괄호(feat. 등) 제거 + 구두점 제거"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', str(text)).lower()
+    text = re.sub(r'[\(\[].*?[\)\]]', ' ', text)
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return ' '.join(text.split())
+
+
+def ensure_fts(conn):
+    """인덱스 테이블 + FTS5 가상 테이블 + 동기화 트리거 생성"""
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS track_name_index (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            artist TEXT NOT NULL,
+            track TEXT NOT NULL,
+            artist_norm TEXT NOT NULL,
+            track_norm TEXT NOT NULL,
+            local_image TEXT,
+            image_url TEXT,
+            updated_at TIMESTAMP,
+            UNIQUE (artist, track)
+        );
+
+        CREATE VIRTUAL TABLE IF NOT EXISTS track_name_fts USING fts5(
+            artist_norm,
+            track_norm,
+            content='track_name_index',
+            content_rowid='id',
+            tokenize='trigram'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS track_name_index_ai AFTER INSERT ON track_name_index BEGIN
+            INSERT INTO track_name_fts(rowid, artist_norm, track_norm)
+            VALUES (new.id, new.artist_norm, new.track_norm);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS track_name_index_ad AFTER DELETE ON track_name_index BEGIN
+            INSERT INTO track_name_fts(track_name_fts, rowid, artist_norm, track_norm)
+            VALUES ('delete', old.id, old.artist_norm, old.track_norm);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS track_name_index_au
+        AFTER UPDATE OF artist_norm, track_norm ON track_name_index BEGIN
+            INSERT INTO track_name_fts(track_name_fts, rowid, artist_norm, track_norm)
+            VALUES ('delete', old.id, old.artist_norm, old.track_norm);
+            INSERT INTO track_name_fts(rowid, artist_norm, track_norm)
+            VALUES (new.id, new.artist_norm, new.track_norm);
+        END;
+    """)
+
+
+def upsert_names(conn, rows):
+    """(artist, track, local_image, image_url, updated_at) 목록 반영 → 처리 행 수"""
+    params = [
+        (artist, track, normalize_name(artist), normalize_name(track),
+         local_image, image_url, updated_at)
+        for artist, track, local_image, image_url, updated_at in rows
+        if artist and track
+    ]
+    conn.executemany("""
+        INSERT INTO track_name_index
+        (artist, track, artist_norm, track_norm, local_image, image_url, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(artist, track) DO UPDATE SET
+            local_image = COALESCE(excluded.local_image, track_name_index.local_image),
+            image_url = COALESCE(NULLIF(excluded.image_url, ''), track_name_index.image_url),
+            updated_at = excluded.updated_at
+    """, params)
+    return len(params)
+
+
+def sync_from_unified(conn, chart_names=None):
+    """unified_master_with_images 현재 행을 인덱스에 반영 (파이프라인에서 호출)
+
+    chart_names: 주어지면 해당 차트의 곡만 반영 (교체된 차트만 동기화)
+    """
+    ensure_fts(conn)
+    chart_filter = ''
+    params = []
+    if chart_names:
+        chart_filter = f"AND chart_name IN ({','.join('?' * len(chart_names))})"
+        params = list(chart_names)
+    rows = conn.execute(f"""
+        SELECT unified_artist, unified_track,
+               MAX(local_image), MAX(image_url), MAX(created_at)
+        FROM unified_master_with_images
+        WHERE unified_artist IS NOT NULL AND unified_track IS NOT NULL
+        {chart_filter}
+        GROUP BY unified_artist, unified_track
+    """, params).fetchall()
+    count = upsert_names(conn, rows)
+    conn.commit()
+    return count
+
+
+def _phrase(text):
+    """FTS5 문자열 리터럴 (따옴표 이스케이프)"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def similarity(artist_norm, track_norm, cand_artist, cand_track):
+    """아티스트/트랙 유사도 가중 평균 (0~1)"""
+    artist_score = SequenceMatcher(None, artist_norm, cand_artist).ratio()
+    track_score = SequenceMatcher(None, track_norm, cand_track).ratio()
+    return round(0.4 * artist_score + 0.6 * track_score, 4)
+
+
+def fuzzy_lookup(conn, artist, track, limit=CANDIDATE_LIMIT, min_similarity=MIN_SIMILARITY):
+    """부분 문자열 후보를 FTS로 찾고 유사도 순으로 최선 1개 반환
+
+    FTS는 후보 수집만 담당하고 (bm25 정렬은 전체 매칭 행 점수 계산이라 생략)
+    순위는 정규화 이름 유사도로 매긴다. 3글자 미만 검색어는 instr 조건으로 SQL에서 거르고,
+    후보는 이름 길이 차이가 작은 순(= 부분 문자열 후보의 유사도 순)으로 잘라서
+    LIMIT이 임의의 rowid 순서로 정답을 잘라내지 않게 한다.
+
+    Returns:
+        {'artist', 'track', 'local_image', 'image_url', 'score'} 또는 None
+    Raises:
+        sqlite3.OperationalError: 인덱스 테이블이 아직 없을 때
+    """
+    artist_norm = normalize_name(artist)
+    track_norm = normalize_name(track)
+    if not artist_norm and not track_norm:
+        return None
+
+    # trigram은 3글자 이상만 인덱스 검색 가능 - 짧은 쪽은 instr로 같은 쿼리에서 거른다
+    # (LIKE는 이름에 남은 '_'를 와일드카드로 해석하므로 instr 사용)
+    terms = []
+    if len(artist_norm) >= MIN_TRIGRAM_LENGTH:
+        terms.append(f"artist_norm : {_phrase(artist_norm)}")
+    if len(track_norm) >= MIN_TRIGRAM_LENGTH:
+        terms.append(f"track_norm : {_phrase(track_norm)}")
+
+    params = (artist_norm, track_norm, len(artist_norm), len(track_norm), limit * 5)
+    order_by = """
+            ORDER BY ABS(LENGTH(i.track_norm) - ?4), ABS(LENGTH(i.artist_norm) - ?3)
+            LIMIT ?5
+    """
+    if terms:
+        rows = conn.execute(f"""
+            SELECT i.artist, i.track, i.artist_norm, i.track_norm, i.local_image, i.image_url
+            FROM track_name_fts f
+            JOIN track_name_index i ON i.id = f.rowid
+            WHERE track_name_fts MATCH ?6
+            AND instr(i.artist_norm, ?1) > 0 AND instr(i.track_norm, ?2) > 0
+            {order_by}
+        """, params + (' AND '.join(terms),)).fetchall()
+    else:
+        rows = conn.execute(f"""
+            SELECT i.artist, i.track, i.artist_norm, i.track_norm, i.local_image, i.image_url
+            FROM track_name_index i
+            WHERE instr(i.artist_norm, ?1) > 0 AND instr(i.track_norm, ?2) > 0
+            {order_by}
+        """, params).fetchall()
+
+    best = None
+    for row in rows:
+        cand_artist, cand_track = row[2], row[3]
+        if artist_norm not in cand_artist or track_norm not in cand_track:
+            continue
+        score = similarity(artist_norm, track_norm, cand_artist, cand_track)
+        if score >= min_similarity and (best is None or score > best['score']):
+            best = {
+                'artist': row[0],
+                'track': row[1],
+                'local_image': row[4],
+                'image_url': row[5],
+                'score': score,
+            }
+
+    return best
+
+
+# ============================================
+# 벤치마크
+# ============================================
+# 실제 차트 데이터처럼 영문 + 한글 음절 혼합
+_HANGUL = [chr(code) for code in range(0xAC00, 0xD7A4, 37)]
+
+
+def _random_name(rng, words):
+    def word():
+        if rng.random() < 0.3:
+            return ''.join(rng.choice(_HANGUL) for _ in range(rng.randint(2, 4)))
+        return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 8)))
+    return ' '.join(word() for _ in range(words))
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return {
+        'p50_ms': round(statistics.median(samples) * 1000, 3),
+        'p99_ms': round(samples[int(len(samples) * 0.99) - 1] * 1000, 3),
+    }
+
+
+def benchmark(rows=200000, queries=500, seed=42):
+    """히스토리 규모 테이블에서 FTS 퍼지 검색 vs LIKE 전체 스캔"""
+    rng = random.Random(seed)
+    db_path = Path(tempfile.mkdtemp()) / 'fts_bench.db'
+    conn = sqlite3.connect(str(db_path))
+
+    conn.execute("""
+        CREATE TABLE unified_master_with_images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            unified_artist TEXT, unified_track TEXT,
+            local_image TEXT, image_url TEXT, created_at TIMESTAMP
+        )
+    """)
+    names = [(_random_name(rng, rng.randint(1, 2)), _random_name(rng, rng.randint(1, 4)))
+             for _ in range(rows)]
+    conn.executemany("""
+        INSERT INTO unified_master_with_images
+        (unified_artist, unified_track, local_image, image_url, created_at)
+        VALUES (?, ?, NULL, 'https://example.com/a.jpg', '2025-01-01')
+    """, names)
+    conn.commit()
+
+    start = time.perf_counter()
+    sync_from_unified(conn)
+    build_seconds = time.perf_counter() - start
+
+    samples = [names[rng.randrange(rows)] for _ in range(queries)]
+    # 앞뒤를 잘라 부분 문자열 검색 상황 재현
+    samples = [(a[1:], t[:max(len(t) - 2, 3)]) for a, t in samples]
+
+    fts_times, like_times, hits = [], [], 0
+    for artist, track in samples:
+        start = time.perf_counter()
+        if fuzzy_lookup(conn, artist, track):
+            hits += 1
+        fts_times.append(time.perf_counter() - start)
+
+    for artist, track in samples[:max(queries // 10, 1)]:
+        start = time.perf_counter()
+        conn.execute("""
+            SELECT local_image, image_url FROM unified_master_with_images
+            WHERE unified_artist LIKE ? AND unified_track LIKE ?
+            ORDER BY created_at DESC LIMIT 1
+        """, (f'%{artist}%', f'%{track}%')).fetchone()
+        like_times.append(time.perf_counter() - start)
+
+    conn.close()
+    return {
+        'rows': rows,
+        'queries': queries,
+        'index_build_seconds': round(build_seconds, 2),
+        'fts': _percentiles(fts_times),
+        'like': _percentiles(like_times),
+        'hit_rate': round(hits / queries, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='트랙명 FTS 인덱스 도구')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    bench_parser = subparsers.add_parser('bench', help='FTS vs LIKE 벤치마크')
+    bench_parser.add_argument('--rows', type=int, default=200000)
+    bench_parser.add_argument('--queries', type=int, default=500)
+
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        result = benchmark(rows=args.rows, queries=args.queries)
+        print(f"📊 {result['rows']:,}행 / {result['queries']}회 조회 "
+              f"(인덱스 구축 {result['index_build_seconds']}초)")
+        print(f"   FTS5 trigram: p50 {result['fts']['p50_ms']}ms, p99 {result['fts']['p99_ms']}ms "
+              f"(적중률 {result['hit_rate']:.0%})")
+        print(f"   LIKE 스캔   : p50 {result['like']['p50_ms']}ms, p99 {result['like']['p99_ms']}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Image Prewarm - 파이프라인 직후 상위 곡 앨범 이미지 미리 준비
+- update_unified_master 이후, 캐시 갱신(공개) 전에 실행
+- 트렌딩 상위 N곡 + 차트별 상위 K곡의 이미지가 로컬(해시 저장소/track_images)에 있는지 확인
+- 없으면 CDN URL(없으면 Spotify)로 다운로드 예약 후 완료 대기
+- 실행별 리포트 (이미 준비됨 / 다운로드 / 실패 / 소요 시간)
+
+사용법:
+    python3 image_prewarm.py --top 100 --per-chart 50
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+from cdn_rules import best_image_url
+from image_downloader import get_downloader
+from image_resolver import get_track_image_index, search_spotify_image
+from image_store import get_image_store
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+DB_PATH = BASE_DIR / 'rank_history.db'
+REPORT_PATH = BASE_DIR / 'logs' / 'image_prewarm_report.json'
+
+PREWARM_TOP_N = int(os.getenv('IMAGE_PREWARM_TOP_N', '100'))
+PREWARM_PER_CHART = int(os.getenv('IMAGE_PREWARM_PER_CHART', '50'))
+PREWARM_TIMEOUT = int(os.getenv('IMAGE_PREWARM_TIMEOUT', '180'))  # 다운로드 대기 (초)
+
+
+def select_targets(conn, top_n=PREWARM_TOP_N, per_chart=PREWARM_PER_CHART):
+    """트렌딩 상위 + 차트별 상위 곡 → [(artist, track, image_url)] (중복 제거, 순위 순)"""
+    trending = conn.execute("""
+        SELECT unified_artist, unified_track, MAX(image_url)
+        FROM unified_master_with_images
+        WHERE rank_position IS NOT NULL
+        AND chart_name NOT IN ('billboard', 'vibe')
+        GROUP BY unified_artist, unified_track
+        ORDER BY COUNT(DISTINCT chart_name) DESC, AVG(rank_position) ASC
+        LIMIT ?
+    """, (top_n,)).fetchall()
+
+    chart_top = conn.execute("""
+        SELECT unified_artist, unified_track, image_url
+        FROM unified_master_with_images
+        WHERE rank_position IS NOT NULL AND rank_position <= ?
+        ORDER BY rank_position, chart_name
+    """, (per_chart,)).fetchall()
+
+    targets = {}
+    for artist, track, image_url in list(trending) + list(chart_top):
+        if not artist or not track:
+            continue
+        key = (artist, track)
+        if key not in targets or (image_url and not targets[key]):
+            targets[key] = image_url
+    return [(artist, track, image_url) for (artist, track), image_url in targets.items()]
+
+
+def is_warm(artist, track, store, index):
+    """album-image-smart가 파일로 바로 응답할 수 있는 곡인지"""
+    if store.lookup(artist, track):
+        return True
+    return bool(index.find_mapped(artist, track) or index.find_by_prefix(artist, track))
+
+
+def prewarm_images(conn, top_n=PREWARM_TOP_N, per_chart=PREWARM_PER_CHART,
+                   timeout=PREWARM_TIMEOUT, use_spotify=True):
+    """상위 곡 이미지 준비 → 리포트 dict (warmed_pairs: 새로 받은 곡)"""
+    start_time = time.time()
+    store = get_image_store()
+    index = get_track_image_index()
+    downloader = get_downloader()
+
+    targets = select_targets(conn, top_n, per_chart)
+    report = {
+        'started_at': datetime.now().isoformat(),
+        'targets': len(targets),
+        'already_warm': 0,
+        'queued': 0,
+        'spotify_lookups': 0,
+        'no_source': 0,
+        'downloaded': 0,
+        'still_cold': 0,
+        'timed_out': False,
+    }
+
+    queued = []
+    for artist, track, image_url in targets:
+        if is_warm(artist, track, store, index):
+            report['already_warm'] += 1
+            continue
+
+        url = best_image_url(image_url) if image_url and image_url.startswith('http') else None
+        if not url and use_spotify:
+            report['spotify_lookups'] += 1
+            url = search_spotify_image(artist, track, 640)
+
+        if not url:
+            report['no_source'] += 1
+            continue
+
+        # 같은 URL이 처리 중이어도 완료 후 확인 대상에 포함
+        downloader.enqueue(url, artist, track, refresh=True)
+        queued.append((artist, track))
+
+    report['queued'] = len(queued)
+
+    if queued:
+        report['timed_out'] = not downloader.wait(timeout)
+
+    index = get_track_image_index()
+    warmed = [(artist, track) for artist, track in queued if is_warm(artist, track, store, index)]
+    report['downloaded'] = len(warmed)
+    report['still_cold'] = len(queued) - len(warmed) + report['no_source']
+    report['duration_seconds'] = round(time.time() - start_time, 1)
+    report['warmed_pairs'] = warmed
+
+    logger.info(f"  🔥 이미지 프리웜: 대상 {report['targets']}개, 이미 준비 {report['already_warm']}개, "
+                f"다운로드 {report['downloaded']}/{report['queued']}개, 미준비 {report['still_cold']}개 "
+                f"({report['duration_seconds']}초{', 대기 시간 초과' if report['timed_out'] else ''})")
+    return report
+
+
+def save_report(report, path=REPORT_PATH):
+    """마지막 실행 리포트 저장 (warmed_pairs 제외)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {key: value for key, value in report.items() if key != 'warmed_pairs'}
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='상위 곡 앨범 이미지 프리웜')
+    parser.add_argument('--top', type=int, default=PREWARM_TOP_N, help='트렌딩 상위 곡 수')
+    parser.add_argument('--per-chart', type=int, default=PREWARM_PER_CHART, help='차트별 상위 곡 수')
+    parser.add_argument('--timeout', type=int, default=PREWARM_TIMEOUT, help='다운로드 대기 (초)')
+    parser.add_argument('--no-spotify', action='store_true', help='CDN URL 없는 곡의 Spotify 검색 생략')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    conn = sqlite3.connect(str(DB_PATH))
+    try:
+        report = prewarm_images(conn, args.top, args.per_chart, args.timeout,
+                                use_spotify=not args.no_spotify)
+    finally:
+        conn.close()
+
+    save_report(report)
+    print(json.dumps({k: v for k, v in report.items() if k != 'warmed_pairs'},
+                     ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Image Quality Audit - album-image-smart 이미지 품질 점검
+- DB에서 트랙 N개 샘플링 → 리졸버 동시 호출 (제한된 워커 풀)
+- 트랙별 크기 / 해상도 / 리다이렉트 체인 / 지연 시간 / 해석 경로(X-Image-Source) 기록
+- JSON / CSV 리포트 + 백분위 요약
+- --app 모드: Flask test client로 로컬 앱 직접 호출 (오프라인 실행 가능)
+
+사용법:
+    python3 image_quality_audit.py --app backend_app:app --sample 200
+    python3 image_quality_audit.py --base-url https://api.kpopranker.chargeapp.net --sample 50 --csv audit.csv
+"""
+
+import argparse
+import csv
+import importlib
+import io
+import json
+import random
+import sqlite3
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote, urljoin
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+BASE_DIR = Path(__file__).parent
+DB_PATH = BASE_DIR / 'rank_history.db'
+
+MAX_REDIRECTS = 5
+DEFAULT_WORKERS = 8
+
+# check_browser_network.py와 같은 기준 (640 요청 기준)
+HIGH_QUALITY_BYTES = 50 * 1024
+MEDIUM_QUALITY_BYTES = 30 * 1024
+HIGH_QUALITY_PIXELS = 600
+
+CSV_FIELDS = [
+    'artist', 'track', 'status', 'source', 'final_url', 'redirects', 'content_type',
+    'content_length', 'width', 'height', 'latency_ms', 'quality', 'error',
+]
+
+
+def sample_tracks(db_path=DB_PATH, sample=100, seed=None):
+    """unified_master_with_images에서 (artist, track) 샘플링"""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        rows = conn.execute("""
+            SELECT DISTINCT unified_artist, unified_track
+            FROM unified_master_with_images
+            WHERE unified_artist IS NOT NULL AND unified_track IS NOT NULL
+        """).fetchall()
+    finally:
+        conn.close()
+
+    rng = random.Random(seed)
+    return rng.sample(rows, min(sample, len(rows)))
+
+
+def image_dimensions(content):
+    """이미지 바이트 → (width, height), Pillow 없거나 해석 실패 시 (None, None)"""
+    if not PIL_AVAILABLE or not content:
+        return None, None
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            return image.size
+    except Exception:
+        return None, None
+
+
+def quality_label(content_length, width):
+    """해상도 우선, 없으면 바이트 크기로 high / medium / low"""
+    if width:
+        return 'high' if width >= HIGH_QUALITY_PIXELS else ('medium' if width >= 300 else 'low')
+    if content_length is None:
+        return 'unknown'
+    if content_length > HIGH_QUALITY_BYTES:
+        return 'high'
+    return 'medium' if content_length > MEDIUM_QUALITY_BYTES else 'low'
+
+
+# ============================================
+# 프로브 (Flask test client / HTTP)
+# ============================================
+class TestClientProbe:
+    """Flask test client로 로컬 앱 호출 - 외부 리다이렉트는 follow_external일 때만"""
+
+    def __init__(self, app, follow_external=False):
+        self.app = app
+        self.follow_external = follow_external
+        self._local = threading.local()
+        self._session = None
+
+    def _client(self):
+        if not hasattr(self._local, 'client'):
+            self._local.client = self.app.test_client()
+        return self._local.client
+
+    def get(self, url):
+        """→ (status, headers, content, external)"""
+        if url.startswith('http'):
+            if not self.follow_external:
+                return None, {}, None, True
+            import requests
+            if self._session is None:
+                self._session = requests.Session()
+            response = self._session.get(url, timeout=10, allow_redirects=False)
+            return response.status_code, response.headers, response.content, True
+
+        response = self._client().get(url, headers={'Accept': 'image/webp,image/*'})
+        return response.status_code, response.headers, response.get_data(), False
+
+
+class HttpProbe:
+    """원격 서버 호출"""
+
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self._local = threading.local()
+        self._requests = requests
+
+    def _session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = self._requests.Session()
+        return self._local.session
+
+    def get(self, url):
+        """→ (status, headers, content, external)"""
+        if not url.startswith('http'):
+            url = f"{self.base_url}{url}"
+        response = self._session().get(url, timeout=15, allow_redirects=False,
+                                       headers={'Accept': 'image/webp,image/*'})
+        return response.status_code, response.headers, response.content, True
+
+
+def probe_track(probe, artist, track, size=640):
+    """트랙 하나 조회 → 결과 dict (리다이렉트는 직접 따라가며 체인 기록)"""
+    url = f"/api/album-image-smart/{quote(artist)}/{quote(track)}?size={size}"
+    result = {
+        'artist': artist,
+        'track': track,
+        'status': None,
+        'source': None,
+        'final_url': url,
+        'redirects': [],
+        'content_type': None,
+        'content_length': None,
+        'width': None,
+        'height': None,
+        'latency_ms': None,
+        'quality': 'unknown',
+        'error': None,
+    }
+
+    start = time.perf_counter()
+    try:
+        for _ in range(MAX_REDIRECTS + 1):
+            status, headers, content, _ = probe.get(url)
+            if status is None:
+                # 외부 리다이렉트 (오프라인 모드) - 체인까지만 기록
+                break
+
+            result['status'] = status
+            result['source'] = result['source'] or headers.get('X-Image-Source')
+
+            if status in (301, 302, 303, 307, 308) and headers.get('Location'):
+                location = headers['Location']
+                if url.startswith('http'):
+                    location = urljoin(url, location)
+                result['redirects'].append(location)
+                url = location
+                continue
+
+            result['content_type'] = headers.get('Content-Type')
+            if content is not None:
+                result['content_length'] = len(content)
+                if status == 200:
+                    result['width'], result['height'] = image_dimensions(content)
+            break
+        else:
+            result['error'] = 'too many redirects'
+    except Exception as e:
+        result['error'] = str(e)
+
+    result['latency_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    result['final_url'] = url
+    if result['source'] == 'default' or (result['status'] or 0) >= 400:
+        result['quality'] = 'missing'
+    else:
+        result['quality'] = quality_label(result['content_length'], result['width'])
+    return result
+
+
+# ============================================
+# 리포트
+# ============================================
+def _percentiles(values):
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return None
+
+    def pick(p):
+        return values[min(int(len(values) * p), len(values) - 1)]
+
+    return {
+        'count': len(values),
+        'min': values[0],
+        'p50': statistics.median(values),
+        'p90': pick(0.90),
+        'p99': pick(0.99),
+        'max': values[-1],
+    }
+
+
+def summarize(results):
+    summary = {
+        'tracks': len(results),
+        'errors': sum(1 for r in results if r['error']),
+        'latency_ms': _percentiles([r['latency_ms'] for r in results]),
+        'content_length': _percentiles([r['content_length'] for r in results if r['status'] == 200]),
+        'width': _percentiles([r['width'] for r in results]),
+        'redirects': _percentiles([len(r['redirects']) for r in results]),
+        'by_source': {},
+        'by_quality': {},
+    }
+    for r in results:
+        source = r['source'] or 'unknown'
+        summary['by_source'][source] = summary['by_source'].get(source, 0) + 1
+        summary['by_quality'][r['quality']] = summary['by_quality'].get(r['quality'], 0) + 1
+    return summary
+
+
+def run_audit(probe, tracks, size=640, workers=DEFAULT_WORKERS):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda pair: probe_track(probe, pair[0], pair[1], size), tracks))
+
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'size': size,
+        'workers': workers,
+        'duration_seconds': round(time.perf_counter() - start, 2),
+        'summary': summarize(results),
+        'results': results,
+    }
+
+
+def write_csv(path, results):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for r in results:
+            writer.writerow({**r, 'redirects': ' -> '.join(r['redirects'])})
+
+
+def load_app(spec):
+    """'module:attr' → Flask app"""
+    module_name, _, attr = spec.partition(':')
+    module = importlib.import_module(module_name)
+    return getattr(module, attr or 'app')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='앨범 이미지 품질 점검')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--app', help="로컬 Flask 앱 ('module:attr', 예: backend_app:app)")
+    target.add_argument('--base-url', help='원격 API 주소')
+    parser.add_argument('--db', default=str(DB_PATH), help='샘플링할 DB')
+    parser.add_argument('--sample', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--size', type=int, default=640)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--follow-external', action='store_true',
+                        help='--app 모드에서도 외부 CDN 리다이렉트까지 다운로드')
+    parser.add_argument('--json', default='image_quality_audit.json', help='JSON 리포트 경로')
+    parser.add_argument('--csv', default=None, help='CSV 리포트 경로')
+    args = parser.parse_args()
+
+    tracks = sample_tracks(args.db, args.sample, args.seed)
+    if not tracks:
+        print("❌ 샘플링할 트랙이 없습니다")
+        raise SystemExit(1)
+
+    if args.app:
+        probe = TestClientProbe(load_app(args.app), follow_external=args.follow_external)
+    else:
+        probe = HttpProbe(args.base_url)
+
+    report = run_audit(probe, tracks, size=args.size, workers=args.workers)
+
+    with open(args.json, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.csv:
+        write_csv(args.csv, report['results'])
+
+    summary = report['summary']
+    print(f"{'='*60}")
+    print(f"🔍 {summary['tracks']}개 트랙 점검 ({report['duration_seconds']}초, 워커 {args.workers}개)")
+    if summary['latency_ms']:
+        latency = summary['latency_ms']
+        print(f"⏱️  지연: p50 {latency['p50']}ms, p90 {latency['p90']}ms, p99 {latency['p99']}ms")
+    if summary['content_length']:
+        length = summary['content_length']
+        print(f"📦 크기: p50 {length['p50'] / 1024:.1f}KB, p90 {length['p90'] / 1024:.1f}KB")
+    print(f"🧭 해석 경로: {summary['by_source']}")
+    print(f"🎨 품질: {summary['by_quality']}")
+    print(f"❌ 에러: {summary['errors']}")
+    print(f"📝 리포트: {args.json}" + (f", {args.csv}" if args.csv else ''))
+    print(f"{'='*60}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,462 @@
+"""
+Image Resolver - 앨범 이미지 해석 공통 모듈
+album-image-smart 단건/벌크 엔드포인트가 같은 해석 체인을 사용
+- track_images / album_images 인메모리 인덱스 (mtime 변경 시 자동 갱신)
+- DB 일괄 조회 (IN 쿼리)
+- CDN 크기 선택 (cdn_rules 규칙 엔진)
+- 수집 시점 해석 (resolved_image 컬럼용) + Spotify 폴백
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from urllib.parse import quote
+
+from cdn_rules import sized_image_url
+from image_derivatives import RENDITIONS_DIRNAME, find_rendition
+from image_store import get_image_store
+from spotify_ids import (SPOTIFY_ACCOUNTS_BASE, SPOTIFY_API_BASE, get_spotify_id_store,
+                         pick_image)
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+TRACK_IMAGES_DIR = BASE_DIR / 'static' / 'track_images'
+ALBUM_IMAGES_DIR = BASE_DIR / 'static' / 'album_images'
+
+TRACK_IMAGES_URL = '/static/track_images'
+ALBUM_IMAGES_URL = '/static/album_images'
+DEFAULT_IMAGE_URL = '/images/default-album.svg'
+
+# SQLite 바인딩 변수 제한(999) 이하로 유지
+DB_CHUNK_SIZE = 400
+
+# 아직 최종 이미지를 못 찾은 상태로 간주하는 URL (재해석 대상)
+UNRESOLVED_PREFIXES = (DEFAULT_IMAGE_URL, '/api/album-image-smart/')
+
+
+def mapping_keys(artist, track):
+    """download_mapping.json 키 후보 (단건 API와 동일한 순서)"""
+    return [
+        f"{artist}:{track}",
+        f"{artist.replace(' ', '_')}:{track.replace(' ', '_')}",
+        f"{artist}:{track.split('(')[0].strip()}",  # feat. 제거
+    ]
+
+
+def filename_prefixes(artist, track):
+    """track_images 파일명 접두사 후보 ({artist}_{track}_*.jpg 패턴)"""
+    safe_artist = re.sub(r'[<>:"/\\|?*]', '_', artist)[:50]
+    safe_track = re.sub(r'[<>:"/\\|?*]', '_', track)[:50]
+    return [
+        f"{safe_artist}_{safe_track}_",
+        f"{safe_artist.replace(' ', '_')}_{safe_track.replace(' ', '_')}_",
+        f"{artist}_{track}_",
+    ]
+
+
+def smart_image_url(artist, track, size=None):
+    """album-image-smart 엔드포인트 URL"""
+    url = f"/api/album-image-smart/{quote(artist or '')}/{quote(track or '')}"
+    if size:
+        url += f"?size={size}"
+    return url
+
+
+def local_image_url(directory, base_url, filename, size=None, webp=False):
+    """로컬 이미지 정적 URL - size가 주어지면 해당 크기를 덮는 렌디션 우선"""
+    if size:
+        rendition = find_rendition(Path(directory) / filename, size, webp)
+        if rendition:
+            return f"{base_url}/{RENDITIONS_DIRNAME}/{quote(rendition[0].name)}"
+    return f"{base_url}/{quote(filename)}"
+
+
+def static_url_for(path, size=None, webp=False):
+    """로컬 파일 경로 → 정적 서빙 URL (서빙 폴더 밖이면 None)"""
+    path = Path(path)
+    if path.parent == TRACK_IMAGES_DIR:
+        return local_image_url(TRACK_IMAGES_DIR, TRACK_IMAGES_URL, path.name, size, webp)
+    if path.parent == ALBUM_IMAGES_DIR:
+        return local_image_url(ALBUM_IMAGES_DIR, ALBUM_IMAGES_URL, path.name, size, webp)
+    return None
+
+
+class TrackImageIndex:
+    """track_images / album_images 폴더 + 매핑 파일 인메모리 인덱스"""
+
+    def __init__(self, track_images_dir=TRACK_IMAGES_DIR, album_images_dir=ALBUM_IMAGES_DIR):
+        self.track_images_dir = Path(track_images_dir)
+        self.album_images_dir = Path(album_images_dir)
+        self.mapping_path = self.track_images_dir / 'download_mapping.json'
+
+        self._lock = threading.Lock()
+        self._signature = None
+        self._mapping = {}
+        self._track_files = []   # 정렬된 *.jpg 파일명 (접두사 검색용)
+        self._track_file_set = set()   # 전체 파일명 (존재 확인용)
+        self._album_files = []   # (소문자 stem, 파일명)
+
+    def _mtime(self, path):
+        try:
+            return path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _refresh(self):
+        """폴더/매핑 파일 mtime이 바뀐 경우에만 인덱스 재구성"""
+        signature = (
+            self._mtime(self.track_images_dir),
+            self._mtime(self.mapping_path),
+            self._mtime(self.album_images_dir),
+        )
+        if signature == self._signature:
+            return
+
+        with self._lock:
+            if signature == self._signature:
+                return
+
+            mapping = {}
+            if signature[1] is not None:
+                try:
+                    with open(self.mapping_path, 'r', encoding='utf-8') as f:
+                        mapping = json.load(f)
+                except Exception as e:
+                    logger.error(f"매핑 파일 읽기 에러: {e}")
+
+            all_files = set()
+            if signature[0] is not None:
+                all_files = {p.name for p in self.track_images_dir.iterdir() if p.is_file()}
+            track_files = sorted(name for name in all_files if name.endswith('.jpg'))
+
+            album_files = []
+            if signature[2] is not None:
+                album_files = [(p.stem.lower(), p.name) for p in self.album_images_dir.glob('*.jpg')]
+
+            self._mapping = mapping
+            self._track_files = track_files
+            self._track_file_set = all_files
+            self._album_files = album_files
+            self._signature = signature
+
+            logger.info(f"이미지 인덱스 갱신: 매핑 {len(mapping)}개, 파일 {len(track_files)}개")
+
+    def find_mapped(self, artist, track):
+        """매핑 파일 기반 검색 → track_images 파일명"""
+        self._refresh()
+        for key in mapping_keys(artist, track):
+            filename = self._mapping.get(key)
+            if filename and filename in self._track_file_set:
+                return filename
+        return None
+
+    def has_track_file(self, filename):
+        self._refresh()
+        return filename in self._track_file_set
+
+    def find_by_prefix(self, artist, track):
+        """파일명 패턴({artist}_{track}_*.jpg) 기반 검색"""
+        self._refresh()
+        files = self._track_files
+        for prefix in filename_prefixes(artist, track):
+            idx = bisect_left(files, prefix)
+            if idx < len(files) and files[idx].startswith(prefix):
+                return files[idx]
+        return None
+
+    def find_album_image(self, artist, track):
+        """album_images (구 시스템) 부분 문자열 검색"""
+        self._refresh()
+        artist_lower = artist.lower()
+        track_lower = track.lower()
+        for stem, name in self._album_files:
+            if artist_lower in stem and track_lower in stem:
+                return name
+        return None
+
+    def get_stats(self):
+        self._refresh()
+        return {
+            'mappings': len(self._mapping),
+            'track_images': len(self._track_files),
+            'album_images': len(self._album_files),
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_track_image_index():
+    """TrackImageIndex 싱글톤"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = TrackImageIndex()
+    return _index
+
+
+def fetch_db_images(conn, pairs):
+    """(artist, track) 목록의 최신 local_image / image_url 일괄 조회
+
+    N번의 단건 쿼리 대신 청크당 한 번의 IN 쿼리로 가져온 뒤
+    (artist, track) 정확히 일치하는 행 중 가장 최근 것만 남긴다.
+    """
+    found = {}
+    wanted = set(pairs)
+    unique_pairs = list(wanted)
+
+    cursor = conn.cursor()
+    for start in range(0, len(unique_pairs), DB_CHUNK_SIZE):
+        chunk = unique_pairs[start:start + DB_CHUNK_SIZE]
+        artists = sorted({a for a, _ in chunk})
+        tracks = sorted({t for _, t in chunk})
+
+        cursor.execute(f"""
+            SELECT unified_artist, unified_track, local_image, image_url
+            FROM unified_master_with_images
+            WHERE unified_artist IN ({','.join('?' * len(artists))})
+            AND unified_track IN ({','.join('?' * len(tracks))})
+            ORDER BY created_at DESC
+        """, artists + tracks)
+
+        for row in cursor.fetchall():
+            key = (row[0], row[1])
+            if key in wanted and key not in found:
+                found[key] = {'local_image': row[2], 'image_url': row[3]}
+
+    return found
+
+
+def resolve_batch(items, conn=None, image_manager=None, webp=False):
+    """(artist, track, size) 목록을 최종 이미지 URL로 일괄 해석
+
+    해시 저장소 → 단건 API와 같은 순서(로컬 → 매핑 → DB → 파일명 → 구 시스템)를 따르되
+    Spotify 호출은 하지 않고, 해석 실패 시 album-image-smart URL을 돌려준다.
+    로컬 이미지는 size를 덮는 렌디션 URL로 돌려준다 (webp=True면 WebP 우선).
+    """
+    index = get_track_image_index()
+    store = get_image_store()
+    pairs = [(a, t) for a, t, _ in items]
+
+    def track_url(filename, size):
+        return local_image_url(index.track_images_dir, TRACK_IMAGES_URL, filename, size, webp)
+
+    hashes = {}
+    try:
+        hashes = store.lookup_many(pairs)
+    except Exception as e:
+        logger.error(f"해시 일괄 조회 에러: {e}")
+
+    db_rows = {}
+    if conn is not None:
+        try:
+            db_rows = fetch_db_images(conn, pairs)
+        except Exception as e:
+            logger.error(f"DB 일괄 조회 에러: {e}")
+
+    results = []
+    for artist, track, size in items:
+        url, source = None, None
+
+        # 해시 저장소 (불변 URL)
+        stored = hashes.get((artist, track))
+        if stored and store.blob_path(*stored).exists():
+            url, source = store.url_for(stored[0], stored[1], size, webp), 'hash'
+
+        # 0. LocalImageManager
+        if not url and image_manager is not None:
+            try:
+                local_path = image_manager.get_local_path(artist, track)
+                if local_path and local_path.exists():
+                    url, source = static_url_for(local_path, size, webp), 'local'
+            except Exception as e:
+                logger.error(f"로컬 이미지 조회 에러: {e}")
+
+        # 1. track_images 매핑
+        if not url:
+            filename = index.find_mapped(artist, track)
+            if filename:
+                url, source = track_url(filename, size), 'mapping'
+
+        # 2. DB (local_image → CDN URL)
+        if not url:
+            row = db_rows.get((artist, track))
+            if row:
+                if row['local_image'] and index.has_track_file(row['local_image']):
+                    url, source = track_url(row['local_image'], size), 'db_local'
+                elif row['image_url']:
+                    url, source = sized_image_url(row['image_url'], size), 'cdn'
+
+        # 3. 파일명 기반 직접 매칭
+        if not url:
+            filename = index.find_by_prefix(artist, track)
+            if filename:
+                url, source = track_url(filename, size), 'filename'
+
+        # 4. album_images 폴백 (구 시스템)
+        if not url:
+            filename = index.find_album_image(artist, track)
+            if filename:
+                url, source = local_image_url(
+                    index.album_images_dir, ALBUM_IMAGES_URL, filename, size, webp
+                ), 'album_images'
+
+        # 5. 미해결 - 단건 API에 위임 (Spotify 폴백)
+        if not url:
+            url, source = smart_image_url(artist, track, size), 'smart_api'
+
+        results.append({
+            'artist': artist,
+            'track': track,
+            'size': size,
+            'url': url,
+            'source': source,
+        })
+
+    return results
+
+
+# ============================================
+# Spotify 폴백 (토큰 캐시)
+# ============================================
+_spotify_token = {'token': None, 'expires': 0}
+_spotify_lock = threading.Lock()
+
+
+def get_spotify_token():
+    """Spotify client credentials 토큰 (만료 전까지 재사용)"""
+    with _spotify_lock:
+        if _spotify_token['token'] and time.time() < _spotify_token['expires'] - 60:
+            return _spotify_token['token']
+
+        client_id = os.getenv('SPOTIFY_CLIENT_ID')
+        client_secret = os.getenv('SPOTIFY_CLIENT_SECRET')
+        if not client_id or not client_secret:
+            return None
+
+        import requests
+        response = requests.post(
+            f'{SPOTIFY_ACCOUNTS_BASE}/api/token',
+            data={'grant_type': 'client_credentials'},
+            auth=(client_id, client_secret),
+            timeout=10
+        )
+        if response.status_code != 200:
+            logger.warning(f"Spotify 토큰 발급 실패: {response.status_code}")
+            return None
+
+        token_data = response.json()
+        _spotify_token['token'] = token_data['access_token']
+        _spotify_token['expires'] = time.time() + token_data.get('expires_in', 3600)
+        return _spotify_token['token']
+
+
+def search_spotify_image(artist, track, size=640):
+    """Spotify 앨범 이미지 URL (size에 맞는 크기 선택)
+
+    저장된 Spotify ID/이미지가 있으면 API 호출 없이 사용하고,
+    없을 때만 검색한 뒤 찾은 트랙/앨범 ID를 저장한다.
+    """
+    try:
+        id_store = get_spotify_id_store()
+        stored = id_store.lookup(artist, track)
+        if stored and stored['images']:
+            return pick_image(stored['images'], size)
+
+        token = get_spotify_token()
+        if not token:
+            return None
+
+        import requests
+        search_response = requests.get(
+            f'{SPOTIFY_API_BASE}/v1/search',
+            headers={'Authorization': f'Bearer {token}'},
+            params={
+                'q': f'artist:{artist} track:{track}',
+                'type': 'track',
+                'limit': 1
+            },
+            timeout=10
+        )
+        if search_response.status_code != 200:
+            return None
+
+        tracks = search_response.json().get('tracks', {}).get('items', [])
+        if not tracks or not tracks[0].get('album', {}).get('images'):
+            return None
+
+        id_store.save_track(artist, track, tracks[0])
+        return pick_image(tracks[0]['album']['images'], size)
+
+    except Exception as e:
+        logger.error(f"Spotify API 호출 에러: {e}")
+        return None
+
+
+# ============================================
+# 수집 시점 해석 (unified_master_with_images.resolved_image)
+# ============================================
+def is_unresolved(url):
+    """기본 이미지 / smart API 위임 상태인지"""
+    return not url or url.startswith(UNRESOLVED_PREFIXES)
+
+
+def resolve_image(artist, track, image_url=None, local_image=None, size=640,
+                  image_manager=None, use_spotify=True):
+    """행 하나의 최종 이미지 URL 해석
+
+    순서: 로컬 파일(해시 저장소 우선) → 매핑 → CDN 업그레이드 → Spotify → 기본 이미지
+    Returns:
+        (url, source)
+    """
+    index = get_track_image_index()
+
+    # 1. 로컬 파일 (해시 저장소 우선 - 불변 URL)
+    try:
+        stored = get_image_store().lookup(artist, track)
+        if stored:
+            return get_image_store().url_for(*stored), 'hash'
+    except Exception as e:
+        logger.error(f"해시 저장소 조회 에러: {e}")
+
+    if local_image and local_image not in ('None', '_.jpg') and index.has_track_file(local_image):
+        return f"{TRACK_IMAGES_URL}/{quote(local_image)}", 'local'
+
+    if image_manager is not None:
+        try:
+            local_path = image_manager.get_local_path(artist, track)
+            if local_path and local_path.exists():
+                url = static_url_for(local_path)
+                if url:
+                    return url, 'local'
+        except Exception as e:
+            logger.error(f"로컬 이미지 조회 에러: {e}")
+
+    filename = index.find_by_prefix(artist, track)
+    if filename:
+        return f"{TRACK_IMAGES_URL}/{quote(filename)}", 'local'
+
+    # 2. 매핑
+    filename = index.find_mapped(artist, track)
+    if filename:
+        return f"{TRACK_IMAGES_URL}/{quote(filename)}", 'mapping'
+
+    # 3. CDN (저장 시 최고 화질 - size에 맞게 낮추기만)
+    if image_url and image_url.startswith('http'):
+        return sized_image_url(image_url, size), 'cdn'
+
+    # 4. Spotify
+    if use_spotify:
+        spotify_url = search_spotify_image(artist, track, size)
+        if spotify_url:
+            return spotify_url, 'spotify'
+
+    return DEFAULT_IMAGE_URL, 'default'
@@ -0,0 +1,108 @@
+"""
+Image Serving - 정적 이미지 서빙 (프록시 오프로드)
+파일 I/O를 Python 워커 대신 앞단 프록시가 처리하도록 헤더만 응답
+
+모드 (IMAGE_SENDFILE_MODE 환경 변수):
+    x-accel     nginx X-Accel-Redirect
+    x-sendfile  Apache/lighttpd X-Sendfile
+    (없음)      wsgi.file_wrapper/sendfile + ETag / Last-Modified / Range / 304
+
+renditions/ 아래 작은 렌디션은 썸네일 팩(thumb_pack.py)에 있으면 mmap에서 바로 응답
+(팩 안의 데이터는 프록시가 읽을 수 없으므로 모드와 관계없이 Python이 응답)
+
+nginx 설정 예시 (x-accel):
+    location /_protected_static/ {
+        internal;
+        alias /home/dccla/kpopranker-backend/static/;
+    }
+"""
+
+import mimetypes
+import os
+from pathlib import Path
+from urllib.parse import quote
+
+from flask import abort, current_app, request
+
+from image_derivatives import PACKED_SIZES, RENDITIONS_DIRNAME, pack_name
+from thumb_pack import get_thumb_pack
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+
+BASE_DIR = Path(__file__).parent
+STATIC_ROOT = (BASE_DIR / 'static').resolve()
+
+SENDFILE_MODE = os.getenv('IMAGE_SENDFILE_MODE', '').strip().lower()
+X_ACCEL_PREFIX = os.getenv('IMAGE_X_ACCEL_PREFIX', '/_protected_static').rstrip('/')
+
+
+def send_image(directory, filename, mimetype=None, max_age=None):
+    """이미지 파일 응답 - 설정된 모드에 따라 프록시에 파일 전송 위임"""
+    path = safe_join(str(directory), str(filename))
+    if path is None:
+        abort(404)
+
+    if PACKED_SIZES and Path(path).parent.name == RENDITIONS_DIRNAME:
+        response = send_packed_image(pack_name(path), mimetype, max_age)
+        if response is not None:
+            return response
+
+    if not os.path.isfile(path):
+        abort(404)
+
+    if mimetype is None:
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    if SENDFILE_MODE == 'x-accel':
+        real_path = Path(path).resolve()
+        try:
+            internal_path = real_path.relative_to(STATIC_ROOT).as_posix()
+        except ValueError:
+            internal_path = None
+
+        # static 폴더 안의 파일만 nginx internal location으로 넘길 수 있음
+        if internal_path is not None:
+            response = current_app.response_class(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = f"{X_ACCEL_PREFIX}/{quote(internal_path)}"
+            if max_age is not None:
+                response.cache_control.public = True
+                response.cache_control.max_age = max_age
+            return response
+
+    return send_file(
+        path,
+        request.environ,
+        mimetype=mimetype,
+        conditional=True,
+        etag=True,
+        max_age=max_age,
+        use_x_sendfile=(SENDFILE_MODE == 'x-sendfile'),
+        response_class=current_app.response_class,
+        _root_path=current_app.root_path,
+    )
+
+
+def send_packed_image(name, mimetype=None, max_age=None):
+    """썸네일 팩 항목 응답 (없으면 None) - ETag는 CRC32 + 길이, Range / 304 지원
+
+    팩 조회는 mmap의 memoryview 슬라이스라 시스템 콜이 없고,
+    WSGI가 bytes만 받으므로 응답 본문으로 한 번만 복사한다.
+    """
+    entry = get_thumb_pack().get_entry(name)
+    if entry is None:
+        return None
+
+    view, crc, mtime = entry
+    if mimetype is None:
+        mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    response = current_app.response_class(bytes(view), mimetype=mimetype)
+    response.set_etag(f"{crc:08x}-{len(view)}")
+    if mtime:
+        response.last_modified = mtime
+    if max_age is not None:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request.environ, accept_ranges=True, complete_length=len(view))
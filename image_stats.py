@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Image Stats - 증분 유지 이미지 통계
+- 다운로드 저장 시점에 파일 수 / 용량 / 매핑 수 카운터 갱신
+- 파이프라인 이미지 해석 결과로 소스별 개수 / 차트별 커버리지 갱신
+- rank_history.db에 저장 → /api/image-stats는 작은 테이블 조회만 (디렉터리 스캔 없음)
+- recount(): 기존 방식의 전체 스캔으로 정확한 값 계산 + 카운터 재설정
+
+사용법:
+    python3 image_stats.py show        # 저장된 카운터 출력
+    python3 image_stats.py recount     # 전체 스캔 후 카운터 재설정
+"""
+
+import argparse
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+DB_PATH = BASE_DIR / 'rank_history.db'
+TRACK_IMAGES_DIR = BASE_DIR / 'static' / 'track_images'
+MAPPING_FILENAME = 'download_mapping.json'
+
+# 이미지가 없는 것으로 보는 해석 소스
+MISSING_SOURCES = ('default', 'smart_api')
+
+
+class ImageStats:
+    """이미지 통계 카운터 저장소"""
+
+    def __init__(self, db_path=DB_PATH, images_dir=TRACK_IMAGES_DIR):
+        self.db_path = Path(db_path)
+        self.images_dir = Path(images_dir)
+        self._lock = threading.Lock()
+        self._ensure_tables()
+
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_tables(self):
+        conn = self._connect()
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS image_stats_counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                );
+
+                -- 파일별 크기 (덮어쓰기 시 용량 차이만 반영)
+                CREATE TABLE IF NOT EXISTS image_stats_files (
+                    filename TEXT PRIMARY KEY,
+                    size_bytes INTEGER NOT NULL,
+                    chart_name TEXT,
+                    updated_at REAL
+                );
+
+                CREATE TABLE IF NOT EXISTS image_stats_sources (
+                    source TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL
+                );
+
+                -- 차트별 소스 개수 (차트 단위 교체 → image_stats_sources는 합계)
+                CREATE TABLE IF NOT EXISTS image_stats_chart_sources (
+                    chart_name TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (chart_name, source)
+                );
+
+                CREATE TABLE IF NOT EXISTS image_stats_charts (
+                    chart_name TEXT PRIMARY KEY,
+                    total INTEGER NOT NULL,
+                    with_image INTEGER NOT NULL,
+                    updated_at REAL
+                );
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ============================================
+    # 증분 갱신
+    # ============================================
+    def record_download(self, filename, size_bytes, chart_name=None, mapping_count=None):
+        """다운로더 저장 완료 시 호출 - 새 파일이면 개수 +1, 용량은 차이만큼"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT size_bytes FROM image_stats_files WHERE filename = ?", (filename,)
+                ).fetchone()
+
+                if row is None:
+                    count_delta, bytes_delta = 1, size_bytes
+                else:
+                    count_delta, bytes_delta = 0, size_bytes - row['size_bytes']
+
+                conn.execute("""
+                    INSERT INTO image_stats_files (filename, size_bytes, chart_name, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(filename) DO UPDATE SET
+                        size_bytes = excluded.size_bytes,
+                        chart_name = COALESCE(excluded.chart_name, image_stats_files.chart_name),
+                        updated_at = excluded.updated_at
+                """, (filename, size_bytes, chart_name, time.time()))
+
+                self._add(conn, 'total_images', count_delta)
+                self._add(conn, 'total_bytes', bytes_delta)
+                self._add(conn, 'downloads', 1)
+                if mapping_count is not None:
+                    self._set(conn, 'total_mappings', mapping_count)
+                self._set(conn, 'updated_at', int(time.time()))
+                conn.commit()
+            finally:
+                conn.close()
+
+    def record_chart_resolution(self, chart_sources, charts=None):
+        """파이프라인 이미지 해석 결과 반영 - 해석한 차트만 교체, 나머지 차트는 유지
+
+        chart_sources: (chart_name, source) 목록
+        charts: 교체할 차트 (기본: chart_sources에 나온 차트, 행이 없는 차트도 비움)
+        """
+        counts = {}
+        for chart_name, source in chart_sources:
+            counts[(chart_name, source)] = counts.get((chart_name, source), 0) + 1
+        coverage = chart_coverage(chart_sources)
+        charts = list(charts or coverage)
+
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                placeholders = ','.join('?' * len(charts))
+                conn.execute(f"DELETE FROM image_stats_chart_sources WHERE chart_name IN ({placeholders})", charts)
+                conn.execute(f"DELETE FROM image_stats_charts WHERE chart_name IN ({placeholders})", charts)
+                conn.executemany("""
+                    INSERT INTO image_stats_chart_sources (chart_name, source, count)
+                    VALUES (?, ?, ?)
+                """, [(chart, source, count) for (chart, source), count in counts.items()])
+                conn.executemany("""
+                    INSERT INTO image_stats_charts (chart_name, total, with_image, updated_at)
+                    VALUES (?, ?, ?, ?)
+                """, [(chart, total, with_image, now)
+                      for chart, (total, with_image) in coverage.items()])
+
+                conn.execute("DELETE FROM image_stats_sources")
+                conn.execute("""
+                    INSERT INTO image_stats_sources (source, count)
+                    SELECT source, SUM(count) FROM image_stats_chart_sources GROUP BY source
+                """)
+                self._set(conn, 'resolved_at', int(now))
+                conn.commit()
+            finally:
+                conn.close()
+
+    @staticmethod
+    def _add(conn, name, delta):
+        conn.execute("""
+            INSERT INTO image_stats_counters (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+        """, (name, delta))
+
+    @staticmethod
+    def _set(conn, name, value):
+        conn.execute("""
+            INSERT INTO image_stats_counters (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value = excluded.value
+        """, (name, value))
+
+    # ============================================
+    # 조회
+    # ============================================
+    def get_stats(self):
+        """저장된 카운터로 통계 구성 (파일 시스템 접근 없음)"""
+        conn = self._connect()
+        try:
+            counters = {row['name']: row['value']
+                        for row in conn.execute("SELECT name, value FROM image_stats_counters")}
+            sources = {row['source']: row['count']
+                       for row in conn.execute("SELECT source, count FROM image_stats_sources")}
+            charts = conn.execute("""
+                SELECT chart_name, total, with_image FROM image_stats_charts
+                ORDER BY chart_name
+            """).fetchall()
+        finally:
+            conn.close()
+
+        total_images = counters.get('total_images', 0)
+        total_mappings = counters.get('total_mappings', 0)
+
+        return {
+            'total_images': total_images,
+            'total_mappings': total_mappings,
+            'disk_usage_mb': round(counters.get('total_bytes', 0) / (1024 * 1024), 2),
+            'mapping_coverage': round(min(total_mappings / total_images, 1.0), 4) if total_images else 0.0,
+            'downloads': counters.get('downloads', 0),
+            'sources': sources,
+            'chart_coverage': {
+                row['chart_name']: {
+                    'total': row['total'],
+                    'with_image': row['with_image'],
+                    'coverage': round(row['with_image'] / row['total'], 4) if row['total'] else 0.0,
+                }
+                for row in charts
+            },
+            'updated_at': counters.get('updated_at'),
+            'resolved_at': counters.get('resolved_at'),
+            'counted': 'incremental',
+        }
+
+    # ============================================
+    # 전체 재계산 (검증용)
+    # ============================================
+    def recount(self):
+        """이미지 폴더 전체 스캔 → 정확한 값으로 카운터/파일 테이블 재설정"""
+        files = []
+        if self.images_dir.exists():
+            files = [(path.name, path.stat().st_size) for path in self.images_dir.glob('*.jpg')]
+
+        mapping_count = 0
+        mapping_path = self.images_dir / MAPPING_FILENAME
+        if mapping_path.exists():
+            with open(mapping_path, 'r', encoding='utf-8') as f:
+                mapping_count = len(json.load(f))
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                previous = {row['name']: row['value']
+                            for row in conn.execute("SELECT name, value FROM image_stats_counters")}
+
+                conn.execute("DELETE FROM image_stats_files")
+                now = time.time()
+                conn.executemany("""
+                    INSERT INTO image_stats_files (filename, size_bytes, updated_at)
+                    VALUES (?, ?, ?)
+                """, [(name, size, now) for name, size in files])
+
+                self._set(conn, 'total_images', len(files))
+                self._set(conn, 'total_bytes', sum(size for _, size in files))
+                self._set(conn, 'total_mappings', mapping_count)
+                self._set(conn, 'updated_at', int(now))
+                conn.commit()
+            finally:
+                conn.close()
+
+        stats = self.get_stats()
+        stats['counted'] = 'recount'
+        # 증분 카운터가 얼마나 어긋나 있었는지
+        stats['drift'] = {
+            'total_images': len(files) - previous.get('total_images', 0),
+            'total_bytes': sum(size for _, size in files) - previous.get('total_bytes', 0),
+            'total_mappings': mapping_count - previous.get('total_mappings', 0),
+        }
+        return stats
+
+
+def chart_coverage(rows):
+    """(chart_name, source) 목록 → {chart_name: (전체, 이미지 있는 행)}"""
+    coverage = {}
+    for chart_name, source in rows:
+        total, with_image = coverage.get(chart_name, (0, 0))
+        coverage[chart_name] = (total + 1, with_image + (source not in MISSING_SOURCES))
+    return coverage
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_image_stats():
+    """ImageStats 싱글톤"""
+    global _stats
+    if _stats is None:
+        with _stats_lock:
+            if _stats is None:
+                _stats = ImageStats()
+    return _stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='이미지 통계 카운터')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('show', help='저장된 카운터 출력')
+    subparsers.add_parser('recount', help='전체 스캔 후 카운터 재설정')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    stats = get_image_stats()
+    result = stats.recount() if args.command == 'recount' else stats.get_stats()
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
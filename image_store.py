@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Image Store - 콘텐츠 주소 기반 앨범 이미지 저장소
+- 이미지 바이트의 SHA-256 해시로 저장 (같은 앨범 아트는 파일 하나)
+- (artist, track) → hash 매핑은 rank_history.db의 image_hashes 테이블
+- /img/<hash>.jpg 형태의 불변 URL → Cache-Control: immutable 안전
+- 원본 URL별 ETag / Last-Modified / 길이 기록 → 재수집 시 조건부 요청
+
+사용법:
+    python3 image_store.py migrate              # 기존 폴더 분석 + 저장소로 복사 (리포트)
+    python3 image_store.py migrate --link       # 중복 원본을 저장소 하드링크로 교체 (공간 회수)
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from image_derivatives import RENDITIONS_DIRNAME, find_rendition, rendition_exists
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+STORE_DIR = BASE_DIR / 'static' / 'images' / 'by-hash'
+DB_PATH = BASE_DIR / 'rank_history.db'
+TRACK_IMAGES_DIR = BASE_DIR / 'static' / 'track_images'
+ALBUM_IMAGES_DIR = BASE_DIR / 'static' / 'album_images'
+
+HASHED_URL_PREFIX = '/img'
+HASHED_NAME_RE = re.compile(r'^([0-9a-f]{64})(?:_(\d+))?\.(jpg|webp|png)$')
+
+# SQLite 바인딩 변수 제한(999) 이하로 유지
+DB_CHUNK_SIZE = 400
+
+
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def detect_ext(content):
+    """매직 바이트로 확장자 판별 (기본 jpg)"""
+    if content[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'png'
+    if content[:4] == b'RIFF' and content[8:12] == b'WEBP':
+        return 'webp'
+    return 'jpg'
+
+
+class ImageStore:
+    """콘텐츠 주소 기반 이미지 저장소"""
+
+    def __init__(self, store_dir=STORE_DIR, db_path=DB_PATH):
+        self.store_dir = Path(store_dir)
+        self.db_path = Path(db_path)
+        self._ensure_table()
+
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_table(self):
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS image_hashes (
+                    artist TEXT NOT NULL,
+                    track TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    ext TEXT NOT NULL DEFAULT 'jpg',
+                    size_bytes INTEGER,
+                    source_url TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (artist, track)
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_image_hashes_hash
+                ON image_hashes(hash)
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS image_sources (
+                    url TEXT PRIMARY KEY,
+                    hash TEXT NOT NULL,
+                    ext TEXT NOT NULL DEFAULT 'jpg',
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_length INTEGER,
+                    checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ============================================
+    # 저장 / 조회
+    # ============================================
+    def blob_path(self, hash_value, ext='jpg'):
+        return self.store_dir / hash_value[:2] / f"{hash_value}.{ext}"
+
+    def put_blob(self, content):
+        """바이트 저장 (이미 있으면 쓰지 않음) → (hash, ext, path, created)"""
+        hash_value = content_hash(content)
+        ext = detect_ext(content)
+        path = self.blob_path(hash_value, ext)
+
+        if path.exists():
+            return hash_value, ext, path, False
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        return hash_value, ext, path, True
+
+    def assign(self, artist, track, hash_value, ext='jpg', size_bytes=None, source_url=None, conn=None):
+        """(artist, track) → hash 매핑 저장"""
+        own_conn = conn is None
+        if own_conn:
+            conn = self._connect()
+        try:
+            conn.execute("""
+                INSERT INTO image_hashes (artist, track, hash, ext, size_bytes, source_url, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(artist, track) DO UPDATE SET
+                    hash = excluded.hash,
+                    ext = excluded.ext,
+                    size_bytes = excluded.size_bytes,
+                    source_url = COALESCE(excluded.source_url, image_hashes.source_url),
+                    updated_at = CURRENT_TIMESTAMP
+            """, (artist, track, hash_value, ext, size_bytes, source_url))
+            if own_conn:
+                conn.commit()
+        finally:
+            if own_conn:
+                conn.close()
+
+    def put(self, content, artist, track, source_url=None):
+        """이미지 저장 + 매핑 → (hash, ext, path)"""
+        hash_value, ext, path, _ = self.put_blob(content)
+        self.assign(artist, track, hash_value, ext, len(content), source_url)
+        return hash_value, ext, path
+
+    def lookup(self, artist, track):
+        """(artist, track) → (hash, ext), 없으면 None"""
+        conn = self._connect()
+        try:
+            row = conn.execute("""
+                SELECT hash, ext FROM image_hashes
+                WHERE artist = ? AND track = ?
+            """, (artist, track)).fetchone()
+        finally:
+            conn.close()
+
+        if row and self.blob_path(row['hash'], row['ext']).exists():
+            return row['hash'], row['ext']
+        return None
+
+    def lookup_many(self, pairs):
+        """(artist, track) 목록 일괄 조회 → {(artist, track): (hash, ext)}"""
+        found = {}
+        wanted = set(pairs)
+        unique_pairs = list(wanted)
+
+        conn = self._connect()
+        try:
+            for start in range(0, len(unique_pairs), DB_CHUNK_SIZE):
+                chunk = unique_pairs[start:start + DB_CHUNK_SIZE]
+                artists = sorted({a for a, _ in chunk})
+                tracks = sorted({t for _, t in chunk})
+                rows = conn.execute(f"""
+                    SELECT artist, track, hash, ext FROM image_hashes
+                    WHERE artist IN ({','.join('?' * len(artists))})
+                    AND track IN ({','.join('?' * len(tracks))})
+                """, artists + tracks).fetchall()
+
+                for row in rows:
+                    key = (row['artist'], row['track'])
+                    if key in wanted:
+                        found[key] = (row['hash'], row['ext'])
+        finally:
+            conn.close()
+
+        return found
+
+    # ============================================
+    # 원본 URL 검증자 (조건부 재다운로드)
+    # ============================================
+    def get_source(self, url):
+        """원본 URL의 마지막 다운로드 정보 - 저장소에 파일이 있을 때만"""
+        conn = self._connect()
+        try:
+            row = conn.execute("""
+                SELECT url, hash, ext, etag, last_modified, content_length
+                FROM image_sources WHERE url = ?
+            """, (url,)).fetchone()
+        finally:
+            conn.close()
+
+        if row and self.blob_path(row['hash'], row['ext']).exists():
+            return dict(row)
+        return None
+
+    def record_source(self, url, hash_value, ext, headers=None, content_length=None):
+        """다운로드 응답의 ETag / Last-Modified / 길이 기록"""
+        headers = headers or {}
+        conn = self._connect()
+        try:
+            conn.execute("""
+                INSERT INTO image_sources (url, hash, ext, etag, last_modified, content_length, checked_at)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(url) DO UPDATE SET
+                    hash = excluded.hash,
+                    ext = excluded.ext,
+                    etag = COALESCE(excluded.etag, image_sources.etag),
+                    last_modified = COALESCE(excluded.last_modified, image_sources.last_modified),
+                    content_length = COALESCE(excluded.content_length, image_sources.content_length),
+                    checked_at = CURRENT_TIMESTAMP
+            """, (url, hash_value, ext, headers.get('ETag'), headers.get('Last-Modified'), content_length))
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ============================================
+    # URL / 서빙
+    # ============================================
+    def url_for(self, hash_value, ext='jpg', size=None, webp=False):
+        """불변 해시 URL - size가 주어지면 해당 크기를 덮는 렌디션 우선"""
+        if size:
+            rendition = find_rendition(self.blob_path(hash_value, ext), size, webp)
+            if rendition:
+                return f"{HASHED_URL_PREFIX}/{rendition[0].name}"
+        return f"{HASHED_URL_PREFIX}/{hash_value}.{ext}"
+
+    def resolve_name(self, name):
+        """/img/<name> → 실제 파일 경로 (원본 또는 렌디션), 잘못된 이름이면 None"""
+        match = HASHED_NAME_RE.match(name)
+        if not match:
+            return None
+
+        hash_value, size, _ = match.groups()
+        directory = self.store_dir / hash_value[:2]
+        if size:
+            directory = directory / RENDITIONS_DIRNAME
+
+        path = directory / name
+        if size:
+            return path if rendition_exists(path) else None
+        return path if path.exists() else None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def conditional_headers(source):
+    """get_source() 결과 → If-None-Match / If-Modified-Since 요청 헤더"""
+    headers = {}
+    if source:
+        if source.get('etag'):
+            headers['If-None-Match'] = source['etag']
+        if source.get('last_modified'):
+            headers['If-Modified-Since'] = source['last_modified']
+    return headers
+
+
+def get_image_store():
+    """ImageStore 싱글톤"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ImageStore()
+    return _store
+
+
+# ============================================
+# 마이그레이션 (기존 track_images / album_images 중복 제거)
+# ============================================
+def link_or_copy(source, target):
+    """target을 source의 하드링크로 교체 (실패 시 복사)"""
+    tmp_path = target.with_name(target.name + '.linktmp')
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copy2(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def migrate(store, directories, mapping_path=None, link=False):
+    """기존 이미지를 저장소로 옮기고 중복 현황 리포트
+
+    link=True면 원본 파일을 저장소 파일의 하드링크로 교체한다.
+    기존 URL(/static/track_images/...)은 그대로 동작하면서 중복 바이트는 회수된다.
+    """
+    reverse_mapping = {}
+    if mapping_path and Path(mapping_path).exists():
+        with open(mapping_path, 'r', encoding='utf-8') as f:
+            for key, filename in json.load(f).items():
+                if ':' in key:
+                    reverse_mapping.setdefault(filename, []).append(key.split(':', 1))
+
+    report = {
+        'files': 0,
+        'bytes': 0,
+        'unique_images': 0,
+        'unique_bytes': 0,
+        'duplicate_files': 0,
+        'reclaimable_bytes': 0,
+        'reclaimed_bytes': 0,
+        'mapped_tracks': 0,
+    }
+    seen_hashes = set()
+    original_inodes = {}  # 마이그레이션 전 실제 디스크 사용량 (하드링크 중복 제외)
+    start_time = time.time()
+
+    conn = store._connect()
+    try:
+        for directory in directories:
+            directory = Path(directory)
+            if not directory.exists():
+                continue
+
+            for path in sorted(directory.glob('*.jpg')):
+                stat = path.stat()
+                content = path.read_bytes()
+                hash_value, ext, blob, _ = store.put_blob(content)
+
+                report['files'] += 1
+                report['bytes'] += stat.st_size
+                original_inodes[(stat.st_dev, stat.st_ino)] = stat.st_size
+
+                if hash_value in seen_hashes:
+                    report['duplicate_files'] += 1
+                    report['reclaimable_bytes'] += stat.st_size
+                else:
+                    seen_hashes.add(hash_value)
+                    report['unique_images'] += 1
+                    report['unique_bytes'] += stat.st_size
+
+                # 원본 → 저장소 하드링크 (이미 같은 inode면 건너뜀)
+                if link:
+                    blob_stat = blob.stat()
+                    if (stat.st_dev, stat.st_ino) != (blob_stat.st_dev, blob_stat.st_ino):
+                        link_or_copy(blob, path)
+
+                for artist, track in reverse_mapping.get(path.name, []):
+                    store.assign(artist, track, hash_value, ext, stat.st_size, conn=conn)
+                    report['mapped_tracks'] += 1
+
+        conn.commit()
+    finally:
+        conn.close()
+
+    if link:
+        # 전: 원본 inode 합계 / 후: 고유 이미지 하나씩 (저장소 파일과 공유)
+        report['reclaimed_bytes'] = max(sum(original_inodes.values()) - report['unique_bytes'], 0)
+
+    report['duration_seconds'] = round(time.time() - start_time, 1)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='콘텐츠 주소 이미지 저장소 관리')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subparsers.add_parser('migrate', help='기존 이미지 폴더를 저장소로 이전')
+    migrate_parser.add_argument('--link', action='store_true',
+                                help='원본을 저장소 하드링크로 교체해 중복 공간 회수')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'migrate':
+        store = get_image_store()
+        report = migrate(
+            store,
+            [TRACK_IMAGES_DIR, ALBUM_IMAGES_DIR],
+            mapping_path=TRACK_IMAGES_DIR / 'download_mapping.json',
+            link=args.link
+        )
+
+        mb = 1024 * 1024
+        print(f"{'='*60}")
+        print(f"📁 파일: {report['files']}개 ({report['bytes'] / mb:.1f}MB)")
+        print(f"🖼️ 고유 이미지: {report['unique_images']}개 ({report['unique_bytes'] / mb:.1f}MB)")
+        print(f"♻️ 중복 파일: {report['duplicate_files']}개 "
+              f"(회수 가능 {report['reclaimable_bytes'] / mb:.1f}MB)")
+        if args.link:
+            print(f"✅ 회수된 공간: {report['reclaimed_bytes'] / mb:.1f}MB")
+        print(f"🔗 매핑된 트랙: {report['mapped_tracks']}개")
+        print(f"⏱️ 소요 시간: {report['duration_seconds']}초")
+        print(f"{'='*60}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Job Scheduler - 우선순위 큐 기반 작업 스케줄러 (schedule 60초 폴링 대체)
+- heapq 타이머: 다음 실행 시각까지 Condition.wait → 폴링 없음, 늦게 끝난 작업이 다른 작업을 밀지 않음
+- cron 형식 ('분 시 일 월 요일') 또는 '@every 3h' 간격 지정, 설정 파일(SCHEDULER_CONFIG, JSON)로 교체 가능
+- 작업은 워커 풀에서 실행, 차트(동시성 키)별 동시 실행 제한
+  → 제한에 걸리면 작업당 1개만 대기, 그 이상은 skipped
+- 지터: 실행 시각에 0~jitter초 무작위 지연 (여러 작업 / 서버가 같은 순간에 몰리지 않게)
+- 실행 이력 영구 저장 (scheduler.db) → 재시작 시 놓친 실행을 catchup 범위 안에서 1회 따라잡음
+- 재시작 시 running으로 남은 이력은 interrupted로 정리
+
+기본 설정 = 기존 backend_ultimate 스케줄 (크롤러 7개 17회/일 + 이미지 재해석 3시간마다 + raw 아카이브)
+
+사용법:
+    python3 job_scheduler.py jobs            # 작업 목록 + 다음 실행 시각
+    python3 job_scheduler.py upcoming --count 20
+    python3 job_scheduler.py history [--job melon] [--limit 30]
+    python3 backend_ultimate.py              # 스케줄러 실행
+"""
+
+import argparse
+import heapq
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+HISTORY_DB = BASE_DIR / 'scheduler.db'
+CONFIG_PATH = os.getenv('SCHEDULER_CONFIG')
+
+WORKERS = int(os.getenv('SCHEDULER_WORKERS', '4'))
+PER_KEY_LIMIT = int(os.getenv('SCHEDULER_PER_CHART_LIMIT', '1'))
+DEFAULT_JITTER = int(os.getenv('SCHEDULER_JITTER', '60'))  # 기존 60초 폴링 지연과 같은 범위
+DEFAULT_CATCHUP = 6 * 3600  # 이보다 오래 전에 놓친 실행은 따라잡지 않음 (초)
+MAX_WAIT = 300  # 시계 변경 대비 최대 대기 (초)
+
+# 기존 schedule 등록과 같은 시각 (task: pipeline / reresolve / archive)
+DEFAULT_JOBS = [
+    {'name': 'melon', 'cron': '10 1,7,13,19 * * *', 'task': 'pipeline', 'chart': 'melon'},
+    {'name': 'genie', 'cron': '15 1,7,13,19 * * *', 'task': 'pipeline', 'chart': 'genie'},
+    {'name': 'bugs', 'cron': '20 1,7,13,19 * * *', 'task': 'pipeline', 'chart': 'bugs'},
+    {'name': 'flo', 'cron': '25 1,13 * * *', 'task': 'pipeline', 'chart': 'flo'},
+    {'name': 'apple_music', 'cron': '10 9 * * *', 'task': 'pipeline', 'chart': 'apple_music'},
+    {'name': 'spotify', 'cron': '10 10 * * *', 'task': 'pipeline', 'chart': 'spotify'},
+    {'name': 'lastfm', 'cron': '10 12 * * *', 'task': 'pipeline', 'chart': 'lastfm'},
+    {'name': 'reresolve_images', 'cron': '@every 3h', 'task': 'reresolve', 'catchup': 3 * 3600},
+    {'name': 'archive_raw', 'cron': '40 4 * * *', 'task': 'archive', 'catchup': 24 * 3600},
+]
+
+
+def load_jobs(path=CONFIG_PATH):
+    """설정 파일(JSON 리스트)이 있으면 그것, 없으면 DEFAULT_JOBS"""
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return [dict(job) for job in DEFAULT_JOBS]
+
+
+# ============================================
+# cron 해석
+# ============================================
+def _parse_field(field, low, high):
+    values = set()
+    for part in field.split(','):
+        part, _, step = part.partition('/')
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(v) for v in part.split('-', 1))
+        else:
+            start = end = int(part)
+            if step:
+                end = high
+        if start < low or end > high or start > end:
+            raise ValueError(f"범위 밖 cron 값: {field}")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+
+class CronSpec:
+    """'분 시 일 월 요일' (요일 0/7=일요일) 또는 '@every 30m / 3h / 1d'"""
+
+    UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+    def __init__(self, spec):
+        self.spec = spec.strip()
+        self.interval = None
+        if self.spec.startswith('@every'):
+            value = self.spec.split(None, 1)[1].strip()
+            self.interval = timedelta(seconds=int(value[:-1]) * self.UNITS[value[-1]])
+            return
+
+        fields = self.spec.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron 필드는 5개: {spec}")
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        self.weekdays = {day % 7 for day in _parse_field(fields[4], 0, 7)}
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.isoweekday() % 7) in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok  # cron: 일 / 요일 둘 다 지정하면 OR
+
+    def next_after(self, after):
+        """after 이후 첫 실행 시각 (간격 지정이면 after + 간격)"""
+        if self.interval:
+            return after + self.interval
+
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 4)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"실행 시각 없음: {self.spec}")
+
+    def missed_between(self, last, now):
+        """(last, now] 사이 마지막 실행 시각 (없으면 None)"""
+        missed = None
+        moment = self.next_after(last)
+        while moment <= now:
+            missed = moment
+            moment = self.next_after(moment)
+        return missed
+
+
+# ============================================
+# 실행 이력
+# ============================================
+class RunHistory:
+    """scheduler.db - 작업별 마지막 예정 시각 + 실행 이력"""
+
+    def __init__(self, db_path=HISTORY_DB):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS job_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job TEXT NOT NULL,
+                    scheduled_for TIMESTAMP NOT NULL,
+                    started_at TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    status TEXT NOT NULL,
+                    catchup INTEGER DEFAULT 0,
+                    error TEXT
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_job_runs_job
+                ON job_runs(job, id);
+
+                CREATE TABLE IF NOT EXISTS job_state (
+                    job TEXT PRIMARY KEY,
+                    last_scheduled_for TIMESTAMP NOT NULL
+                );
+            """)
+
+    @contextmanager
+    def _connect(self):
+        """연결 → 블록 끝에서 커밋 후 닫음"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def last_scheduled(self, job):
+        with self._connect() as conn:
+            row = conn.execute("SELECT last_scheduled_for FROM job_state WHERE job = ?", (job,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def set_scheduled(self, job, scheduled_for):
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                INSERT INTO job_state (job, last_scheduled_for) VALUES (?, ?)
+                ON CONFLICT(job) DO UPDATE SET last_scheduled_for = excluded.last_scheduled_for
+                WHERE excluded.last_scheduled_for > job_state.last_scheduled_for
+            """, (job, scheduled_for.isoformat()))
+
+    def start(self, job, scheduled_for, catchup=False, status='running'):
+        now = datetime.now().isoformat()
+        with self._lock, self._connect() as conn:
+            return conn.execute("""
+                INSERT INTO job_runs (job, scheduled_for, started_at, status, catchup)
+                VALUES (?, ?, ?, ?, ?)
+            """, (job, scheduled_for.isoformat(), now, status, int(catchup))).lastrowid
+
+    def finish(self, run_id, status, error=None):
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                UPDATE job_runs SET finished_at = ?, status = ?, error = ? WHERE id = ?
+            """, (datetime.now().isoformat(), status, error, run_id))
+
+    def resume(self, run_id):
+        """대기(waiting) 이력 → 실행 시작"""
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE job_runs SET status = 'running', started_at = ? WHERE id = ?",
+                         (datetime.now().isoformat(), run_id))
+
+    def mark_interrupted(self):
+        """이전 프로세스가 실행 중에 종료된 이력 정리 → 건수"""
+        with self._lock, self._connect() as conn:
+            return conn.execute(
+                "UPDATE job_runs SET status = 'interrupted' WHERE status IN ('running', 'waiting')"
+            ).rowcount
+
+    def recent(self, job=None, limit=30):
+        with self._connect() as conn:
+            return conn.execute("""
+                SELECT job, scheduled_for, started_at, finished_at, status, catchup, error
+                FROM job_runs
+                WHERE (? IS NULL OR job = ?)
+                ORDER BY id DESC
+                LIMIT ?
+            """, (job, job, limit)).fetchall()
+
+
+# ============================================
+# 스케줄러
+# ============================================
+class JobScheduler:
+    """heapq 타이머 + 워커 풀 + 동시성 키별 제한"""
+
+    def __init__(self, jobs, tasks, history=None, workers=WORKERS, per_key_limit=PER_KEY_LIMIT,
+                 default_jitter=DEFAULT_JITTER):
+        """jobs: 설정 리스트, tasks: {task 이름: callable(job) → 결과 (False면 실패)}"""
+        self.jobs = {}
+        for job in jobs:
+            job = dict(job)
+            job['spec'] = CronSpec(job['cron'])
+            job.setdefault('jitter', default_jitter)
+            job.setdefault('catchup', DEFAULT_CATCHUP)
+            job.setdefault('key', job.get('chart') or job['name'])
+            if job['task'] not in tasks:
+                raise ValueError(f"알 수 없는 작업 종류: {job['task']} ({job['name']})")
+            self.jobs[job['name']] = job
+
+        self.tasks = tasks
+        self.history = history or RunHistory()
+        self.per_key_limit = per_key_limit
+        self.workers = workers
+
+        self._heap = []          # (실행 시각, 순번, 작업 이름, 예정 시각, catchup)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._running = {}       # 동시성 키 → 실행 중 수
+        self._waiting = {}       # 동시성 키 → [(작업 이름, 예정 시각, catchup, run_id)]
+        self._stopped = False
+        self._executor = None
+
+    # --- 큐 ---
+    def _push(self, name, scheduled_for, catchup=False):
+        job = self.jobs[name]
+        delay = random.uniform(0, job['jitter']) if job['jitter'] else 0
+        self._seq += 1
+        heapq.heappush(self._heap, (scheduled_for + timedelta(seconds=delay), self._seq,
+                                    name, scheduled_for, catchup))
+
+    def _initial_schedule(self, now):
+        """작업별 첫 실행 예약 (놓친 실행은 catchup 범위 안이면 지금 1회)"""
+        interrupted = self.history.mark_interrupted()
+        if interrupted:
+            logger.warning(f"⚠️ 이전 프로세스에서 끝나지 않은 실행 {interrupted}건 → interrupted")
+
+        for name, job in self.jobs.items():
+            spec = job['spec']
+            last = self.history.last_scheduled(name)
+            if last is None:
+                self.history.set_scheduled(name, now)
+                self._push(name, spec.next_after(now))
+                continue
+
+            missed = spec.missed_between(last, now)
+            base = last  # 간격 작업의 다음 실행 기준
+            if missed and (now - missed).total_seconds() <= job['catchup']:
+                logger.info(f"⏪ {name}: 놓친 실행 따라잡기 (예정 {missed.strftime('%m-%d %H:%M')})")
+                self._push(name, now, catchup=True)
+                self.history.set_scheduled(name, missed)
+                base = now
+            elif missed:
+                logger.info(f"⏭️ {name}: 놓친 실행 {missed.strftime('%m-%d %H:%M')} - 따라잡기 범위 초과")
+                self.history.set_scheduled(name, missed)
+                base = missed
+
+            next_run = spec.next_after(base if spec.interval else now)
+            self._push(name, max(next_run, now))
+
+    def upcoming(self, count=20, now=None):
+        """다음 실행 예정 [(시각, 작업 이름)] (지터 제외)"""
+        now = now or datetime.now()
+        heap = []
+        for name, job in self.jobs.items():
+            heapq.heappush(heap, (job['spec'].next_after(now), name))
+        result = []
+        while heap and len(result) < count:
+            moment, name = heapq.heappop(heap)
+            result.append((moment, name))
+            heapq.heappush(heap, (self.jobs[name]['spec'].next_after(moment), name))
+        return result
+
+    # --- 실행 ---
+    def _dispatch(self, name, scheduled_for, catchup):
+        """동시성 제한 확인 후 실행 / 대기 / 건너뜀 (self._cond 보유 상태에서 호출)"""
+        job = self.jobs[name]
+        key = job['key']
+        self.history.set_scheduled(name, scheduled_for)
+
+        if self._running.get(key, 0) < self.per_key_limit:
+            self._running[key] = self._running.get(key, 0) + 1
+            run_id = self.history.start(name, scheduled_for, catchup)
+            self._executor.submit(self._run, name, run_id)
+            return
+
+        waiting = self._waiting.setdefault(key, [])
+        if any(item[0] == name for item in waiting):
+            run_id = self.history.start(name, scheduled_for, catchup, status='skipped')
+            self.history.finish(run_id, 'skipped', '이전 실행 진행 중 + 대기 1건 있음')
+            logger.warning(f"⏭️ {name}: 이전 실행이 길어져 건너뜀 ({scheduled_for.strftime('%H:%M')})")
+            return
+
+        run_id = self.history.start(name, scheduled_for, catchup, status='waiting')
+        waiting.append((name, scheduled_for, catchup, run_id))
+        logger.info(f"⏳ {name}: {key} 실행 중 - 끝나면 실행")
+
+    def _run(self, name, run_id):
+        job = self.jobs[name]
+        status, error = 'ok', None
+        started = datetime.now()
+        try:
+            logger.info(f"▶️ {name} 시작")
+            if self.tasks[job['task']](job) is False:
+                status = 'failed'
+        except Exception as e:
+            status, error = 'failed', str(e)
+            logger.error(f"❌ {name} 실패: {e}")
+        finally:
+            self.history.finish(run_id, status, error)
+            logger.info(f"⏹️ {name} {status} ({(datetime.now() - started).total_seconds():.0f}초)")
+            self._release(job['key'])
+
+    def _release(self, key):
+        with self._cond:
+            self._running[key] -= 1
+            waiting = self._waiting.get(key)
+            if waiting and not self._stopped:
+                name, _, _, run_id = waiting.pop(0)
+                self._running[key] += 1
+                self.history.resume(run_id)
+                self._executor.submit(self._run, name, run_id)
+            self._cond.notify_all()
+
+    def run_forever(self):
+        """스케줄러 메인 루프 (stop() 호출 전까지)"""
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+        with self._cond:
+            self._initial_schedule(datetime.now())
+        logger.info(f"🗓️ 스케줄러 시작 - 작업 {len(self.jobs)}개, 워커 {self.workers}개, "
+                    f"키당 동시 실행 {self.per_key_limit}개")
+        for moment, name in self.upcoming(5):
+            logger.info(f"  다음: {moment.strftime('%m-%d %H:%M')} {name}")
+
+        try:
+            with self._cond:
+                while not self._stopped:
+                    now = datetime.now()
+                    while self._heap and self._heap[0][0] <= now:
+                        _, _, name, scheduled_for, catchup = heapq.heappop(self._heap)
+                        self._dispatch(name, scheduled_for, catchup)
+                        spec = self.jobs[name]['spec']
+                        if not catchup:
+                            self._push(name, spec.next_after(scheduled_for))
+
+                    delay = (self._heap[0][0] - now).total_seconds() if self._heap else MAX_WAIT
+                    self._cond.wait(timeout=max(0.0, min(delay, MAX_WAIT)))
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+
+def pipeline_tasks(system):
+    """backend_ultimate.UltimateSystemV21Final → 작업 종류별 실행 함수"""
+    return {
+        'pipeline': lambda job: system.run_complete_pipeline(job['chart']),
+        'reresolve': lambda job: system.reresolve_default_images(),
+        'archive': lambda job: system.archive_raw_data(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='작업 스케줄러')
+    parser.add_argument('--db', default=str(HISTORY_DB))
+    parser.add_argument('--config', default=CONFIG_PATH, help='작업 설정 JSON (기본: 기존 스케줄)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('jobs', help='작업 목록 + 다음 실행')
+    upcoming_parser = subparsers.add_parser('upcoming', help='다음 실행 예정')
+    upcoming_parser.add_argument('--count', type=int, default=20)
+    history_parser = subparsers.add_parser('history', help='실행 이력')
+    history_parser.add_argument('--job', default=None)
+    history_parser.add_argument('--limit', type=int, default=30)
+    args = parser.parse_args()
+
+    jobs = load_jobs(args.config)
+    history = RunHistory(args.db)
+    noop = {job['task']: (lambda job: None) for job in jobs}
+    scheduler = JobScheduler(jobs, noop, history)
+
+    if args.command == 'jobs':
+        now = datetime.now()
+        for name, job in scheduler.jobs.items():
+            last = history.last_scheduled(name)
+            print(f"  {name:<18} {job['cron']:<20} 키={job['key']:<12} 지터 {job['jitter']}초, "
+                  f"다음 {job['spec'].next_after(now).strftime('%m-%d %H:%M')}, "
+                  f"마지막 {last.strftime('%m-%d %H:%M') if last else '-'}")
+
+    elif args.command == 'upcoming':
+        for moment, name in scheduler.upcoming(args.count):
+            print(f"  {moment.strftime('%m-%d %H:%M')}  {name}")
+
+    elif args.command == 'history':
+        for job, scheduled_for, started_at, finished_at, status, catchup, error in history.recent(args.job, args.limit):
+            print(f"  {job:<18} 예정 {scheduled_for[:16]}  {status:<11}"
+                  f"{' (따라잡기)' if catchup else ''} {started_at[11:19] if started_at else '':>8}"
+                  f" → {finished_at[11:19] if finished_at else '':<8} {error or ''}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Prerender - 파이프라인 직후 핫 API 응답 미리 생성 / 원자적 공개
+- 대상: trending (자주 쓰는 limit), statistics, 차트별 latest / info
+- 데이터 버전: chart_latest_pointer의 (chart_name, published_time) 해시
+  → update_unified_master가 차트를 교체하면 버전이 바뀜
+- prerendered/<버전 디렉터리>/*.json + manifest.json에 쓴 뒤
+  prerendered/current.json을 os.replace로 교체 (API는 항상 완성된 세트만 봄)
+- 렌더는 prerendered/.render.lock 파일 잠금으로 한 번에 하나씩 (동시 파이프라인 대비)
+- API 프로세스는 get_prerendered()로 응답 (현재 데이터 버전과 다르면 None → 라이브 조회)
+- 페이로드별 렌더 시간 / 크기 → logs/prerender_report.json
+
+사용법:
+    python3 prerender.py render
+    python3 prerender.py show
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from api_payloads import chart_info_payload, chart_latest_payload, statistics_payload, trending_payload
+from chart_pointer import ensure_latest_pointer
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+DB_PATH = BASE_DIR / 'rank_history.db'
+PRERENDER_DIR = BASE_DIR / 'prerendered'
+REPORT_PATH = BASE_DIR / 'logs' / 'prerender_report.json'
+
+PRERENDER_TRENDING_LIMITS = [
+    int(limit) for limit in os.getenv('PRERENDER_TRENDING_LIMITS', '10,20,50,100').split(',') if limit.strip()
+]
+PRERENDER_KEEP = int(os.getenv('PRERENDER_KEEP', '3'))  # 보관할 버전 디렉터리 수
+PRERENDER_CHECK_INTERVAL = float(os.getenv('PRERENDER_CHECK_INTERVAL', '5'))  # API 쪽 버전 확인 주기 (초)
+
+CURRENT_FILE = 'current.json'
+MANIFEST_FILE = 'manifest.json'
+LOCK_FILE = '.render.lock'
+TMP_PREFIX = '.render-'
+
+_render_lock = threading.Lock()  # fcntl 없는 환경에서도 같은 프로세스 안은 직렬화
+
+
+def data_version(conn):
+    """현재 공개된 데이터 버전 (차트별 published_time 해시)"""
+    ensure_latest_pointer(conn)
+    rows = conn.execute("""
+        SELECT chart_name, published_time
+        FROM chart_latest_pointer
+        WHERE published_time IS NOT NULL
+        ORDER BY chart_name
+    """).fetchall()
+    digest = hashlib.sha1()
+    for chart_name, published_time in rows:
+        digest.update(f"{chart_name}={published_time}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def payload_names(conn):
+    """프리렌더 대상 이름 → (빌더, 인자) 목록"""
+    targets = [(f"trending-{limit}", trending_payload, (limit,)) for limit in PRERENDER_TRENDING_LIMITS]
+    targets.append(('statistics', statistics_payload, ()))
+
+    charts = [row[0] for row in conn.execute("""
+        SELECT chart_name FROM chart_latest_pointer
+        WHERE published_time IS NOT NULL
+        ORDER BY chart_name
+    """)]
+    for chart_name in charts:
+        targets.append((f"chart-{chart_name}-latest", chart_latest_payload, (chart_name,)))
+        targets.append((f"chart-{chart_name}-info", chart_info_payload, (chart_name,)))
+    return targets
+
+
+def encode(payload):
+    """jsonify와 같은 형식 (키 정렬, 공백 없음) - 한글은 이스케이프 없이 UTF-8 (JSON_AS_ASCII=False 의도)"""
+    body = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':')) + '\n'
+    return body.encode('utf-8')
+
+
+@contextmanager
+def render_lock(out_dir):
+    """렌더 / 공개 / 정리를 프로세스 간에도 한 번에 하나씩"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with _render_lock:
+        with open(out_dir / LOCK_FILE, 'a') as lock_file:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def render_all(db_path=DB_PATH, out_dir=PRERENDER_DIR, keep=PRERENDER_KEEP):
+    """핫 페이로드 전체 렌더 → 버전 디렉터리에 쓰고 current.json 교체"""
+    out_dir = Path(out_dir)
+    with render_lock(out_dir):
+        return _render_all(db_path, out_dir, keep)
+
+
+def _render_all(db_path, out_dir, keep):
+    started = time.perf_counter()
+    # 실패하면 남는 임시 디렉터리는 다음 렌더의 prune이 정리
+    tmp_dir = Path(tempfile.mkdtemp(prefix=TMP_PREFIX, dir=out_dir))
+
+    conn = sqlite3.connect(str(db_path))
+    conn.row_factory = sqlite3.Row
+    try:
+        version = data_version(conn)
+        rendered_at = datetime.now()
+        dirname = f"{rendered_at.strftime('%Y%m%d%H%M%S%f')}-{version[:12]}"
+        version_dir = out_dir / dirname
+
+        payloads = {}
+        for name, builder, args in payload_names(conn):
+            t0 = time.perf_counter()
+            payload = builder(conn, *args)
+            if payload is None:
+                continue
+            body = encode(payload)
+            render_ms = (time.perf_counter() - t0) * 1000
+
+            with open(tmp_dir / f"{name}.json", 'wb') as f:
+                f.write(body)
+            payloads[name] = {
+                'file': f"{name}.json",
+                'bytes': len(body),
+                'render_ms': round(render_ms, 2),
+                'etag': hashlib.sha1(body).hexdigest(),
+            }
+    finally:
+        conn.close()
+
+    manifest = {
+        'data_version': version,
+        'dir': dirname,
+        'rendered_at': rendered_at.isoformat(),
+        'payloads': payloads,
+    }
+    with open(tmp_dir / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    # 디렉터리 완성 후 이름 변경 → current.json 교체 순서 (읽는 쪽은 반쯤 쓴 파일을 볼 수 없음)
+    os.chmod(tmp_dir, 0o755)
+    os.replace(tmp_dir, version_dir)
+    fd, current_tmp = tempfile.mkstemp(prefix=TMP_PREFIX, suffix='.json', dir=out_dir)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({'dir': dirname, 'data_version': version}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.chmod(current_tmp, 0o644)
+    os.replace(current_tmp, out_dir / CURRENT_FILE)
+
+    removed = prune(out_dir, keep)
+
+    total_bytes = sum(item['bytes'] for item in payloads.values())
+    elapsed = time.perf_counter() - started
+    logger.info(f"🧊 프리렌더 공개: {dirname} ({len(payloads)}개, {total_bytes / 1024:.1f}KB, {elapsed:.2f}초)")
+    for name, item in payloads.items():
+        logger.info(f"  {name}: {item['render_ms']:.1f}ms, {item['bytes'] / 1024:.1f}KB")
+
+    return {
+        'data_version': version,
+        'dir': dirname,
+        'rendered_at': manifest['rendered_at'],
+        'payload_count': len(payloads),
+        'total_bytes': total_bytes,
+        'elapsed_sec': round(elapsed, 2),
+        'pruned': removed,
+        'payloads': payloads,
+    }
+
+
+def prune(out_dir, keep=PRERENDER_KEEP):
+    """current가 가리키는 디렉터리는 남기고 오래된 버전 디렉터리 삭제 (render_lock 안에서 호출)"""
+    out_dir = Path(out_dir)
+    current = read_current(out_dir)
+    current_dir = current['dir'] if current else None
+
+    # 잠금을 잡고 있으므로 남아 있는 임시 파일은 중단된 렌더의 것
+    for path in out_dir.glob(f"{TMP_PREFIX}*"):
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+
+    dirs = sorted(
+        (path for path in out_dir.iterdir() if path.is_dir() and not path.name.startswith('.')),
+        key=lambda path: path.name,
+        reverse=True,
+    )
+    removed = []
+    for path in dirs[max(keep, 1):]:
+        if path.name == current_dir:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed.append(path.name)
+    return removed
+
+
+def read_current(out_dir=PRERENDER_DIR):
+    try:
+        with open(Path(out_dir) / CURRENT_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_report(report, path=REPORT_PATH):
+    """마지막 실행 리포트 저장"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+# ============================================
+# API 프로세스 쪽 서빙
+# ============================================
+class PrerenderStore:
+    """공개된 프리렌더 세트 읽기 - current.json / 데이터 버전은 주기적으로만 확인"""
+
+    def __init__(self, out_dir=PRERENDER_DIR, db_path=DB_PATH, check_interval=PRERENDER_CHECK_INTERVAL):
+        self.out_dir = Path(out_dir)
+        self.db_path = Path(db_path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._manifest = None  # 현재 데이터 버전과 일치할 때만 설정
+        self._bodies = {}
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+
+        current = read_current(self.out_dir)
+        if not current:
+            self._manifest = None
+            return
+
+        try:
+            # 경로의 ?, #, % 가 URI로 해석되지 않게 as_uri()로 인코딩
+            conn = sqlite3.connect(Path(self.db_path).resolve().as_uri() + '?mode=ro', uri=True)
+            try:
+                live_version = data_version(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"프리렌더 버전 확인 실패: {e}")
+            self._manifest = None
+            return
+
+        if current['data_version'] != live_version:
+            self._manifest = None
+            return
+
+        if self._manifest and self._manifest['dir'] == current['dir']:
+            return
+
+        try:
+            with open(self.out_dir / current['dir'] / MANIFEST_FILE, encoding='utf-8') as f:
+                self._manifest = json.load(f)
+            self._bodies = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"프리렌더 manifest 읽기 실패: {e}")
+            self._manifest = None
+
+    def get(self, name):
+        """이름 → (본문 bytes, etag, manifest) 또는 None (없거나 데이터 버전이 다름)"""
+        with self._lock:
+            self._refresh()
+            hit, missing = self._read(name)
+            if missing:
+                # manifest에는 있는데 파일이 없음 = 캐시한 디렉터리가 이미 정리됨
+                # → current.json 다시 읽고 한 번 더 (목록에 없는 이름은 주기 확인만)
+                self._checked_at = 0.0
+                self._refresh()
+                hit, _ = self._read(name)
+            return hit
+
+    def _read(self, name):
+        """→ (hit 또는 None, manifest에 있는데 파일이 없는지)"""
+        manifest = self._manifest
+        if not manifest or name not in manifest['payloads']:
+            return None, False
+
+        item = manifest['payloads'][name]
+        body = self._bodies.get(name)
+        if body is None:
+            try:
+                with open(self.out_dir / manifest['dir'] / item['file'], 'rb') as f:
+                    body = f.read()
+            except OSError:
+                return None, True
+            self._bodies[name] = body
+        return (body, item['etag'], manifest), False
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_prerender_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PrerenderStore()
+    return _store
+
+
+def get_prerendered(name):
+    """프리렌더된 응답 (ETag / 304 지원) 또는 None → 호출한 라우트가 라이브 조회"""
+    from flask import current_app, request
+
+    hit = get_prerender_store().get(name)
+    if hit is None:
+        return None
+
+    body, etag, manifest = hit
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['X-Prerendered-Version'] = manifest['dir']
+    return response.make_conditional(request)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='핫 API 응답 프리렌더')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('render', help='현재 데이터 버전으로 렌더 후 공개')
+    sub.add_parser('show', help='공개된 세트 / 데이터 버전 확인')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'render':
+        report = render_all()
+        save_report(report)
+        return
+
+    current = read_current()
+    conn = sqlite3.connect(str(DB_PATH))
+    try:
+        live_version = data_version(conn)
+    finally:
+        conn.close()
+
+    if not current:
+        print(f"공개된 프리렌더 없음 (데이터 버전 {live_version[:12]})")
+        return
+
+    print(f"공개: {current['dir']}")
+    print(f"데이터 버전: {live_version[:12]} ({'일치' if current['data_version'] == live_version else '불일치 → 라이브 조회'})")
+    with open(PRERENDER_DIR / current['dir'] / MANIFEST_FILE, encoding='utf-8') as f:
+        manifest = json.load(f)
+    for name, item in manifest['payloads'].items():
+        print(f"  {name:<28} {item['bytes'] / 1024:8.1f}KB {item['render_ms']:8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Raw Archive - raw_chart_data 보존 기간 관리 + 월별 압축 아카이브
+- 보존 기간(RAW_RETENTION_DAYS)이 지난 raw 행을 월별 JSON Lines 압축 파일로 이동
+  archive/raw_chart_data/raw_chart_data-YYYY-MM.jsonl.gz (zstandard 설치 시 .jsonl.zst)
+- 실행마다 월 파일 끝에 압축 멤버(프레임) 하나를 이어 붙이고, 위치를 raw_archive_index에 기록
+  → replay는 필요한 멤버만 seek 후 압축 해제
+- 파일 fsync 후에 인덱스 기록 + raw 행 삭제를 한 트랜잭션으로 (중간에 죽어도 행 유실 없음, 중복은 id로 제거)
+- 아카이브된 배치는 crawl_batches.status = 'archived' (시계열 처리 대상 아님)
+- 삭제 후 incremental_vacuum으로 빈 페이지 반환 (auto_vacuum=INCREMENTAL 전환은 enable-vacuum 1회)
+
+사용법:
+    python3 raw_archive.py archive --days 30 [--dry-run]
+    python3 raw_archive.py replay --from 2025-01-01 --to 2025-01-31 [--chart melon] [--jsonl out.jsonl] [--restore]
+    python3 raw_archive.py stats
+    python3 raw_archive.py enable-vacuum        # 최초 1회 (전체 VACUUM)
+    python3 raw_archive.py vacuum --pages 2000
+"""
+
+import argparse
+import gzip
+import io
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+RAW_DB = BASE_DIR / 'chart_rankings.db'
+ARCHIVE_DIR = BASE_DIR / 'archive' / 'raw_chart_data'
+
+RETENTION_DAYS = int(os.getenv('RAW_RETENTION_DAYS', '30'))
+VACUUM_PAGES = int(os.getenv('RAW_VACUUM_PAGES', '5000'))  # 실행당 반환할 최대 페이지
+
+RAW_COLUMNS = ('id', 'chart_name', 'rank', 'title', 'artist', 'track', 'image_url',
+               'views_or_streams', 'streams', 'crawled_at', 'batch_id')
+
+
+def archive_ext():
+    return 'jsonl.zst' if ZSTD_AVAILABLE else 'jsonl.gz'
+
+
+def compress(data, ext):
+    if ext.endswith('.zst'):
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=9)
+
+
+def decompress(data, ext):
+    if ext.endswith('.zst'):
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard 미설치: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return gzip.decompress(data)
+
+
+def month_bounds(month):
+    """'YYYY-MM' → (시작, 다음 달 시작) ISO 문자열"""
+    start = datetime.strptime(month, '%Y-%m')
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start.isoformat(), end.isoformat()
+
+
+class RawArchive:
+    """raw_chart_data 보존 기간 / 아카이브 관리"""
+
+    def __init__(self, db_path=RAW_DB, archive_dir=ARCHIVE_DIR):
+        self.db_path = Path(db_path)
+        self.archive_dir = Path(archive_dir)
+        self._ensure_tables()
+
+    def _connect(self):
+        return sqlite3.connect(str(self.db_path), timeout=30)
+
+    def _ensure_tables(self):
+        conn = self._connect()
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS raw_archive_index (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    archive_file TEXT NOT NULL,
+                    member_offset INTEGER NOT NULL,
+                    member_length INTEGER NOT NULL,
+                    chart_name TEXT NOT NULL,
+                    batch_id INTEGER,
+                    first_crawled_at TIMESTAMP,
+                    last_crawled_at TIMESTAMP,
+                    row_count INTEGER NOT NULL,
+                    archived_at TIMESTAMP NOT NULL
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_raw_archive_range
+                ON raw_archive_index(first_crawled_at, last_crawled_at);
+            """)
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'raw_chart_data'").fetchone():
+                # 보존 기간 범위 조회용
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_raw_crawled_at ON raw_chart_data(crawled_at)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ============================================
+    # 아카이브
+    # ============================================
+    def archive(self, retention_days=RETENTION_DAYS, dry_run=False, vacuum_pages=VACUUM_PAGES):
+        """보존 기간 지난 raw 행 → 월별 압축 파일 → 통계 dict"""
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        stats = {'cutoff': cutoff, 'months': [], 'rows': 0, 'bytes_written': 0, 'freed_pages': 0}
+
+        conn = self._connect()
+        try:
+            months = [row[0] for row in conn.execute("""
+                SELECT DISTINCT substr(crawled_at, 1, 7)
+                FROM raw_chart_data
+                WHERE crawled_at < ?
+                ORDER BY 1
+            """, (cutoff,))]
+
+            for month in months:
+                if not month or len(month) != 7:
+                    continue
+                month_start, month_end = month_bounds(month)
+                rows = conn.execute(f"""
+                    SELECT {', '.join(RAW_COLUMNS)}
+                    FROM raw_chart_data
+                    WHERE crawled_at >= ? AND crawled_at < ? AND crawled_at < ?
+                    ORDER BY chart_name, crawled_at, rank
+                """, (month_start, month_end, cutoff)).fetchall()
+                if not rows:
+                    continue
+
+                stats['months'].append(month)
+                stats['rows'] += len(rows)
+                if dry_run:
+                    continue
+
+                written = self._archive_month(conn, month, rows)
+                stats['bytes_written'] += written
+
+            if not dry_run and stats['rows']:
+                stats['freed_pages'] = self.incremental_vacuum(conn, vacuum_pages)
+        finally:
+            conn.close()
+
+        logger.info(f"🗄️ raw 아카이브: {stats['rows']}행 ({', '.join(stats['months']) or '없음'}), "
+                    f"{stats['bytes_written'] / 1024:.1f}KB 기록, {stats['freed_pages']}페이지 반환"
+                    f"{' (dry-run)' if dry_run else ''}")
+        return stats
+
+    def _archive_month(self, conn, month, rows):
+        ext = archive_ext()
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        path = self.archive_dir / f"raw_chart_data-{month}.{ext}"
+
+        lines = ''.join(
+            json.dumps(dict(zip(RAW_COLUMNS, row)), ensure_ascii=False) + '\n' for row in rows
+        )
+        member = compress(lines.encode('utf-8'), ext)
+
+        # 파일에 먼저 기록 (fsync) → 그다음 인덱스 + 삭제 커밋
+        with open(path, 'ab') as f:
+            offset = f.tell()
+            f.write(member)
+            f.flush()
+            os.fsync(f.fileno())
+
+        groups = {}
+        for row in rows:
+            record = dict(zip(RAW_COLUMNS, row))
+            key = (record['chart_name'], record['batch_id'],
+                   None if record['batch_id'] else record['crawled_at'])
+            group = groups.setdefault(key, [record['crawled_at'], record['crawled_at'], 0])
+            group[0] = min(group[0], record['crawled_at'])
+            group[1] = max(group[1], record['crawled_at'])
+            group[2] += 1
+
+        now = datetime.now().isoformat()
+        ids = [row[0] for row in rows]
+        batch_ids = sorted({batch_id for _, batch_id, _ in groups if batch_id})
+        with conn:
+            conn.executemany("""
+                INSERT INTO raw_archive_index
+                (archive_file, member_offset, member_length, chart_name, batch_id,
+                 first_crawled_at, last_crawled_at, row_count, archived_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(path.name, offset, len(member), chart_name, batch_id, first, last, count, now)
+                  for (chart_name, batch_id, _), (first, last, count) in groups.items()])
+            conn.executemany("DELETE FROM raw_chart_data WHERE id = ?", [(row_id,) for row_id in ids])
+            conn.executemany("UPDATE crawl_batches SET status = 'archived' WHERE id = ?",
+                             [(batch_id,) for batch_id in batch_ids])
+
+        logger.info(f"  📦 {path.name}: {len(rows)}행 → {len(member) / 1024:.1f}KB")
+        return len(member)
+
+    # ============================================
+    # 복원 (재처리용)
+    # ============================================
+    def replay(self, date_from, date_to, chart_name=None):
+        """[date_from, date_to] 범위 아카이브 행 → 원래 raw 행 dict 목록 (id 기준 중복 제거, 정렬)"""
+        end = (datetime.fromisoformat(date_to) + timedelta(days=1)).isoformat() \
+            if len(date_to) == 10 else date_to
+
+        conn = self._connect()
+        try:
+            members = conn.execute("""
+                SELECT DISTINCT archive_file, member_offset, member_length
+                FROM raw_archive_index
+                WHERE last_crawled_at >= ? AND first_crawled_at < ?
+                AND (? IS NULL OR chart_name = ?)
+                ORDER BY archive_file, member_offset
+            """, (date_from, end, chart_name, chart_name)).fetchall()
+        finally:
+            conn.close()
+
+        records = {}
+        for archive_file, offset, length in members:
+            with open(self.archive_dir / archive_file, 'rb') as f:
+                f.seek(offset)
+                data = decompress(f.read(length), archive_file)
+
+            for line in io.StringIO(data.decode('utf-8')):
+                record = json.loads(line)
+                if not (date_from <= record['crawled_at'] < end):
+                    continue
+                if chart_name and record['chart_name'] != chart_name:
+                    continue
+                records[record['id']] = record
+
+        return sorted(records.values(), key=lambda r: (r['chart_name'], r['crawled_at'], r['rank'] or 0))
+
+    def restore(self, records):
+        """replay 결과를 raw_chart_data로 되돌림 (원래 id 유지, 배치는 다시 'complete')"""
+        batch_ids = sorted({r['batch_id'] for r in records if r.get('batch_id')})
+        with self._connect() as conn:
+            conn.executemany(f"""
+                INSERT OR IGNORE INTO raw_chart_data ({', '.join(RAW_COLUMNS)})
+                VALUES ({', '.join('?' * len(RAW_COLUMNS))})
+            """, [tuple(r.get(column) for column in RAW_COLUMNS) for r in records])
+            conn.executemany("UPDATE crawl_batches SET status = 'complete' WHERE id = ? AND status = 'archived'",
+                             [(batch_id,) for batch_id in batch_ids])
+        return len(records)
+
+    # ============================================
+    # VACUUM / 통계
+    # ============================================
+    def enable_incremental_vacuum(self):
+        """auto_vacuum=INCREMENTAL 전환 (전체 VACUUM 1회 - DB 크기만큼 시간/디스크 필요)"""
+        conn = self._connect()
+        try:
+            mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            if mode == 2:
+                return False
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            return True
+        finally:
+            conn.close()
+
+    @staticmethod
+    def incremental_vacuum(conn, pages=VACUUM_PAGES):
+        """빈 페이지 최대 pages개 반환 (auto_vacuum=INCREMENTAL일 때만) → 반환한 페이지 수"""
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+        before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+        return before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def get_stats(self):
+        conn = self._connect()
+        try:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            raw_rows, oldest = conn.execute("SELECT COUNT(*), MIN(crawled_at) FROM raw_chart_data").fetchone()
+            archived_rows, archive_members = conn.execute("""
+                SELECT COALESCE(SUM(row_count), 0), COUNT(DISTINCT archive_file || ':' || member_offset)
+                FROM raw_archive_index
+            """).fetchone()
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        finally:
+            conn.close()
+
+        archive_bytes = sum(path.stat().st_size for path in self.archive_dir.glob('raw_chart_data-*')) \
+            if self.archive_dir.exists() else 0
+        return {
+            'db_mb': round(page_size * page_count / 1024 / 1024, 2),
+            'free_mb': round(page_size * freelist / 1024 / 1024, 2),
+            'auto_vacuum': {0: 'none', 1: 'full', 2: 'incremental'}.get(auto_vacuum, auto_vacuum),
+            'raw_rows': raw_rows,
+            'oldest_raw': oldest,
+            'archived_rows': archived_rows,
+            'archive_members': archive_members,
+            'archive_mb': round(archive_bytes / 1024 / 1024, 2),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='raw_chart_data 보존 기간 / 아카이브')
+    parser.add_argument('--db', default=str(RAW_DB))
+    parser.add_argument('--archive-dir', default=str(ARCHIVE_DIR))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    archive_parser = subparsers.add_parser('archive', help='보존 기간 지난 행 아카이브')
+    archive_parser.add_argument('--days', type=int, default=RETENTION_DAYS)
+    archive_parser.add_argument('--dry-run', action='store_true')
+
+    replay_parser = subparsers.add_parser('replay', help='기간 복원 (재처리용)')
+    replay_parser.add_argument('--from', dest='date_from', required=True, help='YYYY-MM-DD')
+    replay_parser.add_argument('--to', dest='date_to', required=True, help='YYYY-MM-DD (포함)')
+    replay_parser.add_argument('--chart', default=None)
+    replay_parser.add_argument('--jsonl', default=None, help='복원한 행을 JSON Lines로 저장')
+    replay_parser.add_argument('--restore', action='store_true', help='raw_chart_data로 되돌림')
+
+    subparsers.add_parser('stats', help='DB / 아카이브 크기')
+    subparsers.add_parser('enable-vacuum', help='auto_vacuum=INCREMENTAL 전환 (전체 VACUUM 1회)')
+    vacuum_parser = subparsers.add_parser('vacuum', help='incremental_vacuum 실행')
+    vacuum_parser.add_argument('--pages', type=int, default=VACUUM_PAGES)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    archive = RawArchive(args.db, args.archive_dir)
+
+    if args.command == 'archive':
+        stats = archive.archive(args.days, dry_run=args.dry_run)
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+
+    elif args.command == 'replay':
+        records = archive.replay(args.date_from, args.date_to, args.chart)
+        if args.jsonl:
+            with open(args.jsonl, 'w', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        if args.restore:
+            archive.restore(records)
+
+        per_chart = {}
+        for record in records:
+            per_chart[record['chart_name']] = per_chart.get(record['chart_name'], 0) + 1
+        print(f"♻️ 복원: {len(records)}행 {per_chart}"
+              + (f" → {args.jsonl}" if args.jsonl else '')
+              + (' → raw_chart_data' if args.restore else ''))
+
+    elif args.command == 'stats':
+        for key, value in archive.get_stats().items():
+            print(f"  {key}: {value}")
+
+    elif args.command == 'enable-vacuum':
+        changed = archive.enable_incremental_vacuum()
+        print("✅ auto_vacuum=INCREMENTAL 전환" if changed else "⏭️ 이미 INCREMENTAL")
+
+    elif args.command == 'vacuum':
+        conn = archive._connect()
+        try:
+            freed = archive.incremental_vacuum(conn, args.pages)
+        finally:
+            conn.close()
+        print(f"🧹 {freed}페이지 반환")
+
+
+if __name__ == '__main__':
+    main()
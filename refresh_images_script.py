@@ -2,129 +2,269 @@
 """
 기존 저화질 이미지를 고화질로 재수집하는 스크립트
 
+- 토큰 버킷으로 Spotify API 호출 속도 제한 (쿼터 안에서 최대한 채워서 사용)
+- 워커 풀로 동시 처리 (버킷이 비지 않게 유지)
+- 체크포인트 파일로 중단된 실행 이어서 처리
+- 429 응답 시 Retry-After 동안 전체 워커 일시 정지
+- Spotify ID가 저장된 곡은 다건 조회(/v1/tracks 50개, /v1/albums 20개)로 처리, 나머지만 곡별 검색
+
 사용법:
-    python3 refresh_images_script.py
+    python3 refresh_images_script.py --limit 10            # 테스트 (상위 10개)
+    python3 refresh_images_script.py --limit 100           # 일부 재수집
+    python3 refresh_images_script.py                       # 전체 재수집 (중단 시 같은 명령으로 재개)
+    python3 refresh_images_script.py --restart             # 체크포인트 무시하고 처음부터
+    python3 refresh_images_script.py --enqueue             # 백엔드 서버: 찾은 이미지 다운로드 큐에 예약
+    python3 refresh_images_script.py --ids-db rank_history.db   # 저장된 Spotify ID로 일괄 조회
+    python3 refresh_images_script.py --api-base http://127.0.0.1:8765   # 목 서버 (spotify_ids.py mock)
 
 주의사항:
-    - Spotify API 호출 제한 있음 (시간당 약 1000회)
-    - 전체 이미지 재수집 시 1-2시간 소요 가능
-    - 백그라운드 실행 권장: nohup python3 refresh_images_script.py &
+    - Spotify API 호출 제한 있음 (--rate / --burst 로 조절, 기본 초당 3회)
+    - 백그라운드 실행 권장: nohup python3 refresh_images_script.py > refresh.log 2>&1 &
 """
 
-import requests
-import time
+import argparse
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+import requests
+
+SPOTIFY_API_BASE = os.getenv('SPOTIFY_API_BASE', 'https://api.spotify.com')
+SPOTIFY_ACCOUNTS_BASE = os.getenv('SPOTIFY_ACCOUNTS_BASE', 'https://accounts.spotify.com')
+
+DEFAULT_RATE = float(os.getenv('SPOTIFY_RATE_PER_SEC', '3'))
+DEFAULT_BURST = int(os.getenv('SPOTIFY_RATE_BURST', '10'))
+DEFAULT_WORKERS = 4
+CHECKPOINT_FILE = 'image_refresh_checkpoint.json'
+RESULT_FILE = 'image_refresh_result.json'
+CHECKPOINT_EVERY = 20  # 완료 N건마다 체크포인트 저장
+
+# 다시 시도하지 않는 상태 (error는 재개 시 다시 처리)
+DONE_STATUSES = ('found', 'not_found')
+
+
+class TokenBucket:
+    """토큰 버킷 속도 제한 (스레드 안전)"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """토큰 1개를 얻을 때까지 대기"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """429 Retry-After 동안 모든 워커 정지 + 버킷 비우기"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+            self.updated = self.paused_until
+
+
+class Checkpoint:
+    """트랙별 처리 결과 저장 (원자적 파일 교체)"""
+
+    def __init__(self, path, restart=False):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._dirty = 0
+
+        if not restart and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('entries', {})
+
+    @staticmethod
+    def key(artist, track):
+        return f"{artist}:{track}"
+
+    def is_done(self, artist, track):
+        entry = self.entries.get(self.key(artist, track))
+        return entry is not None and entry['status'] in DONE_STATUSES
+
+    def record(self, artist, track, status, image_url=None, error=None):
+        with self._lock:
+            self.entries[self.key(artist, track)] = {
+                'status': status,
+                'image_url': image_url,
+                'error': error,
+                'updated_at': datetime.now().isoformat(),
+            }
+            self._dirty += 1
+            if self._dirty >= CHECKPOINT_EVERY:
+                self._save_locked()
+
+    def save(self):
+        with self._lock:
+            self._save_locked()
+
+    def _save_locked(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'updated_at': datetime.now().isoformat(), 'entries': self.entries},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self._dirty = 0
+
 
 class ImageRefresher:
-    def __init__(self, api_url="https://api.kpopranker.chargeapp.net"):
+    def __init__(self, api_url="https://api.kpopranker.chargeapp.net",
+                 rate=DEFAULT_RATE, burst=DEFAULT_BURST, workers=DEFAULT_WORKERS,
+                 checkpoint_path=CHECKPOINT_FILE, restart=False, enqueue=False,
+                 spotify_api_base=SPOTIFY_API_BASE, spotify_accounts_base=SPOTIFY_ACCOUNTS_BASE,
+                 ids_db=None):
         self.api_url = api_url
+        self.spotify_api_base = spotify_api_base.rstrip('/')
+        self.spotify_accounts_base = spotify_accounts_base.rstrip('/')
+        self.id_store = None
+        if ids_db:
+            from spotify_ids import SpotifyIdStore
+            self.id_store = SpotifyIdStore(ids_db)
+        self.workers = workers
+        self.enqueue = enqueue
+        self.bucket = TokenBucket(rate, burst)
+        self.checkpoint = Checkpoint(checkpoint_path, restart=restart)
+
+        self.session = requests.Session()
         self.spotify_token = None
+        self._token_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
         self.stats = {
             'total': 0,
             'success': 0,
+            'by_ids': 0,
+            'not_found': 0,
             'failed': 0,
-            'skipped': 0
+            'skipped': 0,
+            'api_calls': 0,
+            'rate_limited': 0,
         }
 
-    def get_spotify_token(self):
-        """Spotify Access Token 가져오기"""
-        # 환경 변수에서 credentials 가져오기
-        client_id = os.getenv('SPOTIFY_CLIENT_ID')
-        client_secret = os.getenv('SPOTIFY_CLIENT_SECRET')
-
-        if not client_id or not client_secret:
-            print("❌ SPOTIFY_CLIENT_ID 또는 SPOTIFY_CLIENT_SECRET이 설정되지 않았습니다")
-            return None
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
 
-        try:
-            response = requests.post(
-                'https://accounts.spotify.com/api/token',
-                data={'grant_type': 'client_credentials'},
-                auth=(client_id, client_secret),
-                timeout=10
-            )
-
-            if response.status_code == 200:
-                self.spotify_token = response.json()['access_token']
-                print("✅ Spotify Token 발급 성공")
+    def get_spotify_token(self, stale_token=None):
+        """Spotify Access Token 가져오기 (여러 워커가 401을 받아도 한 번만 재발급)"""
+        with self._token_lock:
+            if self.spotify_token and self.spotify_token != stale_token:
                 return self.spotify_token
-            else:
-                print(f"❌ Token 발급 실패: {response.status_code}")
-                return None
 
-        except Exception as e:
-            print(f"❌ Token 발급 에러: {str(e)}")
-            return None
+            client_id = os.getenv('SPOTIFY_CLIENT_ID')
+            client_secret = os.getenv('SPOTIFY_CLIENT_SECRET')
 
-    def search_spotify_track(self, artist, track):
-        """Spotify에서 트랙 검색하여 고화질 이미지 URL 가져오기"""
+            if not client_id or not client_secret:
+                print("❌ SPOTIFY_CLIENT_ID 또는 SPOTIFY_CLIENT_SECRET이 설정되지 않았습니다")
+                return None
 
-        if not self.spotify_token:
-            self.get_spotify_token()
+            try:
+                response = self.session.post(
+                    f"{self.spotify_accounts_base}/api/token",
+                    data={'grant_type': 'client_credentials'},
+                    auth=(client_id, client_secret),
+                    timeout=10
+                )
 
-        if not self.spotify_token:
-            return None
+                if response.status_code == 200:
+                    self.spotify_token = response.json()['access_token']
+                    print("✅ Spotify Token 발급 성공")
+                    return self.spotify_token
+                else:
+                    print(f"❌ Token 발급 실패: {response.status_code}")
+                    return None
 
-        try:
-            # Spotify Search API 호출
-            headers = {'Authorization': f'Bearer {self.spotify_token}'}
-            params = {
-                'q': f'artist:{artist} track:{track}',
-                'type': 'track',
-                'limit': 1
-            }
+            except Exception as e:
+                print(f"❌ Token 발급 에러: {str(e)}")
+                return None
 
-            response = requests.get(
-                'https://api.spotify.com/v1/search',
-                headers=headers,
+    def spotify_get(self, path, params):
+        """속도 제한 + 토큰 갱신 + 429 대기를 적용한 Spotify GET → (status, json)"""
+        for _ in range(5):
+            token = self.spotify_token or self.get_spotify_token()
+            if not token:
+                return None, None
+
+            self.bucket.acquire()
+            self._count('api_calls')
+            response = self.session.get(
+                f"{self.spotify_api_base}{path}",
+                headers={'Authorization': f'Bearer {token}'},
                 params=params,
                 timeout=10
             )
 
             if response.status_code == 401:
-                # Token 만료 - 재발급
-                self.get_spotify_token()
-                headers = {'Authorization': f'Bearer {self.spotify_token}'}
-                response = requests.get(
-                    'https://api.spotify.com/v1/search',
-                    headers=headers,
-                    params=params,
-                    timeout=10
-                )
+                # Token 만료 - 재발급 후 재시도
+                self.get_spotify_token(stale_token=token)
+                continue
+
+            if response.status_code == 429:
+                retry_after = int(response.headers.get('Retry-After', '5'))
+                self._count('rate_limited')
+                print(f"⏸️  Spotify 속도 제한 - {retry_after}초 대기")
+                self.bucket.pause(retry_after)
+                continue
 
             if response.status_code != 200:
-                print(f"⚠️  Spotify API 오류 ({response.status_code}): {artist} - {track}")
-                return None
+                return response.status_code, None
 
-            data = response.json()
-            tracks = data.get('tracks', {}).get('items', [])
+            return 200, response.json()
 
-            if not tracks:
-                print(f"⚠️  검색 결과 없음: {artist} - {track}")
-                return None
+        return None, None
 
-            # 첫 번째 이미지 = 640x640 (고화질)
-            images = tracks[0].get('album', {}).get('images', [])
+    def search_spotify_track(self, artist, track):
+        """Spotify에서 트랙 검색하여 고화질 이미지 URL 가져오기 → (status, image_url)"""
+        status, data = self.spotify_get('/v1/search', {
+            'q': f'artist:{artist} track:{track}',
+            'type': 'track',
+            'limit': 1
+        })
 
-            if not images:
-                print(f"⚠️  이미지 없음: {artist} - {track}")
-                return None
+        if status != 200:
+            return 'error', f"Spotify API 오류 ({status})"
 
-            return images[0]['url']  # 최대 크기 이미지
+        tracks = data.get('tracks', {}).get('items', [])
+        if not tracks:
+            return 'not_found', None
 
-        except Exception as e:
-            print(f"❌ 검색 에러: {artist} - {track}: {str(e)}")
-            return None
+        # 다음 재수집부터는 다건 조회로 처리
+        if self.id_store is not None:
+            self.id_store.save_track(artist, track, tracks[0])
+
+        # 첫 번째 이미지 = 640x640 (고화질)
+        images = tracks[0].get('album', {}).get('images', [])
+        if not images:
+            return 'not_found', None
 
-    def get_top_tracks(self):
+        return 'found', images[0]['url']  # 최대 크기 이미지
+
+    def get_top_tracks(self, limit=100):
         """API에서 상위 트랙 목록 가져오기"""
 
         try:
-            response = requests.get(
-                f"{self.api_url}/api/trending?limit=100",
+            response = self.session.get(
+                f"{self.api_url}/api/trending?limit={limit}",
                 timeout=15
             )
 
@@ -142,46 +282,71 @@ class ImageRefresher:
             return []
 
     def refresh_track_image(self, artist, track):
-        """단일 트랙 이미지 재수집"""
-
-        print(f"🔄 처리 중: {artist} - {track}")
-
-        # 1. Spotify에서 고화질 이미지 URL 가져오기
-        image_url = self.search_spotify_track(artist, track)
-
-        if not image_url:
-            self.stats['failed'] += 1
-            return False
-
-        # 2. 이미지 다운로드 (선택사항 - DB만 업데이트해도 됨)
+        """단일 트랙 이미지 재수집 → 상태"""
         try:
-            response = requests.get(image_url, timeout=10)
-
-            if response.status_code == 200:
-                # 파일로 저장 (백엔드 서버에서만 가능)
-                # 여기서는 URL만 출력
-                print(f"✅ 고화질 이미지 URL: {image_url}")
-                print(f"   크기: {len(response.content) / 1024:.1f}KB")
-
-                self.stats['success'] += 1
-                return True
-            else:
-                print(f"⚠️  이미지 다운로드 실패: {response.status_code}")
-                self.stats['failed'] += 1
-                return False
-
+            status, value = self.search_spotify_track(artist, track)
         except Exception as e:
-            print(f"❌ 다운로드 에러: {str(e)}")
-            self.stats['failed'] += 1
-            return False
-
-    def refresh_all(self, limit=None, delay=0.5):
+            status, value = 'error', str(e)
+
+        if status == 'found':
+            self.record_found(artist, track, value)
+        elif status == 'not_found':
+            self.checkpoint.record(artist, track, 'not_found')
+            self._count('not_found')
+        else:
+            self.checkpoint.record(artist, track, 'error', error=value)
+            self._count('failed')
+            print(f"⚠️  {artist} - {track}: {value}")
+
+        return status
+
+    def record_found(self, artist, track, image_url):
+        self.checkpoint.record(artist, track, 'found', image_url=image_url)
+        self._count('success')
+        # 이미지 자체는 받지 않음 - 백엔드 서버에서는 다운로드 워커 풀에 넘김
+        if self.enqueue:
+            from image_downloader import get_downloader
+            # 이미 받은 이미지도 조건부 요청으로 변경 여부만 확인
+            get_downloader().enqueue(image_url, artist, track, refresh=True)
+
+    def refresh_by_ids(self, pending):
+        """저장된 Spotify ID가 있는 곡은 다건 조회로 처리 → 남은 (artist, track) 목록"""
+        if self.id_store is None or not pending:
+            return pending
+
+        from spotify_ids import pick_image, refresh_by_ids
+
+        entries = self.id_store.lookup_many(pending)
+        if not entries:
+            return pending
+
+        def get(path, params):
+            status, data = self.spotify_get(path, params)
+            return data if status == 200 else None
+
+        results, calls = refresh_by_ids(get, entries)
+        print(f"🆔 저장된 ID로 {len(results)}/{len(entries)}개 갱신 (API {calls}회)")
+
+        self.id_store.save_many([
+            (artist, track, track_id, album_id, images)
+            for (artist, track), (track_id, album_id, images) in results.items()
+        ])
+        for (artist, track), (_, _, images) in results.items():
+            image_url = pick_image(images)
+            if image_url:
+                self.record_found(artist, track, image_url)
+                self._count('by_ids')
+
+        # 다건 조회로 못 찾은 곡(삭제된 ID 등)은 검색으로
+        return [pair for pair in pending if pair not in results]
+
+    def refresh_all(self, limit=None, source_limit=100):
         """
         모든 트랙 이미지 재수집
 
         Parameters:
             limit: 처리할 최대 트랙 수 (None = 전체)
-            delay: 각 요청 사이 딜레이 (초, API 제한 방지)
+            source_limit: /api/trending에서 가져올 트랙 수
         """
 
         print(f"\n{'='*60}")
@@ -191,115 +356,142 @@ class ImageRefresher:
         # 1. Spotify Token 발급
         if not self.get_spotify_token():
             print("❌ Spotify Token이 없어서 중단합니다")
-            return
+            return None
 
         # 2. 트랙 목록 가져오기
-        tracks = self.get_top_tracks()
+        tracks = self.get_top_tracks(source_limit)
 
         if not tracks:
             print("❌ 트랙 목록이 없어서 중단합니다")
-            return
+            return None
 
-        # 3. 제한 적용
+        # 3. 제한 적용 + 체크포인트에서 완료된 트랙 제외
         if limit:
             tracks = tracks[:limit]
 
+        pending = []
+        for item in tracks:
+            artist = item.get('artist', 'Unknown')
+            track_title = item.get('track', 'Unknown')
+            if self.checkpoint.is_done(artist, track_title):
+                self.stats['skipped'] += 1
+            else:
+                pending.append((artist, track_title))
+
         self.stats['total'] = len(tracks)
 
-        print(f"\n📊 처리할 트랙 수: {len(tracks)}")
-        print(f"⏱️  예상 소요 시간: {len(tracks) * delay / 60:.1f}분\n")
+        print(f"\n📊 처리할 트랙 수: {len(pending)} (체크포인트 완료 {self.stats['skipped']}개 건너뜀)")
+        print(f"⏱️  예상 소요 시간: {len(pending) / self.bucket.rate / 60:.1f}분 "
+              f"(초당 {self.bucket.rate:g}회, 워커 {self.workers}개)\n")
 
-        # 4. 각 트랙 처리
         start_time = time.time()
 
-        for idx, track in enumerate(tracks, 1):
-            artist = track.get('artist', 'Unknown')
-            track_title = track.get('track', 'Unknown')
-
-            print(f"\n[{idx}/{len(tracks)}] ", end='')
-            self.refresh_track_image(artist, track_title)
-
-            # API 제한 방지 딜레이
-            if idx < len(tracks):
-                time.sleep(delay)
-
-            # 진행률 표시
-            if idx % 10 == 0:
-                elapsed = time.time() - start_time
-                progress = idx / len(tracks) * 100
-                print(f"\n📊 진행률: {progress:.1f}% ({idx}/{len(tracks)}) - 경과시간: {elapsed/60:.1f}분")
-
-        # 5. 결과 요약
+        # 4. 저장된 ID 일괄 조회 → 나머지만 워커 풀로 검색
+        try:
+            pending = self.refresh_by_ids(pending)
+
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(self.refresh_track_image, artist, track_title)
+                           for artist, track_title in pending]
+
+                for idx, _ in enumerate(as_completed(futures), 1):
+                    # 진행률 표시
+                    if idx % 10 == 0 or idx == len(pending):
+                        elapsed = time.time() - start_time
+                        progress = idx / len(pending) * 100
+                        print(f"📊 진행률: {progress:.1f}% ({idx}/{len(pending)}) - "
+                              f"경과시간: {elapsed/60:.1f}분, API {self.stats['api_calls']}회")
+        finally:
+            # 중단되어도 처리한 만큼은 남김
+            self.checkpoint.save()
+
+        # 5. 다운로드 완료 대기 (조건부 요청으로 건너뛴 바이트 집계)
+        downloads = None
+        if self.enqueue:
+            from image_downloader import get_downloader
+            downloader = get_downloader()
+            downloader.wait()
+            downloads = downloader.get_stats()
+
+        # 6. 결과 요약
         elapsed_time = time.time() - start_time
 
         print(f"\n{'='*60}")
         print("✅ 재수집 완료!")
         print(f"{'='*60}")
-        print(f"총 처리: {self.stats['total']}")
-        print(f"✅ 성공: {self.stats['success']}")
+        print(f"총 대상: {self.stats['total']} (건너뜀 {self.stats['skipped']})")
+        print(f"✅ 성공: {self.stats['success']} (ID 일괄 조회 {self.stats['by_ids']})")
+        print(f"🔍 검색 결과 없음: {self.stats['not_found']}")
         print(f"❌ 실패: {self.stats['failed']}")
+        print(f"📡 API 호출: {self.stats['api_calls']} (속도 제한 {self.stats['rate_limited']}회)")
+        if downloads:
+            print(f"📥 다운로드: {downloads['completed']}개 "
+                  f"(304 {downloads['not_modified']}개, 내용 동일 {downloads['unchanged']}개)")
+            print(f"💾 절약: 전송 {downloads['bytes_saved'] / 1024 / 1024:.1f}MB, "
+                  f"쓰기 {downloads['write_bytes_saved'] / 1024 / 1024:.1f}MB")
         print(f"⏱️  소요 시간: {elapsed_time/60:.1f}분")
         print(f"{'='*60}\n")
 
-        # 6. 결과 JSON 저장
+        # 7. 결과 JSON 저장
         result = {
             'timestamp': datetime.now().isoformat(),
             'stats': self.stats,
-            'duration_minutes': elapsed_time / 60
+            'downloads': {key: downloads[key] for key in (
+                'completed', 'failed', 'not_modified', 'unchanged', 'bytes', 'bytes_saved', 'write_bytes_saved'
+            )} if downloads else None,
+            'duration_minutes': elapsed_time / 60,
+            'images': {key: entry['image_url'] for key, entry in self.checkpoint.entries.items()
+                       if entry['status'] == 'found'},
         }
 
-        with open('image_refresh_result.json', 'w', encoding='utf-8') as f:
+        with open(RESULT_FILE, 'w', encoding='utf-8') as f:
             json.dump(result, f, ensure_ascii=False, indent=2)
 
-        print("📝 결과 저장: image_refresh_result.json")
+        print(f"📝 결과 저장: {RESULT_FILE}")
+        return result
 
 
 def main():
     """메인 함수"""
-
-    print("""
-╔════════════════════════════════════════════════════════════╗
-║                                                            ║
-║         🎨 KPOP Ranker 이미지 품질 개선 스크립트           ║
-║                                                            ║
-║   모든 트랙의 이미지를 고화질(640x640)로 재수집합니다      ║
-║                                                            ║
-╚════════════════════════════════════════════════════════════╝
-    """)
+    parser = argparse.ArgumentParser(description='KPOP Ranker 이미지 고화질 재수집')
+    parser.add_argument('--limit', type=int, default=None, help='처리할 최대 트랙 수 (기본: 전체)')
+    parser.add_argument('--source-limit', type=int, default=100, help='/api/trending에서 가져올 트랙 수')
+    parser.add_argument('--api-url', default='https://api.kpopranker.chargeapp.net')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help='Spotify 초당 호출 수')
+    parser.add_argument('--burst', type=int, default=DEFAULT_BURST, help='순간 최대 호출 수')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE, help='체크포인트 파일 경로')
+    parser.add_argument('--restart', action='store_true', help='체크포인트 무시하고 처음부터')
+    parser.add_argument('--enqueue', action='store_true',
+                        help='찾은 이미지를 다운로드 워커 풀에 예약 (백엔드 서버에서 실행 시)')
+    parser.add_argument('--ids-db', default=None,
+                        help='Spotify ID 저장 DB (rank_history.db) - 저장된 ID는 다건 조회로 처리')
+    parser.add_argument('--api-base', default=SPOTIFY_API_BASE, help='Spotify API 주소 (목 서버 테스트용)')
+    parser.add_argument('--accounts-base', default=SPOTIFY_ACCOUNTS_BASE, help='Spotify 토큰 발급 주소')
+    args = parser.parse_args()
+
+    print("🎨 KPOP Ranker 이미지 품질 개선 - 모든 트랙의 이미지를 고화질(640x640)로 재수집합니다")
 
     # 환경 변수 확인
     if not os.getenv('SPOTIFY_CLIENT_ID'):
         print("⚠️  환경 변수 설정이 필요합니다:")
         print("   export SPOTIFY_CLIENT_ID='your_client_id'")
         print("   export SPOTIFY_CLIENT_SECRET='your_client_secret'")
-        return
-
-    # ImageRefresher 인스턴스 생성
-    refresher = ImageRefresher()
-
-    # 옵션 선택
-    print("\n선택하세요:")
-    print("1. 테스트 (상위 10개만)")
-    print("2. 일부 재수집 (상위 100개)")
-    print("3. 전체 재수집 (모든 트랙)")
-
-    choice = input("\n선택 (1-3): ").strip()
-
-    if choice == '1':
-        print("\n🧪 테스트 모드: 상위 10개 트랙")
-        refresher.refresh_all(limit=10, delay=0.5)
-    elif choice == '2':
-        print("\n📊 일부 모드: 상위 100개 트랙")
-        confirm = input("계속하시겠습니까? (y/N): ").strip().lower()
-        if confirm == 'y':
-            refresher.refresh_all(limit=100, delay=0.5)
-    elif choice == '3':
-        print("\n🔥 전체 모드: 모든 트랙")
-        confirm = input("⚠️  시간이 오래 걸립니다. 계속하시겠습니까? (y/N): ").strip().lower()
-        if confirm == 'y':
-            refresher.refresh_all(limit=None, delay=0.5)
-    else:
-        print("❌ 잘못된 선택입니다")
+        raise SystemExit(1)
+
+    refresher = ImageRefresher(
+        api_url=args.api_url,
+        rate=args.rate,
+        burst=args.burst,
+        workers=args.workers,
+        checkpoint_path=args.checkpoint,
+        restart=args.restart,
+        enqueue=args.enqueue,
+        spotify_api_base=args.api_base,
+        spotify_accounts_base=args.accounts_base,
+        ids_db=args.ids_db
+    )
+    refresher.refresh_all(limit=args.limit, source_limit=args.source_limit)
 
 
 if __name__ == '__main__':
@@ -314,12 +506,13 @@ if __name__ == '__main__':
    export SPOTIFY_CLIENT_SECRET='your_secret'
 
 2. 실행:
-   python3 refresh_images_script.py
+   python3 refresh_images_script.py --limit 10
 
-3. 백그라운드 실행:
+3. 백그라운드 실행 (중단되면 같은 명령으로 재개):
    nohup python3 refresh_images_script.py > refresh.log 2>&1 &
    tail -f refresh.log
 
 4. 진행 상황 확인:
+   cat image_refresh_checkpoint.json
    cat image_refresh_result.json
 """
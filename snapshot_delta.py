@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Snapshot Delta - chart_snapshots 델타 저장 모드 (SNAPSHOT_STORAGE=delta)
+- 차트별 연속 스냅샷은 대부분 같은 순위 → 매번 100행 전체 대신 바뀐 위치만 저장
+- snapshot_frames: 스냅샷 1개 = 프레임 1개 (N개마다 전체를 담은 키프레임, 그 사이는 델타)
+- snapshot_entries: (frame_id, position) → 행 내용, 델타 프레임은 직전 상태와 달라진 위치만
+- 키프레임 체인: 키프레임 + 같은 keyframe_id 델타들 (id 순) → 복원은 체인 하나(최대 N프레임)만 읽음
+- 최신 스냅샷보다 오래된 시각이 들어오면(백필) 새 키프레임으로 저장 → 기존 체인은 건드리지 않음
+
+읽기 API:
+    get_snapshot(conn, chart_name, snapshot_time=None)  → [(rank_position, artist, track, album, image_url, views)]
+    list_snapshots(conn, chart_name)                     → [snapshot_time]
+    track_history(conn, artist, track, chart_name=None)  → [(chart_name, snapshot_time, rank_position)]
+
+사용법:
+    python3 snapshot_delta.py migrate [--every 24]     # 기존 chart_snapshots → 델타 테이블
+    python3 snapshot_delta.py stats
+    python3 snapshot_delta.py bench --snapshots 1000   # 전체 저장 vs 델타 (DB 크기 / 조회 속도)
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+DB_PATH = BASE_DIR / 'rank_history.db'
+
+SNAPSHOT_STORAGE = os.getenv('SNAPSHOT_STORAGE', 'full')  # full | delta
+KEYFRAME_EVERY = int(os.getenv('SNAPSHOT_KEYFRAME_EVERY', '24'))  # 6시간 크롤링 기준 6일
+
+
+def ensure_delta_tables(conn):
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS snapshot_frames (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chart_name TEXT NOT NULL,
+            snapshot_time TIMESTAMP NOT NULL,
+            keyframe_id INTEGER,
+            seq INTEGER NOT NULL,
+            track_count INTEGER NOT NULL,
+            UNIQUE(chart_name, snapshot_time)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_frames_keyframe
+        ON snapshot_frames(keyframe_id, id);
+
+        CREATE TABLE IF NOT EXISTS snapshot_entries (
+            frame_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            rank_position INTEGER NOT NULL,
+            artist TEXT NOT NULL,
+            track TEXT NOT NULL,
+            album TEXT,
+            image_url TEXT,
+            views_or_streams TEXT,
+            PRIMARY KEY (frame_id, position)
+        ) WITHOUT ROWID;
+
+        CREATE INDEX IF NOT EXISTS idx_entries_track
+        ON snapshot_entries(artist, track);
+    """)
+
+
+def _chain_entries(conn, keyframe_id, until_id=None):
+    """체인의 프레임 / 엔트리 → ([(frame_id, snapshot_time, track_count)], {frame_id: [(position, entry)]})"""
+    frames = conn.execute("""
+        SELECT id, snapshot_time, track_count
+        FROM snapshot_frames
+        WHERE keyframe_id = ? AND (? IS NULL OR id <= ?)
+        ORDER BY id
+    """, (keyframe_id, until_id, until_id)).fetchall()
+
+    entries = {}
+    for frame_id, position, *entry in conn.execute("""
+        SELECT e.frame_id, e.position, e.rank_position, e.artist, e.track,
+               e.album, e.image_url, e.views_or_streams
+        FROM snapshot_entries e
+        JOIN snapshot_frames f ON f.id = e.frame_id
+        WHERE f.keyframe_id = ? AND (? IS NULL OR f.id <= ?)
+    """, (keyframe_id, until_id, until_id)):
+        entries.setdefault(frame_id, []).append((position, tuple(entry)))
+    return frames, entries
+
+
+def _frame_state(conn, frame_id):
+    """프레임 id → {position: (rank_position, artist, track, album, image_url, views)}"""
+    frame = conn.execute(
+        "SELECT keyframe_id, track_count FROM snapshot_frames WHERE id = ?", (frame_id,)
+    ).fetchone()
+    if not frame:
+        return None
+
+    keyframe_id, track_count = frame
+    frames, entries = _chain_entries(conn, keyframe_id, frame_id)
+    state = {}
+    for chain_frame_id, _, _ in frames:
+        state.update(entries.get(chain_frame_id, ()))
+    return {position: entry for position, entry in state.items() if position <= track_count}
+
+
+def write_snapshot(conn, chart_name, snapshot_time, rows, keyframe_every=KEYFRAME_EVERY):
+    """snapshot_rows() 결과를 프레임으로 저장 (커밋은 호출하는 쪽 트랜잭션에서)
+
+    같은 (chart_name, snapshot_time)이 이미 있으면 건너뜀 → (frame_id, 저장한 엔트리 수) / None
+    """
+    if conn.execute(
+        "SELECT 1 FROM snapshot_frames WHERE chart_name = ? AND snapshot_time = ?",
+        (chart_name, snapshot_time)
+    ).fetchone():
+        return None
+
+    entries = {position: tuple(row[1:7]) for position, row in enumerate(rows, 1)}
+
+    last = conn.execute("""
+        SELECT id, keyframe_id, seq, snapshot_time
+        FROM snapshot_frames
+        WHERE chart_name = ?
+        ORDER BY snapshot_time DESC
+        LIMIT 1
+    """, (chart_name,)).fetchone()
+
+    is_keyframe = not last or last[2] + 1 >= keyframe_every or snapshot_time < last[3]
+    if is_keyframe:
+        changed = entries
+        keyframe_id, seq = None, 0
+    else:
+        previous = _frame_state(conn, last[0])
+        changed = {position: entry for position, entry in entries.items()
+                   if previous.get(position) != entry}
+        keyframe_id, seq = last[1], last[2] + 1
+
+    frame_id = conn.execute("""
+        INSERT INTO snapshot_frames (chart_name, snapshot_time, keyframe_id, seq, track_count)
+        VALUES (?, ?, ?, ?, ?)
+    """, (chart_name, snapshot_time, keyframe_id, seq, len(entries))).lastrowid
+    if is_keyframe:
+        conn.execute("UPDATE snapshot_frames SET keyframe_id = id WHERE id = ?", (frame_id,))
+
+    conn.executemany("""
+        INSERT INTO snapshot_entries
+        (frame_id, position, rank_position, artist, track, album, image_url, views_or_streams)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, [(frame_id, position, *entry) for position, entry in sorted(changed.items())])
+    return frame_id, len(changed)
+
+
+# ============================================
+# 읽기 API
+# ============================================
+def get_snapshot(conn, chart_name, snapshot_time=None):
+    """스냅샷 복원 (기본: 최신) → chart_snapshots와 같은 순서의 행 목록"""
+    if snapshot_time is None:
+        frame = conn.execute("""
+            SELECT id FROM snapshot_frames WHERE chart_name = ?
+            ORDER BY snapshot_time DESC LIMIT 1
+        """, (chart_name,)).fetchone()
+    else:
+        frame = conn.execute(
+            "SELECT id FROM snapshot_frames WHERE chart_name = ? AND snapshot_time = ?",
+            (chart_name, snapshot_time)
+        ).fetchone()
+    if not frame:
+        return []
+
+    state = _frame_state(conn, frame[0])
+    return [state[position] for position in sorted(state)]
+
+
+def list_snapshots(conn, chart_name):
+    return [row[0] for row in conn.execute(
+        "SELECT snapshot_time FROM snapshot_frames WHERE chart_name = ? ORDER BY snapshot_time",
+        (chart_name,)
+    )]
+
+
+def track_history(conn, artist, track, chart_name=None, since=None, until=None):
+    """곡 순위 이력 → [(chart_name, snapshot_time, rank_position)] (시각 순)
+
+    곡이 있는 체인은 키프레임이나 델타에 반드시 엔트리가 있으므로,
+    (artist, track) 인덱스로 (체인, 위치)를 찾고 그 위치의 엔트리만 체인 순서대로 재생한다.
+    """
+    hits = """
+        SELECT DISTINCT f.keyframe_id, e.position
+        FROM snapshot_entries e
+        JOIN snapshot_frames f ON f.id = e.frame_id
+        WHERE e.artist = ? AND e.track = ?
+        AND (? IS NULL OR f.chart_name = ?)
+    """
+    params = (artist, track, chart_name, chart_name)
+
+    frames = conn.execute(f"""
+        SELECT id, chart_name, keyframe_id, snapshot_time, track_count
+        FROM snapshot_frames
+        WHERE keyframe_id IN (SELECT keyframe_id FROM ({hits}))
+        ORDER BY id
+    """, params).fetchall()
+    if not frames:
+        return []
+
+    # 위치별 엔트리 (곡 / 다른 곡으로 덮어씀)
+    entries = {}
+    for frame_id, position, rank_position, is_track in conn.execute(f"""
+        SELECT e.frame_id, e.position, e.rank_position, e.artist = ? AND e.track = ?
+        FROM ({hits}) h
+        JOIN snapshot_frames f ON f.keyframe_id = h.keyframe_id
+        JOIN snapshot_entries e ON e.frame_id = f.id AND e.position = h.position
+    """, (artist, track) + params):
+        entries.setdefault(frame_id, []).append((position, rank_position if is_track else None))
+
+    history = []
+    chains = {}  # keyframe_id → {곡이 있는 위치: rank_position} (차트 / 백필 체인은 id가 섞임)
+    for frame_id, frame_chart, keyframe_id, snapshot_time, track_count in frames:
+        positions = chains.setdefault(keyframe_id, {})
+        for position, rank_position in entries.get(frame_id, ()):
+            if rank_position is None:
+                positions.pop(position, None)
+            else:
+                positions[position] = rank_position
+        if since and snapshot_time < since or until and snapshot_time > until:
+            continue
+        for position, rank_position in positions.items():
+            if position <= track_count:
+                history.append((frame_chart, snapshot_time, rank_position))
+
+    history.sort(key=lambda item: (item[1], item[0], item[2]))
+    return history
+
+
+# ============================================
+# 마이그레이션 / 통계
+# ============================================
+def migrate(conn, keyframe_every=KEYFRAME_EVERY):
+    """chart_snapshots 전체 → 델타 테이블 (이미 옮긴 스냅샷은 건너뜀) → (프레임 수, 엔트리 수)"""
+    ensure_delta_tables(conn)
+    frames = entries = 0
+    current = None
+    rows = []
+
+    def flush():
+        nonlocal frames, entries
+        if current and rows:
+            written = write_snapshot(conn, current[0], current[1], rows, keyframe_every)
+            if written:
+                frames += 1
+                entries += written[1]
+
+    with conn:
+        for row in conn.execute("""
+            SELECT chart_name, rank_position, artist, track, album, image_url,
+                   views_or_streams, snapshot_time
+            FROM chart_snapshots
+            ORDER BY chart_name, snapshot_time, rank_position, id
+        """).fetchall():
+            key = (row[0], row[7])
+            if key != current:
+                flush()
+                current, rows = key, []
+            rows.append(row)
+        flush()
+    return frames, entries
+
+
+def get_stats(conn):
+    frames, keyframes = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(id = keyframe_id), 0) FROM snapshot_frames"
+    ).fetchone()
+    entries = conn.execute("SELECT COUNT(*) FROM snapshot_entries").fetchone()[0]
+    full_rows = conn.execute("SELECT COALESCE(SUM(track_count), 0) FROM snapshot_frames").fetchone()[0]
+    return {
+        'frames': frames,
+        'keyframes': keyframes,
+        'entries': entries,
+        'full_rows': full_rows,
+        'entry_ratio': round(entries / full_rows, 3) if full_rows else None,
+    }
+
+
+# ============================================
+# 벤치마크 (전체 저장 vs 델타)
+# ============================================
+def synthetic_history(snapshots=1000, chart_size=100, seed=7):
+    """순위 변동이 적은 합성 차트 이력 → [(snapshot_time, rows)]
+
+    크롤링마다 곡 몇 개가 이웃과 자리를 바꾸고, 가끔 신곡 진입 / 하위권 이탈.
+    """
+    rng = random.Random(seed)
+    songs = [(f"artist{i % 40}", f"track{i}") for i in range(chart_size)]
+    next_id = chart_size
+    start = datetime(2025, 1, 1, 1, 10)
+
+    history = []
+    for n in range(snapshots):
+        for _ in range(rng.randint(0, 4)):
+            i = rng.randrange(chart_size - 1)
+            songs[i], songs[i + 1] = songs[i + 1], songs[i]
+        if rng.random() < 0.3:
+            songs.pop(rng.randrange(chart_size - 10, chart_size))
+            songs.insert(rng.randrange(chart_size - 20, chart_size), (f"artist{next_id % 40}", f"track{next_id}"))
+            next_id += 1
+
+        snapshot_time = (start + timedelta(hours=6 * n)).isoformat()
+        rows = [('melon', rank, artist, track, '', f"https://cdn.example/{track}.jpg", '', snapshot_time)
+                for rank, (artist, track) in enumerate(songs, 1)]
+        history.append((snapshot_time, rows))
+    return history
+
+
+def bench(snapshots=1000, chart_size=100, keyframe_every=KEYFRAME_EVERY, queries=200):
+    """합성 이력을 두 방식으로 저장 → DB 크기 / 스냅샷 조회 / 곡 이력 조회 시간 비교"""
+    from backend_ultimate import SNAPSHOT_INSERT_SQL
+
+    history = synthetic_history(snapshots, chart_size)
+    rng = random.Random(1)
+    times = [rng.choice(history)[0] for _ in range(queries)]
+    tracks = [rng.choice(rng.choice(history)[1])[2:4] for _ in range(queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        full = sqlite3.connect(os.path.join(tmp, 'full.db'))
+        full.execute("""
+            CREATE TABLE chart_snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chart_name TEXT NOT NULL,
+                rank_position INTEGER NOT NULL,
+                artist TEXT NOT NULL,
+                track TEXT NOT NULL,
+                album TEXT,
+                image_url TEXT,
+                views_or_streams TEXT,
+                snapshot_time TIMESTAMP NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        full.execute("CREATE INDEX idx_chart_time ON chart_snapshots(chart_name, snapshot_time)")
+        start = time.perf_counter()
+        with full:
+            for _, rows in history:
+                full.executemany(SNAPSHOT_INSERT_SQL, rows)
+        full_write = time.perf_counter() - start
+
+        delta = sqlite3.connect(os.path.join(tmp, 'delta.db'))
+        ensure_delta_tables(delta)
+        start = time.perf_counter()
+        with delta:
+            for snapshot_time, rows in history:
+                write_snapshot(delta, 'melon', snapshot_time, rows, keyframe_every)
+        delta_write = time.perf_counter() - start
+
+        def measure(fn, args):
+            start = time.perf_counter()
+            for arg in args:
+                fn(arg)
+            return (time.perf_counter() - start) / len(args) * 1000
+
+        results = {
+            'snapshots': snapshots,
+            'chart_size': chart_size,
+            'keyframe_every': keyframe_every,
+            'full_rows': snapshots * chart_size,
+            'delta_entries': get_stats(delta)['entries'],
+            'full_mb': round(os.path.getsize(os.path.join(tmp, 'full.db')) / 1024 / 1024, 2),
+            'delta_mb': round(os.path.getsize(os.path.join(tmp, 'delta.db')) / 1024 / 1024, 2),
+            'full_write_s': round(full_write, 2),
+            'delta_write_s': round(delta_write, 2),
+            'full_snapshot_ms': measure(lambda t: full.execute("""
+                SELECT rank_position, artist, track, album, image_url, views_or_streams
+                FROM chart_snapshots WHERE chart_name = 'melon' AND snapshot_time = ?
+                ORDER BY rank_position
+            """, (t,)).fetchall(), times),
+            'delta_snapshot_ms': measure(lambda t: get_snapshot(delta, 'melon', t), times),
+            'full_history_ms': measure(lambda pair: full.execute("""
+                SELECT chart_name, snapshot_time, rank_position
+                FROM chart_snapshots WHERE artist = ? AND track = ?
+                ORDER BY snapshot_time
+            """, pair).fetchall(), tracks),
+            'delta_history_ms': measure(lambda pair: track_history(delta, *pair), tracks),
+        }
+
+        # 같은 결과인지 확인
+        for t in times[:20]:
+            expected = full.execute("""
+                SELECT rank_position, artist, track, album, image_url, views_or_streams
+                FROM chart_snapshots WHERE chart_name = 'melon' AND snapshot_time = ?
+                ORDER BY rank_position
+            """, (t,)).fetchall()
+            assert get_snapshot(delta, 'melon', t) == expected, t
+        for pair in tracks[:20]:
+            expected = full.execute("""
+                SELECT chart_name, snapshot_time, rank_position
+                FROM chart_snapshots WHERE artist = ? AND track = ?
+                ORDER BY snapshot_time
+            """, pair).fetchall()
+            assert track_history(delta, *pair) == expected, pair
+
+        full.close()
+        delta.close()
+
+    for key in ('full_snapshot_ms', 'delta_snapshot_ms', 'full_history_ms', 'delta_history_ms'):
+        results[key] = round(results[key], 3)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='chart_snapshots 델타 저장')
+    parser.add_argument('--db', default=str(DB_PATH))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subparsers.add_parser('migrate', help='chart_snapshots → 델타 테이블')
+    migrate_parser.add_argument('--every', type=int, default=KEYFRAME_EVERY, help='키프레임 간격')
+    subparsers.add_parser('stats', help='프레임 / 엔트리 수')
+    bench_parser = subparsers.add_parser('bench', help='전체 저장 vs 델타 비교 (합성 이력)')
+    bench_parser.add_argument('--snapshots', type=int, default=1000)
+    bench_parser.add_argument('--chart-size', type=int, default=100)
+    bench_parser.add_argument('--every', type=int, default=KEYFRAME_EVERY)
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        results = bench(args.snapshots, args.chart_size, args.every)
+        print(f"📊 스냅샷 {results['snapshots']}개 × {results['chart_size']}곡, 키프레임 {results['keyframe_every']}개마다")
+        print(f"  행 수:     전체 {results['full_rows']:,} / 델타 {results['delta_entries']:,}")
+        print(f"  DB 크기:   전체 {results['full_mb']}MB / 델타 {results['delta_mb']}MB")
+        print(f"  저장:      전체 {results['full_write_s']}초 / 델타 {results['delta_write_s']}초")
+        print(f"  스냅샷 1개: 전체 {results['full_snapshot_ms']}ms / 델타 {results['delta_snapshot_ms']}ms")
+        print(f"  곡 이력:   전체 {results['full_history_ms']}ms / 델타 {results['delta_history_ms']}ms")
+        return
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == 'migrate':
+            frames, entries = migrate(conn, args.every)
+            print(f"✅ 프레임 {frames}개, 엔트리 {entries}개 저장")
+        ensure_delta_tables(conn)
+        for key, value in get_stats(conn).items():
+            print(f"  {key}: {value}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
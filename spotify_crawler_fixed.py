@@ -30,6 +30,9 @@ class SpotifyCrawler:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
 
+        # 크롤러 레지스트리가 연결 풀 세션으로 교체 (단독 실행 시 기본 세션)
+        self.session = requests.Session()
+
     def get_access_token(self):
         """Spotify API 액세스 토큰 획득"""
         try:
@@ -47,7 +50,7 @@ class SpotifyCrawler:
                 'grant_type': 'client_credentials'
             }
 
-            response = requests.post(auth_url, headers=headers, data=data, timeout=10)
+            response = self.session.post(auth_url, headers=headers, data=data, timeout=10)
 
             if response.status_code == 200:
                 token_data = response.json()
@@ -88,10 +91,10 @@ class SpotifyCrawler:
                     url = f'https://api.spotify.com/v1/playlists/{playlist_id}/tracks'
                     params = {
                         'limit': 50,
-                        'fields': 'items(track(name,artists,album(name,images),popularity,external_urls))'
+                        'fields': 'items(track(id,name,artists,album(id,name,images),popularity,external_urls))'
                     }
 
-                    response = requests.get(url, headers=headers, params=params, timeout=10)
+                    response = self.session.get(url, headers=headers, params=params, timeout=10)
 
                     if response.status_code == 200:
                         data = response.json()
@@ -132,6 +135,9 @@ class SpotifyCrawler:
                                     'track': track_name,
                                     'album': album_name,
                                     'image_url': image_url,
+                                    # 🆕 재수집 시 다건 조회용 Spotify ID
+                                    'spotify_track_id': track.get('id'),
+                                    'spotify_album_id': track.get('album', {}).get('id'),
                                     'chart_name': 'Spotify',
                                     'crawled_at': datetime.now().isoformat(),
                                     'source': 'api'
@@ -140,7 +146,7 @@ class SpotifyCrawler:
                         # 추가 50개 가져오기
                         if len(tracks) == 50:
                             params['offset'] = 50
-                            response2 = requests.get(url, headers=headers, params=params, timeout=10)
+                            response2 = self.session.get(url, headers=headers, params=params, timeout=10)
 
                             if response2.status_code == 200:
                                 data2 = response2.json()
@@ -171,6 +177,8 @@ class SpotifyCrawler:
                                             'track': track_name,
                                             'album': album_name,
                                             'image_url': image_url,
+                                            'spotify_track_id': track.get('id'),
+                                            'spotify_album_id': track.get('album', {}).get('id'),
                                             'chart_name': 'Spotify',
                                             'crawled_at': datetime.now().isoformat(),
                                             'source': 'api'
@@ -193,7 +201,7 @@ class SpotifyCrawler:
     def crawl_kworb(self):
         """Kworb 사이트에서 크롤링 (백업)"""
         try:
-            response = requests.get(self.kworb_url, headers=self.headers, timeout=10)
+            response = self.session.get(self.kworb_url, headers=self.headers, timeout=10)
 
             if response.status_code != 200:
                 return None
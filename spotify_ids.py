@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Spotify IDs - (artist, track) → Spotify 트랙/앨범 ID 저장 + 일괄 조회
+- 크롤러 / 검색 결과에서 얻은 ID를 rank_history.db의 spotify_ids 테이블에 저장
+- 재수집 시 곡마다 /v1/search 대신 다건 조회 엔드포인트 사용
+    /v1/tracks?ids=  (최대 50개)
+    /v1/albums?ids=  (최대 20개, 같은 앨범 곡은 한 번만)
+- SPOTIFY_API_BASE 환경 변수로 API 주소 교체 (테스트용 목 서버)
+
+사용법:
+    python3 spotify_ids.py mock --port 8765             # 로컬 목 서버 실행
+    python3 spotify_ids.py bench --tracks 1000          # 검색 vs ID 일괄 조회 API 호출 수 비교
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+DB_PATH = BASE_DIR / 'rank_history.db'
+
+SPOTIFY_API_BASE = os.getenv('SPOTIFY_API_BASE', 'https://api.spotify.com').rstrip('/')
+SPOTIFY_ACCOUNTS_BASE = os.getenv('SPOTIFY_ACCOUNTS_BASE', 'https://accounts.spotify.com').rstrip('/')
+
+TRACKS_BATCH_SIZE = 50
+ALBUMS_BATCH_SIZE = 20
+
+# SQLite 바인딩 변수 제한(999) 이하로 유지
+DB_CHUNK_SIZE = 400
+
+
+def pick_image(images, size=640):
+    """Spotify images 목록(큰 것부터)에서 size를 덮는 가장 작은 이미지 URL"""
+    if not images:
+        return None
+    best = images[0]
+    for image in images:
+        if (image.get('width') or 0) >= size:
+            best = image
+    return best['url']
+
+
+class SpotifyIdStore:
+    """(artist, track) → Spotify ID / 앨범 이미지 저장소"""
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = Path(db_path)
+        self._ensure_table()
+
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_table(self):
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS spotify_ids (
+                    artist TEXT NOT NULL,
+                    track TEXT NOT NULL,
+                    track_id TEXT,
+                    album_id TEXT,
+                    images TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (artist, track)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_spotify_ids_album ON spotify_ids(album_id)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def save_many(self, rows):
+        """(artist, track, track_id, album_id, images) 목록 저장 → 저장 행 수"""
+        params = [
+            (artist, track, track_id, album_id, json.dumps(images) if images else None)
+            for artist, track, track_id, album_id, images in rows
+            if artist and track and (track_id or album_id)
+        ]
+        if not params:
+            return 0
+
+        conn = self._connect()
+        try:
+            conn.executemany("""
+                INSERT INTO spotify_ids (artist, track, track_id, album_id, images, updated_at)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(artist, track) DO UPDATE SET
+                    track_id = COALESCE(excluded.track_id, spotify_ids.track_id),
+                    album_id = COALESCE(excluded.album_id, spotify_ids.album_id),
+                    images = COALESCE(excluded.images, spotify_ids.images),
+                    updated_at = CURRENT_TIMESTAMP
+            """, params)
+            conn.commit()
+        finally:
+            conn.close()
+        return len(params)
+
+    def save_track(self, artist, track, track_obj):
+        """Spotify track 객체(검색/다건 조회 결과)에서 ID + 이미지 저장"""
+        album = track_obj.get('album') or {}
+        return self.save_many([(artist, track, track_obj.get('id'), album.get('id'), album.get('images'))])
+
+    def lookup_many(self, pairs):
+        """(artist, track) 목록 → {(artist, track): {'track_id', 'album_id', 'images'}}"""
+        found = {}
+        wanted = set(pairs)
+        unique_pairs = list(wanted)
+
+        conn = self._connect()
+        try:
+            for start in range(0, len(unique_pairs), DB_CHUNK_SIZE):
+                chunk = unique_pairs[start:start + DB_CHUNK_SIZE]
+                artists = sorted({a for a, _ in chunk})
+                tracks = sorted({t for _, t in chunk})
+                rows = conn.execute(f"""
+                    SELECT artist, track, track_id, album_id, images FROM spotify_ids
+                    WHERE artist IN ({','.join('?' * len(artists))})
+                    AND track IN ({','.join('?' * len(tracks))})
+                """, artists + tracks).fetchall()
+
+                for row in rows:
+                    key = (row['artist'], row['track'])
+                    if key in wanted:
+                        found[key] = {
+                            'track_id': row['track_id'],
+                            'album_id': row['album_id'],
+                            'images': json.loads(row['images']) if row['images'] else None,
+                        }
+        finally:
+            conn.close()
+
+        return found
+
+    def lookup(self, artist, track):
+        return self.lookup_many([(artist, track)]).get((artist, track))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_spotify_id_store():
+    """SpotifyIdStore 싱글톤"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SpotifyIdStore()
+    return _store
+
+
+# ============================================
+# 일괄 조회
+# ============================================
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def refresh_by_ids(get, entries):
+    """저장된 ID로 앨범 이미지 일괄 갱신
+
+    get: get(path, params) → JSON dict 또는 None (속도 제한/토큰은 호출자가 처리)
+    entries: {key: {'track_id', 'album_id'}}
+
+    앨범 ID가 있는 곡은 고유 앨범 수 / 20, 트랙 ID만 있는 곡은 곡 수 / 50 호출.
+    둘 다 있으면 호출 수가 적은 쪽을 쓴다.
+
+    Returns:
+        ({key: (track_id, album_id, images)}, API 호출 수)
+    """
+    by_album = {key: entry for key, entry in entries.items() if entry.get('album_id')}
+    by_track = {key: entry for key, entry in entries.items()
+                if entry.get('track_id') and key not in by_album}
+
+    # 앨범이 거의 겹치지 않으면 트랙 다건 조회(50개)가 앨범 다건 조회(20개)보다 싸다
+    album_ids = {entry['album_id'] for entry in by_album.values()}
+    album_plan = -(-len(album_ids) // ALBUMS_BATCH_SIZE) + -(-len(by_track) // TRACKS_BATCH_SIZE)
+    track_plan = -(-(len(by_album) + len(by_track)) // TRACKS_BATCH_SIZE)
+    if track_plan < album_plan and all(entry.get('track_id') for entry in by_album.values()):
+        by_track.update(by_album)
+        by_album = {}
+        album_ids = set()
+
+    results = {}
+    calls = 0
+
+    album_images = {}
+    for chunk in _chunks(sorted(album_ids), ALBUMS_BATCH_SIZE):
+        data = get('/v1/albums', {'ids': ','.join(chunk)})
+        calls += 1
+        for album in (data or {}).get('albums') or []:
+            if album:
+                album_images[album['id']] = album.get('images')
+
+    for key, entry in by_album.items():
+        images = album_images.get(entry['album_id'])
+        if images:
+            results[key] = (entry.get('track_id'), entry['album_id'], images)
+        elif entry.get('track_id'):
+            # 앨범이 null(삭제/지역 제한)로 오면 트랙 조회로 재시도
+            by_track[key] = entry
+
+    keys_by_track = {}
+    for key, entry in by_track.items():
+        keys_by_track.setdefault(entry['track_id'], []).append(key)
+
+    for chunk in _chunks(sorted(keys_by_track), TRACKS_BATCH_SIZE):
+        data = get('/v1/tracks', {'ids': ','.join(chunk)})
+        calls += 1
+        for track in (data or {}).get('tracks') or []:
+            if not track:
+                continue
+            album = track.get('album') or {}
+            for key in keys_by_track.get(track['id'], []):
+                results[key] = (track['id'], album.get('id'), album.get('images'))
+
+    return results, calls
+
+
+# ============================================
+# 목 서버 / 벤치마크
+# ============================================
+class MockSpotifyCatalog:
+    """합성 카탈로그 (곡 여러 개가 한 앨범을 공유)"""
+
+    def __init__(self, tracks=1000, tracks_per_album=1.5, seed=42):
+        rng = random.Random(seed)
+        album_count = max(int(tracks / tracks_per_album), 1)
+        self.albums = {
+            f"album{i:06d}": {
+                'id': f"album{i:06d}",
+                'name': f"Album {i}",
+                'images': [
+                    {'url': f"https://i.scdn.co/image/album{i:06d}_{size}", 'width': size, 'height': size}
+                    for size in (640, 300, 64)
+                ],
+            }
+            for i in range(album_count)
+        }
+        album_ids = sorted(self.albums)
+        self.tracks = {}
+        self.by_name = {}
+        for i in range(tracks):
+            album = self.albums[album_ids[rng.randrange(album_count)]]
+            track = {
+                'id': f"track{i:06d}",
+                'name': f"Track {i}",
+                'artists': [{'name': f"Artist {i % 97}"}],
+                'album': album,
+            }
+            self.tracks[track['id']] = track
+            self.by_name[(f"Artist {i % 97}", f"Track {i}")] = track
+
+    def search(self, query):
+        # 'artist:X track:Y' 형식
+        if ' track:' not in query:
+            return None
+        artist_part, track_part = query.split(' track:', 1)
+        return self.by_name.get((artist_part.replace('artist:', '', 1), track_part))
+
+
+def make_mock_handler(catalog, counter):
+    class MockSpotifyHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if self.path.startswith('/api/token'):
+                self._send(200, {'access_token': 'mock-token', 'token_type': 'Bearer', 'expires_in': 3600})
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            query = parse_qs(parts.query)
+            with counter['lock']:
+                counter[parts.path] = counter.get(parts.path, 0) + 1
+
+            if parts.path == '/v1/search':
+                track = catalog.search(query.get('q', [''])[0])
+                self._send(200, {'tracks': {'items': [track] if track else []}})
+            elif parts.path == '/v1/tracks':
+                ids = query.get('ids', [''])[0].split(',')[:TRACKS_BATCH_SIZE]
+                self._send(200, {'tracks': [catalog.tracks.get(i) for i in ids]})
+            elif parts.path == '/v1/albums':
+                ids = query.get('ids', [''])[0].split(',')[:ALBUMS_BATCH_SIZE]
+                self._send(200, {'albums': [catalog.albums.get(i) for i in ids]})
+            else:
+                self._send(404, {'error': 'not found'})
+
+    return MockSpotifyHandler
+
+
+def start_mock_server(catalog, port=0):
+    """백그라운드 스레드로 목 서버 실행 → (server, base_url, counter)"""
+    counter = {'lock': threading.Lock()}
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_mock_handler(catalog, counter))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", counter
+
+
+def benchmark(tracks=1000, tracks_per_album=1.5):
+    """전체 재수집 API 호출 수: 곡별 검색 vs 저장된 ID 일괄 조회"""
+    import requests
+
+    catalog = MockSpotifyCatalog(tracks, tracks_per_album)
+    server, base_url, counter = start_mock_server(catalog)
+    session = requests.Session()
+
+    def get(path, params):
+        response = session.get(f"{base_url}{path}", params=params, timeout=10)
+        return response.json() if response.status_code == 200 else None
+
+    db_path = Path(os.getenv('TMPDIR', '/tmp')) / f"spotify_ids_bench_{os.getpid()}.db"
+    store = SpotifyIdStore(db_path)
+
+    try:
+        # 1. 첫 실행: 곡마다 검색 (ID 저장)
+        start = time.perf_counter()
+        for (artist, track), _ in catalog.by_name.items():
+            data = get('/v1/search', {'q': f'artist:{artist} track:{track}', 'type': 'track', 'limit': 1})
+            items = (data or {}).get('tracks', {}).get('items', [])
+            if items:
+                store.save_track(artist, track, items[0])
+        search_seconds = time.perf_counter() - start
+        search_calls = counter.get('/v1/search', 0)
+
+        # 2. 재수집: 저장된 ID로 일괄 조회
+        start = time.perf_counter()
+        entries = store.lookup_many(list(catalog.by_name))
+        results, batch_calls = refresh_by_ids(get, entries)
+        batch_seconds = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        db_path.unlink(missing_ok=True)
+
+    return {
+        'tracks': tracks,
+        'albums': len(catalog.albums),
+        'search_calls': search_calls,
+        'search_seconds': round(search_seconds, 2),
+        'batch_calls': batch_calls,
+        'batch_seconds': round(batch_seconds, 2),
+        'refreshed': len(results),
+        'reduction': round(search_calls / batch_calls, 1) if batch_calls else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Spotify ID 저장소 / 일괄 조회 도구')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    mock_parser = subparsers.add_parser('mock', help='로컬 Spotify 목 서버')
+    mock_parser.add_argument('--port', type=int, default=8765)
+    mock_parser.add_argument('--tracks', type=int, default=1000)
+
+    bench_parser = subparsers.add_parser('bench', help='검색 vs 일괄 조회 API 호출 수 비교')
+    bench_parser.add_argument('--tracks', type=int, default=1000)
+    bench_parser.add_argument('--tracks-per-album', type=float, default=1.5)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'mock':
+        catalog = MockSpotifyCatalog(args.tracks)
+        server, base_url, _ = start_mock_server(catalog, args.port)
+        print(f"🧪 Spotify 목 서버: {base_url} (트랙 {len(catalog.tracks)}개, 앨범 {len(catalog.albums)}개)")
+        print(f"   SPOTIFY_API_BASE={base_url} SPOTIFY_ACCOUNTS_BASE={base_url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+
+    if args.command == 'bench':
+        result = benchmark(args.tracks, args.tracks_per_album)
+        print(f"📊 트랙 {result['tracks']}개 / 앨범 {result['albums']}개")
+        print(f"   곡별 검색   : API {result['search_calls']}회 ({result['search_seconds']}초)")
+        print(f"   ID 일괄 조회: API {result['batch_calls']}회 ({result['batch_seconds']}초), "
+              f"갱신 {result['refreshed']}개")
+        print(f"   호출 감소   : {result['reduction']}배")
+
+
+if __name__ == '__main__':
+    main()
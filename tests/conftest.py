@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 백엔드 모듈은 저장소 루트에 있음
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
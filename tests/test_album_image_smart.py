@@ -0,0 +1,109 @@
+"""/api/album-image-smart - size 파라미터 기본값 처리"""
+
+import sqlite3
+
+import pytest
+from flask import Flask
+
+import backend_album_image_smart as smart
+import image_derivatives
+
+
+BUGS_URL = 'https://image.bugsm.co.kr/album/images/1000/40912/4091237.jpg'
+
+
+class FakeStore:
+    def __init__(self, blob):
+        self.blob = blob
+
+    def lookup(self, artist, track):
+        return ('hash', 'jpg') if self.blob else None
+
+    def blob_path(self, hash_value, ext):
+        return self.blob
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    blob = tmp_path / 'blob.jpg'
+    blob.write_bytes(b'\xff\xd8\xff' + b'0' * 1024)
+    monkeypatch.setattr(smart, 'get_image_store', lambda: FakeStore(blob))
+    monkeypatch.setattr(image_derivatives, 'PACKED_SIZES', ())
+
+    app = Flask(__name__)
+    app.register_blueprint(smart.album_image_bp)
+    return app.test_client()
+
+
+def test_local_image_without_size(client):
+    response = client.get('/api/album-image-smart/MAP/X')
+    assert response.status_code == 200
+    assert response.headers['X-Image-Source'] == 'hash'
+
+
+def test_local_image_with_size(client):
+    response = client.get('/api/album-image-smart/MAP/X?size=300')
+    assert response.status_code == 200
+    assert response.headers['X-Image-Source'] == 'hash'
+
+
+class EmptyIndex:
+    def find_mapped(self, artist, track):
+        return None
+
+    def find_by_prefix(self, artist, track):
+        return None
+
+    def find_album_image(self, artist, track):
+        return None
+
+
+class FakeDownloader:
+    def enqueue(self, url, artist=None, track=None, **kwargs):
+        return False
+
+
+@pytest.fixture
+def cdn_client(tmp_path, monkeypatch):
+    """로컬 이미지 없음 → DB image_url(CDN) 리다이렉트 경로"""
+    db_path = tmp_path / 'rank_history.db'
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("""
+        CREATE TABLE unified_master_with_images (
+            unified_artist TEXT, unified_track TEXT,
+            local_image TEXT, image_url TEXT, created_at TIMESTAMP
+        )
+    """)
+    conn.execute("INSERT INTO unified_master_with_images VALUES ('A', 'T', NULL, ?, '2026-01-01')",
+                 (BUGS_URL,))
+    conn.commit()
+    conn.close()
+
+    def connect():
+        conn = sqlite3.connect(str(db_path))
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    monkeypatch.setattr(smart, 'get_image_store', lambda: FakeStore(None))
+    monkeypatch.setattr(smart, 'LOCAL_IMAGE_ENABLED', False)
+    monkeypatch.setattr(smart, 'get_track_image_index', lambda: EmptyIndex())
+    monkeypatch.setattr(smart, 'get_db_connection', connect)
+    monkeypatch.setattr(smart, 'get_downloader', lambda: FakeDownloader())
+    monkeypatch.setattr(smart, 'search_spotify_image', lambda artist, track, size: None)
+
+    app = Flask(__name__)
+    app.register_blueprint(smart.album_image_bp)
+    return app.test_client()
+
+
+def test_cdn_redirect_without_size(cdn_client):
+    response = cdn_client.get('/api/album-image-smart/A/T')
+    assert response.status_code == 302
+    assert response.headers['X-Image-Source'] == 'cdn'
+    assert response.headers['Location'] == BUGS_URL
+
+
+def test_cdn_redirect_with_small_size(cdn_client):
+    response = cdn_client.get('/api/album-image-smart/A/T?size=64')
+    assert response.status_code == 302
+    assert response.headers['Location'] == BUGS_URL.replace('/images/1000/', '/images/500/')
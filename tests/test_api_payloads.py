@@ -0,0 +1,53 @@
+"""api_payloads - resolved_image 컬럼이 없는 기존 DB에서도 응답 생성"""
+
+import sqlite3
+
+import pytest
+
+from api_payloads import chart_latest_payload, trending_payload
+
+
+@pytest.fixture
+def conn(tmp_path):
+    # 파이프라인의 ensure_tables가 돌기 전 스키마 (resolved_image 없음)
+    conn = sqlite3.connect(str(tmp_path / 'rank_history.db'))
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+        CREATE TABLE unified_master_with_images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chart_name TEXT, rank_position INTEGER,
+            unified_artist TEXT, unified_track TEXT,
+            original_artist TEXT, original_track TEXT,
+            image_url TEXT, views_or_streams TEXT, local_image TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.executemany("""
+        INSERT INTO unified_master_with_images
+        (chart_name, rank_position, unified_artist, unified_track, image_url, created_at)
+        VALUES (?, ?, ?, ?, ?, '2026-10-19 10:00:00')
+    """, [
+        ('melon', 1, 'IVE', 'LOVE DIVE', 'https://cdn.example.com/ive.jpg'),
+        ('melon', 2, 'IU', 'Blueming', None),
+        ('genie', 1, 'IVE', 'LOVE DIVE', None),
+    ])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_trending_without_resolved_image_column(conn):
+    payload = trending_payload(conn, limit=10)
+
+    tracks = {(t['artist'], t['track']): t for t in payload['trending']}
+    assert set(tracks) == {('IVE', 'LOVE DIVE'), ('IU', 'Blueming')}
+    assert tracks[('IVE', 'LOVE DIVE')]['chart_count'] == 2
+    assert tracks[('IU', 'Blueming')]['image_url'].startswith('/api/album-image-smart/')
+
+
+def test_chart_latest_without_resolved_image_column(conn):
+    payload = chart_latest_payload(conn, 'melon')
+
+    assert payload['success'] is True
+    assert [t['track'] for t in payload['tracks']] == ['LOVE DIVE', 'Blueming']
+    assert payload['last_update'] == '2026-10-19 10:00:00'
@@ -0,0 +1,11 @@
+"""cdn_rules - CHECK_CASES 검증 케이스"""
+
+import pytest
+
+from cdn_rules import CHECK_CASES, best_image_url, sized_image_url
+
+
+@pytest.mark.parametrize('kind, url, size, expected', CHECK_CASES)
+def test_check_cases(kind, url, size, expected):
+    actual = best_image_url(url) if kind == 'best' else sized_image_url(url, size)
+    assert actual == expected
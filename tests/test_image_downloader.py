@@ -0,0 +1,158 @@
+"""image_downloader - 실패 재예약 / 저장소 파일 유실 시 재다운로드 / 매핑 내보내기"""
+
+import json
+import threading
+
+import pytest
+
+import image_downloader
+from image_downloader import ImageDownloader
+from image_store import ImageStore
+
+URL = 'https://cdn.example.com/album/1.jpg'
+JPEG = b'\xff\xd8\xff' + b'1' * 2048
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+@pytest.fixture
+def downloader(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_downloader, 'RESUME_INTERVAL', 3600)
+    store = ImageStore(store_dir=tmp_path / 'store', db_path=tmp_path / 'image_store.db')
+    return ImageDownloader(images_dir=tmp_path / 'images', queue_db=tmp_path / 'queue.db',
+                           max_workers=1, max_retries=0, backoff_base=0, store=store)
+
+
+def serve(downloader, responses):
+    """_get 응답을 순서대로 돌려주고 요청 헤더 기록"""
+    requests_seen = []
+
+    def fake_get(url, headers=None):
+        requests_seen.append(headers or {})
+        return responses.pop(0)
+
+    downloader._get = fake_get
+    return requests_seen
+
+
+def queue_row(downloader):
+    conn = downloader._connect()
+    try:
+        return conn.execute("SELECT status, attempts FROM download_queue WHERE url = ?", (URL,)).fetchone()
+    finally:
+        conn.close()
+
+
+def test_failed_url_is_requeued(downloader, monkeypatch):
+    serve(downloader, [FakeResponse(404), FakeResponse(200, JPEG)])
+
+    assert downloader.enqueue(URL, 'A', 'T')
+    downloader.wait(5)
+    assert tuple(queue_row(downloader)) == ('failed', 1)
+
+    # 대기 시간 안에는 다시 예약하지 않음
+    assert not downloader.enqueue(URL, 'A', 'T')
+
+    monkeypatch.setattr(image_downloader, 'FAILED_RETRY_SECONDS', 0)
+    assert downloader.enqueue(URL, 'A', 'T')
+    downloader.wait(5)
+    assert queue_row(downloader) is None
+    assert downloader.stats['completed'] == 1
+    assert (downloader.images_dir / 'A_T_HQ.jpg').exists()
+
+
+def test_attempt_budget(downloader, monkeypatch):
+    monkeypatch.setattr(image_downloader, 'FAILED_RETRY_SECONDS', 0)
+    monkeypatch.setattr(image_downloader, 'MAX_ATTEMPTS', 2)
+    serve(downloader, [FakeResponse(404), FakeResponse(404)])
+
+    for _ in range(2):
+        assert downloader.enqueue(URL, 'A', 'T')
+        downloader.wait(5)
+
+    assert tuple(queue_row(downloader)) == ('failed', 2)
+    assert not downloader.enqueue(URL, 'A', 'T')
+
+
+def test_blob_removed_during_304_downloads_again(downloader):
+    """조건부 요청 중 저장소 파일이 지워지면 running에 남지 않고 전체 다운로드"""
+    seen = serve(downloader, [FakeResponse(200, JPEG, {'ETag': '"v1"'})])
+    assert downloader.enqueue(URL, 'A', 'T')
+    downloader.wait(5)
+
+    source = downloader.store.get_source(URL)
+    blob = downloader.store.blob_path(source['hash'], source['ext'])
+
+    def not_modified_after_cleanup():
+        blob.unlink()
+        return FakeResponse(304)
+
+    responses = [not_modified_after_cleanup, lambda: FakeResponse(200, JPEG, {'ETag': '"v1"'})]
+
+    def fake_get(url, headers=None):
+        seen.append(headers or {})
+        return responses.pop(0)()
+
+    downloader._get = fake_get
+    assert downloader.enqueue(URL, 'A', 'T', refresh=True)
+    downloader.wait(5)
+
+    assert seen[1].get('If-None-Match') == '"v1"'
+    assert seen[2] == {}
+    assert blob.exists()
+    assert queue_row(downloader) is None
+
+
+def test_mapping_json_written_once_per_batch(downloader, monkeypatch):
+    """다운로드마다 JSON을 다시 쓰지 않고 배치가 끝나면 한 번 내보냄"""
+    release = threading.Event()
+
+    def fake_get(url, headers=None):
+        release.wait(5)
+        return FakeResponse(200, JPEG + url.encode())
+
+    downloader._get = fake_get
+    writes = []
+    real_replace = image_downloader.os.replace
+
+    def counting_replace(src, dst):
+        if str(dst) == str(downloader.mapping_path):
+            writes.append(dst)
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(image_downloader.os, 'replace', counting_replace)
+
+    for i in range(20):
+        assert downloader.enqueue(f"https://cdn.example.com/album/{i}.jpg", f"A{i}", 'T')
+    release.set()
+    assert downloader.wait(5)
+
+    assert len(writes) == 1
+    mapping = json.loads(downloader.mapping_path.read_text(encoding='utf-8'))
+    assert len(mapping) == 20
+    assert mapping['A7:T'] == 'A7_T_HQ.jpg'
+
+    # 변경이 없으면 다시 쓰지 않음
+    assert not downloader.flush_mapping()
+    assert len(writes) == 1
+
+
+def test_existing_mapping_json_is_imported(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_downloader, 'RESUME_INTERVAL', 3600)
+    images_dir = tmp_path / 'images'
+    images_dir.mkdir()
+    (images_dir / 'download_mapping.json').write_text('{"Old:Song": "Old_Song_HQ.jpg"}', encoding='utf-8')
+
+    downloader = ImageDownloader(images_dir=images_dir, queue_db=tmp_path / 'queue.db',
+                                 max_workers=1, max_retries=0, backoff_base=0)
+    serve(downloader, [FakeResponse(200, JPEG)])
+    assert downloader.enqueue(URL, 'A', 'T')
+    assert downloader.wait(5)
+
+    mapping = json.loads(downloader.mapping_path.read_text(encoding='utf-8'))
+    assert mapping == {'Old:Song': 'Old_Song_HQ.jpg', 'A:T': 'A_T_HQ.jpg'}
@@ -0,0 +1,104 @@
+"""image_fts - 퍼지 매칭 순위 / 짧은 검색어 / 트리거 동기화"""
+
+import sqlite3
+
+import pytest
+
+from image_fts import ensure_fts, fuzzy_lookup, sync_from_unified, upsert_names
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    try:
+        ensure_fts(conn)
+    except sqlite3.OperationalError as e:
+        pytest.skip(f"FTS5 trigram 미지원: {e}")
+    upsert_names(conn, [
+        ('IVE', 'LOVE DIVE Remix ver', None, 'https://cdn.example.com/remix.jpg', '2026-10-01'),
+        ('IVE', 'LOVE DIVE', 'ive_love_dive.jpg', None, '2026-10-01'),
+        ('IVE', 'After LIKE', None, None, '2026-10-01'),
+        ('IU', 'Love wins all', 'iu_love_wins_all.jpg', None, '2026-10-01'),
+        ('IU', 'Blueming', None, None, '2026-10-01'),
+        ('BTS', 'Dynamite', None, None, '2026-10-01'),
+    ])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_hit_ranks_closest_name_first(conn):
+    result = fuzzy_lookup(conn, 'ive', 'love dive')
+    assert (result['artist'], result['track']) == ('IVE', 'LOVE DIVE')
+    assert result['local_image'] == 'ive_love_dive.jpg'
+
+
+def test_partial_track_matches(conn):
+    result = fuzzy_lookup(conn, 'IVE', 'After')
+    assert result['track'] == 'After LIKE'
+
+
+def test_miss(conn):
+    assert fuzzy_lookup(conn, 'NewJeans', 'Super Shy') is None
+    assert fuzzy_lookup(conn, '', '') is None
+
+
+def test_short_artist_uses_track_trigrams(conn):
+    # 'iu'는 trigram 검색 불가 → 트랙으로 후보를 찾고 아티스트는 파이썬에서 확인
+    result = fuzzy_lookup(conn, 'IU', 'Love wins')
+    assert (result['artist'], result['track']) == ('IU', 'Love wins all')
+    assert fuzzy_lookup(conn, 'XX', 'Love wins') is None
+
+
+def test_short_artist_filtered_before_limit(conn):
+    # 같은 트랙어를 가진 행이 limit*5개보다 많고 정답이 마지막에 들어가도 찾아야 함
+    upsert_names(conn, [
+        (f"Artist {i}", f"Love {i}", None, None, '2026-10-01') for i in range(120)
+    ] + [('IU', 'Love', 'iu_love.jpg', None, '2026-10-01')])
+
+    result = fuzzy_lookup(conn, 'IU', 'love', limit=20)
+    assert (result['artist'], result['track']) == ('IU', 'Love')
+
+
+def test_closest_candidate_survives_limit(conn):
+    # 두 검색어 모두 trigram이어도 잘라내기 전에 유사도 순으로 정렬
+    upsert_names(conn, [
+        ('IVE', f"LOVE DIVE session take {i}", None, None, '2026-10-01') for i in range(120)
+    ])
+    conn.execute("DELETE FROM track_name_index WHERE track = 'LOVE DIVE'")
+    upsert_names(conn, [('IVE', 'LOVE DIVE', 'ive_love_dive.jpg', None, '2026-10-02')])
+
+    result = fuzzy_lookup(conn, 'IVE', 'love dive', limit=20)
+    assert result['local_image'] == 'ive_love_dive.jpg'
+
+
+def test_all_short_terms_fall_back_to_like(conn):
+    result = fuzzy_lookup(conn, 'IU', 'Bl')
+    assert (result['artist'], result['track']) == ('IU', 'Blueming')
+
+
+def test_triggers_keep_fts_in_sync(conn):
+    conn.execute("DELETE FROM track_name_index WHERE artist = 'BTS'")
+    assert fuzzy_lookup(conn, 'BTS', 'Dynamite') is None
+
+    conn.execute("""
+        UPDATE track_name_index SET artist_norm = 'ive official'
+        WHERE artist = 'IVE' AND track = 'After LIKE'
+    """)
+    assert fuzzy_lookup(conn, 'IVE official', 'after like')['track'] == 'After LIKE'
+
+
+def test_sync_from_unified(conn):
+    conn.execute("""
+        CREATE TABLE unified_master_with_images (
+            chart_name TEXT, unified_artist TEXT, unified_track TEXT,
+            local_image TEXT, image_url TEXT, created_at TIMESTAMP
+        )
+    """)
+    conn.executemany("INSERT INTO unified_master_with_images VALUES (?, ?, ?, ?, ?, ?)", [
+        ('melon', 'aespa', 'Supernova', None, 'https://cdn.example.com/a.jpg', '2026-10-02'),
+        ('genie', 'SEVENTEEN', 'MAESTRO', None, None, '2026-10-02'),
+    ])
+    assert sync_from_unified(conn, ['melon']) == 1
+    assert fuzzy_lookup(conn, 'aespa', 'supernova')['image_url'] == 'https://cdn.example.com/a.jpg'
+    assert fuzzy_lookup(conn, 'SEVENTEEN', 'MAESTRO') is None
@@ -0,0 +1,110 @@
+"""prerender - 동시 렌더 / 서빙 쪽 버전 확인 횟수"""
+
+import json
+import sqlite3
+import threading
+
+import pytest
+
+import prerender
+from chart_pointer import ensure_latest_pointer, set_published_pointer, set_snapshot_pointer
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / 'rank_history.db'
+    conn = sqlite3.connect(str(path))
+    conn.execute("""
+        CREATE TABLE unified_master_with_images (
+            id INTEGER PRIMARY KEY,
+            chart_name TEXT, rank_position INTEGER,
+            unified_artist TEXT, unified_track TEXT,
+            local_image TEXT, image_url TEXT, resolved_image TEXT,
+            views_or_streams TEXT, created_at TIMESTAMP
+        )
+    """)
+    ensure_latest_pointer(conn)
+    for chart in ('melon', 'genie'):
+        conn.executemany("""
+            INSERT INTO unified_master_with_images
+            (chart_name, rank_position, unified_artist, unified_track, created_at)
+            VALUES (?, ?, ?, ?, '2026-10-19 10:00:00')
+        """, [(chart, rank, f"artist{rank}", f"track{rank}") for rank in range(1, 21)])
+        set_snapshot_pointer(conn, chart, '2026-10-19 10:00:00')
+        set_published_pointer(conn, chart, '2026-10-19 10:00:00')
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_concurrent_renders(db_path, tmp_path):
+    out_dir = tmp_path / 'prerendered'
+    errors = []
+
+    def render():
+        try:
+            prerender.render_all(db_path, out_dir, keep=3)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=render) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    current = prerender.read_current(out_dir)
+    manifest = json.loads((out_dir / current['dir'] / prerender.MANIFEST_FILE).read_text(encoding='utf-8'))
+    assert 'chart-melon-latest' in manifest['payloads']
+    versions = [path for path in out_dir.iterdir() if path.is_dir()]
+    assert len(versions) == 3
+    assert not list(out_dir.glob(f"{prerender.TMP_PREFIX}*"))
+
+
+def test_unknown_name_does_not_force_refresh(db_path, tmp_path, monkeypatch):
+    out_dir = tmp_path / 'prerendered'
+    prerender.render_all(db_path, out_dir)
+    store = prerender.PrerenderStore(out_dir, db_path, check_interval=3600)
+
+    checks = []
+    real_version = prerender.data_version
+
+    def counting_version(conn):
+        checks.append(1)
+        return real_version(conn)
+
+    monkeypatch.setattr(prerender, 'data_version', counting_version)
+
+    assert store.get('trending-20') is not None
+    for _ in range(5):
+        assert store.get('trending-7') is None
+        assert store.get('chart-nochart-latest') is None
+    assert len(checks) == 1
+
+
+def test_pruned_directory_reloads_current(db_path, tmp_path):
+    out_dir = tmp_path / 'prerendered'
+    prerender.render_all(db_path, out_dir, keep=1)
+    store = prerender.PrerenderStore(out_dir, db_path, check_interval=3600)
+    assert store.get('statistics') is not None
+
+    report = prerender.render_all(db_path, out_dir, keep=1)
+    body, _, manifest = store.get('chart-genie-info')
+    assert manifest['dir'] == report['dir']
+
+
+def test_db_path_with_uri_characters(db_path, tmp_path):
+    # ?, #, % 가 들어간 배포 경로에서도 읽기 전용으로 같은 DB를 연다
+    odd_dir = tmp_path / 'data?v=1#x%20'
+    odd_dir.mkdir()
+    odd_db = odd_dir / 'rank_history.db'
+    db_path.rename(odd_db)
+
+    out_dir = tmp_path / 'prerendered'
+    prerender.render_all(odd_db, out_dir)
+    store = prerender.PrerenderStore(out_dir, odd_db, check_interval=3600)
+
+    assert store.get('statistics') is not None
+    assert store.get('chart-melon-latest') is not None
+    assert not (tmp_path / 'data').exists()
@@ -0,0 +1,114 @@
+"""spotify_ids.refresh_by_ids - 목 서버로 앨범/트랙 계획 선택과 null 앨범 처리"""
+
+import pytest
+import requests
+
+from spotify_ids import (
+    ALBUMS_BATCH_SIZE, TRACKS_BATCH_SIZE, MockSpotifyCatalog, refresh_by_ids, start_mock_server,
+)
+
+
+@pytest.fixture
+def catalog():
+    return MockSpotifyCatalog(tracks=200, tracks_per_album=1.5)
+
+
+@pytest.fixture
+def mock(catalog):
+    server, base_url, counter = start_mock_server(catalog)
+    session = requests.Session()
+
+    def get(path, params):
+        response = session.get(f"{base_url}{path}", params=params, timeout=10)
+        return response.json() if response.status_code == 200 else None
+
+    yield get, counter
+    server.shutdown()
+    session.close()
+
+
+def _entries(tracks):
+    return {
+        track['id']: {'track_id': track['id'], 'album_id': track['album']['id']}
+        for track in tracks
+    }
+
+
+def test_shared_albums_use_album_plan(catalog, mock):
+    get, counter = mock
+    # 곡 100개가 앨범 5개를 공유 → 앨범 1회 < 트랙 2회
+    album_ids = sorted(catalog.albums)[:5]
+    tracks = [dict(track, album=catalog.albums[album_ids[i % 5]])
+              for i, track in enumerate(list(catalog.tracks.values())[:100])]
+
+    results, calls = refresh_by_ids(get, _entries(tracks))
+
+    assert calls == 1
+    assert counter.get('/v1/albums') == 1
+    assert '/v1/tracks' not in counter
+    assert len(results) == 100
+    track = tracks[0]
+    assert results[track['id']] == (track['id'], track['album']['id'], track['album']['images'])
+
+
+def test_distinct_albums_use_track_plan(catalog, mock):
+    get, counter = mock
+    # 앨범이 모두 다른 곡 50개 → 앨범 3회 > 트랙 1회
+    seen, tracks = set(), []
+    for track in catalog.tracks.values():
+        if track['album']['id'] not in seen:
+            seen.add(track['album']['id'])
+            tracks.append(track)
+        if len(tracks) == TRACKS_BATCH_SIZE:
+            break
+    assert len(tracks) == TRACKS_BATCH_SIZE > ALBUMS_BATCH_SIZE
+
+    results, calls = refresh_by_ids(get, _entries(tracks))
+
+    assert calls == 1
+    assert counter.get('/v1/tracks') == 1
+    assert '/v1/albums' not in counter
+    assert len(results) == TRACKS_BATCH_SIZE
+    assert all(results[t['id']][2] == t['album']['images'] for t in tracks)
+
+
+def test_album_without_track_id_forces_album_plan(catalog, mock):
+    get, counter = mock
+    tracks = list(catalog.tracks.values())[:2]
+    entries = _entries(tracks)
+    entries[tracks[0]['id']]['track_id'] = None
+
+    results, calls = refresh_by_ids(get, entries)
+
+    assert counter.get('/v1/albums') == 1
+    assert '/v1/tracks' not in counter
+    assert len(results) == 2
+
+
+def test_null_albums_fall_back_to_tracks(catalog, mock):
+    get, counter = mock
+    track = next(iter(catalog.tracks.values()))
+    entries = {
+        # 같은 앨범을 공유해서 앨범 계획이 선택됨
+        'ok': {'track_id': track['id'], 'album_id': track['album']['id']},
+        'ok2': {'track_id': track['id'], 'album_id': track['album']['id']},
+        # 카탈로그에 없는 앨범 → 응답에 null, 트랙 ID로 재조회
+        'gone_album': {'track_id': track['id'], 'album_id': 'album_missing'},
+        # 앨범도 트랙도 없음 → 결과에서 빠짐
+        'gone': {'track_id': 'track_missing', 'album_id': 'album_missing2'},
+        'no_track': {'track_id': None, 'album_id': 'album_missing3'},
+    }
+
+    results, calls = refresh_by_ids(get, entries)
+
+    assert counter.get('/v1/albums') == 1
+    assert counter.get('/v1/tracks') == 1
+    assert calls == 2
+    assert set(results) == {'ok', 'ok2', 'gone_album'}
+    assert results['gone_album'] == (track['id'], track['album']['id'], track['album']['images'])
+
+
+def test_empty_entries_make_no_calls(mock):
+    get, counter = mock
+    assert refresh_by_ids(get, {}) == ({}, 0)
+    assert set(counter) == {'lock'}
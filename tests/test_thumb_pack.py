@@ -0,0 +1,51 @@
+"""thumb_pack / image_derivatives - 폴더가 다른 같은 이름 렌디션"""
+
+import io
+
+import pytest
+
+import image_derivatives
+import thumb_pack
+from image_derivatives import find_rendition, generate_derivatives, pack_name
+from thumb_pack import ThumbPack
+
+Image = pytest.importorskip('PIL.Image')
+
+
+@pytest.fixture
+def pack(tmp_path, monkeypatch):
+    pack = ThumbPack(tmp_path / 'thumbs.pack')
+    monkeypatch.setattr(thumb_pack, '_pack', pack)
+    monkeypatch.setattr(image_derivatives, 'PACKED_SIZES', (64, 300))
+    return pack
+
+
+def make_image(path, color):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new('RGB', (700, 700), color).save(path, 'JPEG')
+    return path
+
+
+def test_same_name_in_different_directories(tmp_path, pack):
+    red = make_image(tmp_path / 'album_images' / 'cover.jpg', (255, 0, 0))
+    blue = make_image(tmp_path / 'track_images' / 'cover.jpg', (0, 0, 255))
+    generate_derivatives(red)
+    generate_derivatives(blue)
+
+    thumbs = {}
+    for source in (red, blue):
+        path, mimetype = find_rendition(source, 64)
+        assert mimetype == 'image/jpeg'
+        thumbs[source] = pack.get(pack_name(path))
+
+    assert bytes(thumbs[red]) != bytes(thumbs[blue])
+    with Image.open(io.BytesIO(bytes(thumbs[blue]))) as image:
+        r, g, b = image.convert('RGB').getpixel((10, 10))
+        assert b > 200 and r < 50
+
+
+def test_compact_drops_legacy_names(pack):
+    pack.put('cover_64.jpg', b'old')
+    pack.put('track_images/renditions/cover_64.jpg', b'new')
+    pack.compact(drop=thumb_pack.is_legacy_name)
+    assert pack.names() == ['track_images/renditions/cover_64.jpg']
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Thumb Pack - 작은 렌디션(64 / 300)용 append-only 팩 파일
+- 썸네일 수천 개를 개별 파일 대신 팩 파일 하나에 이어 붙여 저장 (inode / open·read·close 절약)
+- 레코드: 헤더(매직, 플래그, 이름 길이, 데이터 길이, CRC32, 원본 mtime) + 이름 + 데이터
+- 인덱스(이름 → offset, length)는 팩 스캔으로 메모리에 구성 (별도 인덱스 파일 없음, 손상된 꼬리는 무시)
+- 이름은 image_derivatives.pack_name() 키 (static/ 기준 상대 경로 - 폴더가 달라도 겹치지 않음)
+- 서버는 mmap으로 읽고 memoryview 슬라이스 반환 (조회 시 복사 / 시스템 콜 없음)
+- 같은 이름 재기록 / 삭제(툼스톤)로 생긴 죽은 레코드는 compact로 정리
+- 다른 프로세스(스케줄러)가 추가한 레코드는 파일 크기 / inode 변화로 감지
+
+사용법:
+    python3 thumb_pack.py import [--delete]    # 기존 renditions/*_64, *_300 파일을 팩으로 이동
+    python3 thumb_pack.py stats
+    python3 thumb_pack.py compact
+    python3 thumb_pack.py compact --drop-legacy   # 파일명만으로 저장된 예전 항목 정리 (import로 다시 채움)
+    python3 thumb_pack.py bench --reads 20000   # 개별 파일 vs 팩 읽기 비교
+"""
+
+import argparse
+import mmap
+import os
+import random
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+BASE_DIR = Path(__file__).parent
+PACK_PATH = Path(os.getenv('THUMB_PACK_PATH', str(BASE_DIR / 'static' / 'thumb_pack' / 'thumbs.pack')))
+
+MAGIC = b'TPK1'
+# 매직, 플래그, 이름 길이, 데이터 길이, CRC32, 원본 mtime
+HEADER = struct.Struct('<4sBHIId')
+FLAG_LIVE = 0
+FLAG_DELETED = 1
+
+REFRESH_INTERVAL = 1.0  # 다른 프로세스의 추가분 확인 주기 (초)
+
+
+class ThumbPack:
+    """append-only 썸네일 팩 (읽기: mmap, 쓰기: 파일 잠금 후 끝에 추가)"""
+
+    def __init__(self, pack_path=PACK_PATH):
+        self.pack_path = Path(pack_path)
+        self.lock_path = self.pack_path.with_name(self.pack_path.name + '.lock')
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._mm = None
+        self._inode = None
+        self._scanned = 0        # 유효한 레코드가 끝나는 위치
+        self._index = {}         # name → (data_offset, length, crc, mtime)
+        self._record_bytes = {}  # name → 레코드 전체 크기 (죽은 용량 계산용)
+        self._dead_bytes = 0
+        self._checked_at = 0.0
+
+    # ============================================
+    # 인덱스 (팩 스캔)
+    # ============================================
+    def _refresh(self, force=False):
+        """팩 파일이 커졌거나 교체(compact)됐으면 다시 매핑"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < REFRESH_INTERVAL:
+            return
+        self._checked_at = now
+
+        try:
+            stat = os.stat(self.pack_path)
+        except FileNotFoundError:
+            if self._inode is not None:
+                self._reset()
+                self._checked_at = now
+            return
+
+        if stat.st_ino != self._inode:
+            # 기존 memoryview가 남아 있을 수 있으므로 mmap은 명시적으로 닫지 않음 (GC가 정리)
+            self._reset()
+            self._checked_at = now
+            self._inode = stat.st_ino
+
+        if stat.st_size <= self._scanned or stat.st_size == 0:
+            return
+
+        with open(self.pack_path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._scan(self._scanned, len(self._mm))
+
+    def _scan(self, start, end):
+        mm = self._mm
+        offset = start
+        while offset + HEADER.size <= end:
+            magic, flags, name_len, data_len, crc, mtime = HEADER.unpack_from(mm, offset)
+            record_end = offset + HEADER.size + name_len + data_len
+            if magic != MAGIC or record_end > end:
+                break  # 기록 중이거나 잘린 꼬리
+
+            name_start = offset + HEADER.size
+            data_start = name_start + name_len
+            if flags == FLAG_LIVE and zlib.crc32(mm[data_start:record_end]) != crc:
+                break
+
+            name = mm[name_start:data_start].decode('utf-8')
+            if name in self._index:
+                self._dead_bytes += self._record_bytes.pop(name)
+                del self._index[name]
+
+            if flags == FLAG_LIVE:
+                self._index[name] = (data_start, data_len, crc, mtime)
+                self._record_bytes[name] = record_end - offset
+            else:
+                self._dead_bytes += record_end - offset
+
+            offset = record_end
+
+        self._scanned = offset
+
+    # ============================================
+    # 조회
+    # ============================================
+    def get_entry(self, name):
+        """이름 → (memoryview, crc, mtime), 없으면 None (memoryview는 mmap의 zero-copy 슬라이스)"""
+        with self._lock:
+            self._refresh()
+            entry = self._index.get(name)
+            if entry is None:
+                return None
+            data_start, length, crc, mtime = entry
+            return memoryview(self._mm)[data_start:data_start + length], crc, mtime
+
+    def get(self, name):
+        entry = self.get_entry(name)
+        return entry[0] if entry else None
+
+    def contains(self, name):
+        with self._lock:
+            self._refresh()
+            return name in self._index
+
+    def mtime(self, name):
+        """원본 mtime (렌디션 최신 여부 확인용), 없으면 None"""
+        with self._lock:
+            self._refresh()
+            entry = self._index.get(name)
+            return entry[3] if entry else None
+
+    def names(self):
+        with self._lock:
+            self._refresh(force=True)
+            return list(self._index)
+
+    def get_stats(self):
+        with self._lock:
+            self._refresh(force=True)
+            live_bytes = sum(self._record_bytes.values())
+            return {
+                'path': str(self.pack_path),
+                'entries': len(self._index),
+                'size_mb': round(self._scanned / 1024 / 1024, 2),
+                'live_mb': round(live_bytes / 1024 / 1024, 2),
+                'dead_mb': round(self._dead_bytes / 1024 / 1024, 2),
+                'dead_ratio': round(self._dead_bytes / self._scanned, 3) if self._scanned else 0.0,
+            }
+
+    # ============================================
+    # 쓰기 (프로세스 간 잠금)
+    # ============================================
+    def _locked(self):
+        return _FileLock(self.lock_path)
+
+    def _append(self, records):
+        """레코드 추가 - 잘린 꼬리가 있으면 먼저 잘라냄"""
+        self.pack_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, self._locked():
+            self._refresh(force=True)
+            with open(self.pack_path, 'ab') as f:
+                if f.tell() > self._scanned:
+                    f.truncate(self._scanned)
+                for flags, name, data, mtime in records:
+                    name_bytes = name.encode('utf-8')
+                    f.write(HEADER.pack(MAGIC, flags, len(name_bytes), len(data),
+                                        zlib.crc32(data), mtime or 0.0))
+                    f.write(name_bytes)
+                    f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._refresh(force=True)
+
+    def put(self, name, data, mtime=None):
+        """썸네일 저장 (같은 이름이 있으면 새 레코드가 우선, 이전 것은 죽은 레코드)"""
+        self._append([(FLAG_LIVE, name, bytes(data), mtime)])
+
+    def put_many(self, items):
+        """[(name, data, mtime)] 일괄 저장"""
+        self._append([(FLAG_LIVE, name, bytes(data), mtime) for name, data, mtime in items])
+
+    def delete(self, name):
+        if not self.contains(name):
+            return False
+        self._append([(FLAG_DELETED, name, b'', None)])
+        return True
+
+    def compact(self, drop=None):
+        """살아 있는 레코드만 새 팩으로 복사 후 원자적 교체 → 회수한 바이트 수
+
+        drop(name)이 참인 레코드도 함께 버림
+        """
+        with self._lock, self._locked():
+            self._refresh(force=True)
+            if not self._mm:
+                return 0
+
+            before = self._scanned
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.pack_path.parent), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for name, (data_start, length, crc, mtime) in self._index.items():
+                        if drop is not None and drop(name):
+                            continue
+                        name_bytes = name.encode('utf-8')
+                        f.write(HEADER.pack(MAGIC, FLAG_LIVE, len(name_bytes), length, crc, mtime))
+                        f.write(name_bytes)
+                        f.write(self._mm[data_start:data_start + length])
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, self.pack_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            self._refresh(force=True)
+            return before - self._scanned
+
+
+class _FileLock:
+    """팩 쓰기용 프로세스 간 잠금 (compact 교체 후에도 유지되도록 별도 잠금 파일 사용)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a')
+        if FCNTL_AVAILABLE:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if FCNTL_AVAILABLE:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+
+
+_pack = None
+_pack_lock = threading.Lock()
+
+
+def get_thumb_pack():
+    """ThumbPack 싱글톤"""
+    global _pack
+    if _pack is None:
+        with _pack_lock:
+            if _pack is None:
+                _pack = ThumbPack()
+    return _pack
+
+
+# ============================================
+# CLI
+# ============================================
+def is_legacy_name(name):
+    """폴더 없이 파일명만으로 저장된 예전 키 (다른 폴더의 같은 이름과 겹침)"""
+    return '/' not in name
+
+
+def import_renditions(pack, directories, sizes, delete=False):
+    """기존 렌디션 파일 → 팩 (image_derivatives.pack_name 키)"""
+    from image_derivatives import pack_name
+
+    stats = {'imported': 0, 'skipped': 0, 'deleted': 0}
+    suffixes = tuple(f"_{size}" for size in sizes)
+
+    batch = []
+    files = []
+    for directory in directories:
+        for path in sorted(Path(directory).glob('*')):
+            if not path.is_file() or not path.stem.endswith(suffixes):
+                continue
+            mtime = path.stat().st_mtime
+            if (pack.mtime(pack_name(path)) or 0) >= mtime:
+                stats['skipped'] += 1
+            else:
+                batch.append((pack_name(path), path.read_bytes(), mtime))
+            files.append(path)
+
+            if len(batch) >= 500:
+                pack.put_many(batch)
+                stats['imported'] += len(batch)
+                batch = []
+
+    if batch:
+        pack.put_many(batch)
+        stats['imported'] += len(batch)
+
+    if delete:
+        for path in files:
+            if pack.contains(pack_name(path)):
+                path.unlink()
+                stats['deleted'] += 1
+
+    return stats
+
+
+def bench(pack, reads=20000, seed=0):
+    """같은 썸네일 집합을 개별 파일 / 팩에서 읽는 시간 비교 (팩 → 임시 폴더에 파일로 풀어서 측정)"""
+    names = pack.names()
+    if not names:
+        return None
+
+    rng = random.Random(seed)
+    picks = [rng.choice(names) for _ in range(reads)]
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix='thumb_bench_'))
+    try:
+        # 키에 폴더가 들어 있으므로 임시 폴더에는 순번 파일명으로 풀기
+        files = {}
+        for i, name in enumerate(names):
+            files[name] = tmp_dir / f"{i}.bin"
+            files[name].write_bytes(pack.get(name))
+
+        # 개별 파일: send_file과 같은 stat + open/read/close
+        start = time.perf_counter()
+        file_bytes = 0
+        for name in picks:
+            path = files[name]
+            os.stat(path)
+            with open(path, 'rb') as f:
+                file_bytes += len(f.read())
+        file_seconds = time.perf_counter() - start
+
+        # 팩: 인덱스 조회 + memoryview 슬라이스 (WSGI 응답용 bytes 변환 포함)
+        start = time.perf_counter()
+        pack_bytes = 0
+        for name in picks:
+            view, _, _ = pack.get_entry(name)
+            pack_bytes += len(bytes(view))
+        pack_seconds = time.perf_counter() - start
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    assert file_bytes == pack_bytes
+    return {
+        'thumbnails': len(names),
+        'reads': reads,
+        'file_us_per_read': round(file_seconds / reads * 1e6, 2),
+        'pack_us_per_read': round(pack_seconds / reads * 1e6, 2),
+        'speedup': round(file_seconds / pack_seconds, 1) if pack_seconds else None,
+    }
+
+
+def main():
+    from image_derivatives import PACKED_SIZES, RENDITIONS_DIRNAME, TRACK_IMAGES_DIR
+
+    parser = argparse.ArgumentParser(description='썸네일 팩 관리')
+    parser.add_argument('--pack', default=str(PACK_PATH), help='팩 파일 경로')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='기존 작은 렌디션 파일을 팩으로 이동')
+    import_parser.add_argument('--dir', action='append',
+                               help='렌디션 폴더 (기본: static/track_images/renditions, 해시 저장소 renditions)')
+    import_parser.add_argument('--delete', action='store_true', help='팩에 넣은 파일 삭제')
+
+    subparsers.add_parser('stats', help='팩 통계')
+    compact_parser = subparsers.add_parser('compact', help='죽은 레코드 정리')
+    compact_parser.add_argument('--drop-legacy', action='store_true',
+                                help='파일명만으로 저장된 예전 항목도 삭제')
+
+    bench_parser = subparsers.add_parser('bench', help='개별 파일 vs 팩 읽기 벤치마크')
+    bench_parser.add_argument('--reads', type=int, default=20000)
+
+    args = parser.parse_args()
+    pack = ThumbPack(args.pack)
+
+    if args.command == 'import':
+        directories = args.dir
+        if not directories:
+            from image_store import STORE_DIR
+            directories = [TRACK_IMAGES_DIR / RENDITIONS_DIRNAME]
+            directories += sorted(STORE_DIR.glob(f'*/{RENDITIONS_DIRNAME}'))
+        stats = import_renditions(pack, directories, PACKED_SIZES, delete=args.delete)
+        print(f"✅ 가져오기: {stats['imported']}개, 최신 유지 {stats['skipped']}개, 파일 삭제 {stats['deleted']}개")
+        print(f"📦 {pack.get_stats()}")
+
+    elif args.command == 'stats':
+        for key, value in pack.get_stats().items():
+            print(f"  {key}: {value}")
+
+    elif args.command == 'compact':
+        reclaimed = pack.compact(drop=is_legacy_name if args.drop_legacy else None)
+        print(f"🧹 정리 완료: {reclaimed / 1024 / 1024:.2f}MB 회수")
+        print(f"📦 {pack.get_stats()}")
+
+    elif args.command == 'bench':
+        result = bench(pack, args.reads)
+        if not result:
+            print("❌ 팩이 비어 있습니다 (먼저 import)")
+            return
+        print(f"{'='*60}")
+        print(f"📦 썸네일 {result['thumbnails']}개, 읽기 {result['reads']}회")
+        print(f"📄 개별 파일: {result['file_us_per_read']}µs/회")
+        print(f"🗜️  팩(mmap): {result['pack_us_per_read']}µs/회")
+        print(f"🚀 {result['speedup']}배")
+        print(f"{'='*60}")
+
+
+if __name__ == '__main__':
+    main()